@@ -0,0 +1,81 @@
+"""Per-message cost of the automod matcher with large rule sets.
+
+    python -m bench.automod_bench --words 5000 --domains 1000 --messages 50000
+
+Prints microseconds per message for clean messages (the common case) and
+messages that contain a banned word or link. Add --json for machine-readable output.
+"""
+import argparse
+import json
+import random
+import string
+import time
+
+from utils.automod import CompiledRules
+
+
+def random_word(rng, low=4, high=10):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def make_messages(rng, count, vocabulary, extra=None):
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(5, 25))]
+        if extra:
+            words.insert(rng.randrange(len(words)), rng.choice(extra))
+        messages.append(" ".join(words))
+    return messages
+
+
+def measure(rules, messages):
+    check = rules.check
+    started = time.perf_counter()
+    hits = 0
+    for content in messages:
+        if check(content) is not None:
+            hits += 1
+    elapsed = time.perf_counter() - started
+    return {"us_per_message": elapsed / len(messages) * 1e6, "hits": hits, "messages": len(messages)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=5000)
+    parser.add_argument("--domains", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    banned = list({random_word(rng) for _ in range(args.words)})
+    domains = list({f"{random_word(rng, 5, 12)}.com" for _ in range(args.domains)})
+    # Chat vocabulary that does not overlap the banned list.
+    banned_set = set(banned)
+    vocabulary = [w for w in (random_word(rng, 2, 8) for _ in range(3000)) if w not in banned_set]
+    vocabulary += ["https://example.org/watch?v=abc", "discord.gg", "lol", "ok"]
+
+    started = time.perf_counter()
+    rules = CompiledRules(banned, domains)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    results = {
+        "rules": rules.count,
+        "compile_ms": compile_ms,
+        "clean": measure(rules, make_messages(rng, args.messages, vocabulary)),
+        "banned_word": measure(rules, make_messages(rng, args.messages // 5, vocabulary, banned)),
+        "banned_link": measure(rules, make_messages(rng, args.messages // 5, vocabulary, [f"https://{d}/x" for d in domains])),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['rules']} rules compiled in {compile_ms:.1f} ms")
+    for name in ("clean", "banned_word", "banned_link"):
+        r = results[name]
+        print(f"{name:>12}: {r['us_per_message']:.2f} µs/message ({r['hits']}/{r['messages']} matched)")
+
+
+if __name__ == "__main__":
+    main()
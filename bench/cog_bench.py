@@ -0,0 +1,263 @@
+"""Throughput and latency of the cogs and db/database.py against a scratch SQLite file.
+
+    python -m bench.cog_bench                      # human-readable table
+    python -m bench.cog_bench --out before.json    # save results
+    python -m bench.cog_bench --baseline before.json
+    python -m bench.cog_bench --database postgresql://localhost/yuuki_bench
+
+Scenarios drive the real Events, Moderation and General cogs with the fakes
+in bench/fakes.py, so nothing talks to Discord:
+
+  settings_cold      get_guild_settings with an empty cache (one query per guild)
+  settings_warm      get_guild_settings served from the cache
+  join_storm         concurrent on_member_join across all guilds
+  mass_infractions   Moderation.log_action back to back, then one flush
+  infraction_paging  InfractionView stepping through every page, then random jumps
+  automod_messages   General.on_message with a few hundred rules per guild
+
+Each scenario reports ops, ops/s, and p50/p99/max latency in milliseconds.
+--database runs the same scenarios against another backend; point it at an
+empty scratch database, since rows are left behind.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from bench.fakes import FakeBot, FakeGuild, FakeMessage
+from cogs.events import Events
+from cogs.general import General
+from cogs.moderation import InfractionView, Moderation
+from db import database
+from db.backends import open_backend
+from utils.autoroles import AutoroleWorkers
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(samples, wall, **extra):
+    ordered = sorted(samples)
+    result = {
+        "ops": len(samples),
+        "wall_s": round(wall, 4),
+        "ops_per_s": round(len(samples) / wall, 1) if wall else None,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+    result.update(extra)
+    return result
+
+
+async def timed(samples, coro):
+    started = time.perf_counter()
+    await coro
+    samples.append(time.perf_counter() - started)
+
+
+async def setup_guilds(bot, count):
+    for i in range(count):
+        guild = bot.add_guild(FakeGuild(f"guild{i}"))
+        for column, name in (("welcome_channel", "welcome"), ("rules_channel", "rules"),
+                             ("log_channel", "log"), ("list_channel", "list")):
+            await database.set_channel_id(bot, guild.id, column, guild.channels[name].id)
+        await database.add_autorole(bot, guild.id, guild.roles["Member"].id)
+    await database.flush()
+
+
+async def bench_settings(bot, lookups, rng):
+    database.settings_cache.clear()
+    samples = []
+    started = time.perf_counter()
+    for guild in bot.guilds:
+        await timed(samples, database.get_guild_settings(bot, guild.id))
+    cold = summarize(samples, time.perf_counter() - started)
+
+    samples = []
+    guild_ids = [rng.choice(bot.guilds).id for _ in range(lookups)]
+    started = time.perf_counter()
+    for guild_id in guild_ids:
+        await timed(samples, database.get_guild_settings(bot, guild_id))
+    warm = summarize(samples, time.perf_counter() - started, hit_rate=round(database.settings_cache.stats()["hit_rate"], 4))
+    return cold, warm
+
+
+async def bench_join_storm(bot, joins, rng):
+    events = Events(bot)
+    members = [rng.choice(bot.guilds).new_member() for _ in range(joins)]
+    samples = []
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(samples, events.on_member_join(m)) for m in members))
+    wall = time.perf_counter() - started
+    # Autoroles are applied by the worker pool after the listener returns.
+    while bot.autoroles.applied < joins and time.perf_counter() - started < 60:
+        await asyncio.sleep(0.005)
+    drained = time.perf_counter() - started
+    lags = sorted((m.roles_at - m.joined_at).total_seconds() for m in members if m.roles_at)
+    digested = sum(len(ids) for ids in events._digests.values())
+    return summarize(
+        samples, wall, welcomed=joins - digested, digested=digested,
+        autoroles_applied=len(lags), autoroles_drain_s=round(drained, 4),
+        autorole_lag_p50_ms=round(percentile(lags, 0.50) * 1000, 3) if lags else None,
+        autorole_lag_p99_ms=round(percentile(lags, 0.99) * 1000, 3) if lags else None,
+    )
+
+
+async def bench_mass_infractions(bot, moderation, count, rng):
+    samples = []
+    started = time.perf_counter()
+    for i in range(count):
+        guild = rng.choice(bot.guilds)
+        member = guild.new_member()
+        await timed(samples, moderation.log_action(guild, guild.owner, "Warned", member, f"bench reason {i}"))
+    flush_started = time.perf_counter()
+    await database.flush()
+    flush = time.perf_counter() - flush_started
+    return summarize(samples, time.perf_counter() - started, flush_ms=round(flush * 1000, 3))
+
+
+async def bench_paging(bot, rows, jumps, rng):
+    guild = bot.guilds[0]
+    member = guild.new_member()
+    now = int(time.time())
+    for i in range(rows):
+        await database.log_infraction(bot, guild.id, member.id, guild.owner.id, "Warned", f"reason {i}", now - rows + i)
+    await database.flush()
+
+    total = await database.count_infractions(bot, guild.id, member.id)
+    view = InfractionView(bot, guild.id, member, total)
+    samples = []
+    started = time.perf_counter()
+    for page in range(view.pages):
+        await timed(samples, view.fetch(page))
+    stepping = summarize(samples, time.perf_counter() - started, rows=total)
+
+    samples = []
+    started = time.perf_counter()
+    for _ in range(jumps):
+        # Fresh view each time so the jump cannot be served from its page cache.
+        view = InfractionView(bot, guild.id, member, total)
+        await timed(samples, view.fetch(rng.randrange(view.pages)))
+    jumping = summarize(samples, time.perf_counter() - started, rows=total)
+    return stepping, jumping
+
+
+async def bench_automod(bot, moderation, messages, words, rng):
+    general = General(bot)
+    bot.cogs["Moderation"] = moderation
+    banned = [f"banned{i}" for i in range(words)]
+    for guild in bot.guilds:
+        await database.add_automod_rules(bot, guild.id, "word", banned)
+    await database.flush()
+
+    vocabulary = ["hello", "there", "how", "is", "everyone", "doing", "today", "lol", "gg", "https://example.com/x"]
+    batch = []
+    for _ in range(messages):
+        guild = rng.choice(bot.guilds)
+        words_in_message = rng.choices(vocabulary, k=rng.randint(3, 20))
+        if rng.random() < 0.05:
+            words_in_message.append(rng.choice(banned))
+        batch.append(FakeMessage(guild.channels["general"], guild.new_member(), " ".join(words_in_message)))
+
+    samples = []
+    started = time.perf_counter()
+    for message in batch:
+        await timed(samples, general.on_message(message))
+    wall = time.perf_counter() - started
+    deleted = sum(g.calls["delete"] for g in bot.guilds)
+    return summarize(samples, wall, deleted=deleted)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="yuuki-bench-")
+    path = args.database or os.path.join(workdir, "bench.db")
+    bot = FakeBot()
+    bot.autoroles = AutoroleWorkers(bot)
+    try:
+        await open_backend(path).migrate()
+        await database.connect(path)
+        await setup_guilds(bot, args.guilds)
+        await database.warm_autorole_cache(bot)
+        await bot.autoroles.start()
+        moderation = Moderation(bot)
+
+        results = {}
+        results["settings_cold"], results["settings_warm"] = await bench_settings(bot, args.lookups, rng)
+        results["join_storm"] = await bench_join_storm(bot, args.joins, rng)
+        results["mass_infractions"] = await bench_mass_infractions(bot, moderation, args.infractions, rng)
+        results["infraction_paging"], results["infraction_jumps"] = await bench_paging(bot, args.page_rows, args.jumps, rng)
+        results["automod_messages"] = await bench_automod(bot, moderation, args.messages, args.words, rng)
+        results["backend"] = database.backend_name()
+        if results["backend"] == "sqlite":
+            results["db_size_kb"] = os.path.getsize(path) // 1024
+        return results
+    finally:
+        await bot.autoroles.stop()
+        await database.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_table(results, baseline=None):
+    print(f"{'scenario':<20}{'ops':>8}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, r in results.items():
+        if not isinstance(r, dict):
+            continue
+        line = f"{name:<20}{r['ops']:>8}{r['ops_per_s']:>12}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['max_ms']:>10.3f}"
+        base = (baseline or {}).get(name)
+        if base and base.get("p50_ms"):
+            line += f"   p50 x{r['p50_ms'] / base['p50_ms']:.2f}, p99 x{r['p99_ms'] / base['p99_ms']:.2f} vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=50000)
+    parser.add_argument("--joins", type=int, default=2000)
+    parser.add_argument("--infractions", type=int, default=20000)
+    parser.add_argument("--page-rows", type=int, default=2000)
+    parser.add_argument("--jumps", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database", help="DATABASE_URL to run against instead of a scratch SQLite file")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    parser.add_argument("--baseline", help="a previous --out file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "args": {k: v for k, v in vars(args).items() if k not in ("json", "out", "baseline")},
+            "time": int(time.time()),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)["results"]
+        print_table(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
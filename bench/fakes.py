@@ -0,0 +1,165 @@
+"""Just enough of discord.py's models to drive the cogs without a gateway.
+
+Every network call (sending, deleting, adding roles) is an in-memory no-op
+that counts how often it was made, so benchmarks measure our own code and
+the database rather than Discord.
+"""
+import itertools
+
+from discord.utils import utcnow
+
+_ids = itertools.count(1 << 40)
+
+
+def next_id():
+    return next(_ids)
+
+
+class FakeAsset:
+    url = "https://cdn.discordapp.com/embed/avatars/0.png"
+
+
+class FakeUser:
+    bot = False
+
+    def __init__(self, name, user_id=None):
+        self.id = user_id or next_id()
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{self.id}>"
+        self.display_avatar = FakeAsset()
+        self.avatar = self.display_avatar
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMember(FakeUser):
+    def __init__(self, guild, name, user_id=None):
+        super().__init__(name, user_id)
+        self.guild = guild
+        self.roles = []
+        self.joined_at = utcnow()
+        self.roles_at = None
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(roles)
+        self.roles_at = utcnow()
+        self.guild.calls["add_roles"] += 1
+
+
+class FakeRole:
+    def __init__(self, guild, name):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<@&{self.id}>"
+
+
+class FakeChannel:
+    def __init__(self, guild, name):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+
+    async def send(self, content=None, **kwargs):
+        self.guild.calls["send"] += 1
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.mentions = []
+
+    async def delete(self):
+        self.guild.calls["delete"] += 1
+
+
+class FakeGuild:
+    def __init__(self, name, channels=("welcome", "rules", "log", "list", "general"), roles=("Member",)):
+        self.id = next_id()
+        self.name = name
+        self.icon = None
+        self.shard_id = 0
+        self.member_count = 0
+        self.calls = {"send": 0, "add_roles": 0, "delete": 0, "fetch_member": 0}
+        self._members = {}
+        self.channels = {name: FakeChannel(self, name) for name in channels}
+        self.roles = {name: FakeRole(self, name) for name in roles}
+        self._channels_by_id = {c.id: c for c in self.channels.values()}
+        self._roles_by_id = {r.id: r for r in self.roles.values()}
+        self.me = FakeMember(self, "Yuuki")
+        self.owner = FakeMember(self, "owner")
+
+    def get_channel(self, channel_id):
+        return self._channels_by_id.get(channel_id)
+
+    def get_role(self, role_id):
+        return self._roles_by_id.get(role_id)
+
+    def get_member(self, user_id):
+        # Behaves like low-memory mode: nothing is cached by the "gateway".
+        return None
+
+    async def fetch_member(self, user_id):
+        self.calls["fetch_member"] += 1
+        return self._members[user_id]
+
+    def new_member(self, name=None):
+        self.member_count += 1
+        member = FakeMember(self, name or f"member{self.member_count}")
+        self._members[member.id] = member
+        return member
+
+
+class FakeOutbound:
+    """Stands in for OutboundQueue: records sends instead of pacing them."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, channel, content=None, *, priority=None, merge=False, **kwargs):
+        self.sent += 1
+
+    def depth(self, channel_id=None):
+        return 0
+
+
+class FakeBot:
+    """The attributes of commands.Bot the cogs reach for."""
+
+    def __init__(self):
+        self.guilds = []
+        self._guilds = {}
+        self._channels = {}
+        self.user = FakeUser("Yuuki")
+        self.latency = 0.05
+        # Unsharded, as when running without the cluster launcher.
+        self.shard_ids = None
+        self.shard_count = None
+        self.outbound = FakeOutbound()
+        self.scheduler = None
+        self.cogs = {}
+
+    def add_guild(self, guild):
+        self.guilds.append(guild)
+        self._guilds[guild.id] = guild
+        self._channels.update(guild._channels_by_id)
+        return guild
+
+    def get_guild(self, guild_id):
+        return self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    async def wait_until_ready(self):
+        return
@@ -1,89 +1,144 @@
 # /cogs/events.py
 import discord
 from discord.utils import utcnow
-from discord.ext import commands
-from db.database import get_channel_id
-from db.database import get_autoroles
+from discord.ext import commands, tasks
+from config import JOIN_BURST_THRESHOLD, JOIN_BURST_WINDOW, JOIN_DIGEST_INTERVAL
+from db.database import get_guild_settings
+from db.database import get_autoroles, record_member_join
+from utils.joinburst import JoinBurstDetector
+from utils.outbound import PRIORITY_LOW
+from utils.templates import render_template, template_cache
+from utils import metrics
+from utils.members import member_cache
+
+
+def chunk_mentions(member_ids, limit):
+    """Split member mentions into space-joined chunks of at most `limit` characters."""
+    chunk, length = [], 0
+    for member_id in member_ids:
+        mention = f"<@{member_id}>"
+        if chunk and length + len(mention) + 1 > limit:
+            yield " ".join(chunk)
+            chunk, length = [], 0
+        chunk.append(mention)
+        length += len(mention) + 1
+    if chunk:
+        yield " ".join(chunk)
 
 
 class Events(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.join_bursts = JoinBurstDetector(JOIN_BURST_THRESHOLD, JOIN_BURST_WINDOW)
+        # guild id -> ids of members waiting for the next join digest
+        self._digests = {}
+
+    async def cog_load(self):
+        self.flush_join_digests.change_interval(seconds=JOIN_DIGEST_INTERVAL)
+        self.flush_join_digests.start()
+
+    async def cog_unload(self):
+        self.flush_join_digests.cancel()
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
         guild = member.guild
         guild_id = guild.id
+        member_cache.put(member)
+        # Join-time index for `.massban joined:10m`.
+        await record_member_join(self.bot, guild_id, member.id, (member.joined_at or utcnow()).timestamp())
+
+        # Autoroles are applied by the worker pool so a raid cannot stall this listener.
+        if await get_autoroles(self.bot, guild_id):
+            await self.bot.autoroles.submit(member)
 
-        # Get autoroles
-        role_ids = await get_autoroles(self.bot, member.guild.id)
-        roles = [member.guild.get_role(rid) for rid in role_ids]
-        roles = [r for r in roles if r is not None]
-        try:
-            await member.add_roles(*roles)
-        except Exception as e:
-            print(f"⚠️ Could not assign autoroles to {member.name}: {e}")
+        # During a join storm welcomes are collected into a periodic digest.
+        if self.join_bursts.record(guild_id):
+            self._digests.setdefault(guild_id, []).append(member.id)
+            return
 
         # Send welcome message
-        welcome_channel_id = await get_channel_id(self.bot, guild_id, "welcome_channel")
-        rules_channel_id = await get_channel_id(self.bot, guild_id, "rules_channel")
-        roles_channel_id = await get_channel_id(self.bot, guild_id, "role_channel")
-        introduction_channel_id = await get_channel_id(self.bot, guild_id, "introduction_channel")
+        settings = await get_guild_settings(self.bot, guild_id)
+        rules_channel_id = settings.rules_channel
 
-        if welcome_channel_id:
-            welcome_channel = self.bot.get_channel(welcome_channel_id)
+        if settings.welcome_channel:
+            welcome_channel = self.bot.get_channel(settings.welcome_channel)
             if welcome_channel:
-                now = utcnow()
-                unix_ts = int(now.timestamp())
+                embed = await render_template(self.bot, member, "welcome")
+                self.bot.outbound.send(welcome_channel, embed=embed, priority=PRIORITY_LOW)
 
-                rules_text = f"<a:exclamation:1350752095720177684> Read the rules in <#{rules_channel_id}>" if rules_channel_id else "<a:exclamation:1350752095720177684> Read the rules in the rules channel."
-                roles_text = f"<a:exclamation:1350752095720177684> Get yourself a role on <#{roles_channel_id}>" if roles_channel_id else "<a:exclamation:1350752095720177684> Get yourself a role in the roles channel."
-                intro_text = f"<a:exclamation:1350752095720177684> Introduce yourself in <#{introduction_channel_id}>" if introduction_channel_id else "<a:exclamation:1350752095720177684> Introduce yourself in the introduction channel."
+        if rules_channel_id:
+            rules_channel = self.bot.get_channel(rules_channel_id)
+            if rules_channel:
+                self.bot.outbound.send(
+                    rules_channel, f"📜 {member.mention}, please read the rules!",
+                    priority=PRIORITY_LOW, delete_after=1
+                )
 
+    @tasks.loop(seconds=15)
+    async def flush_join_digests(self):
+        for guild_id in list(self._digests):
+            member_ids = self._digests.pop(guild_id)
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            try:
+                await self.send_join_digest(guild, member_ids)
+            except Exception as e:
+                print(f"⚠️ Could not send join digest for {guild.name}: {e}")
+            # Lets the detector drop guilds whose storm has passed.
+            self.join_bursts.is_bursting(guild_id)
+
+    async def send_join_digest(self, guild, member_ids):
+        settings = await get_guild_settings(self.bot, guild.id)
+        rules_channel_id = settings.rules_channel
+
+        welcome_channel = self.bot.get_channel(settings.welcome_channel) if settings.welcome_channel else None
+        if welcome_channel:
+            unix_ts = int(utcnow().timestamp())
+            rules_text = f"<a:exclamation:1350752095720177684> Read the rules in <#{rules_channel_id}>" if rules_channel_id else "<a:exclamation:1350752095720177684> Read the rules in the rules channel."
+            for mentions in chunk_mentions(member_ids, 3500):
                 embed = discord.Embed(
-                    title=f"👋 Welcome, {member.name}!",
-                    description=f"We're excited to see you here!\n\n"
+                    title=f"👋 Welcome to our {len(member_ids)} new members!",
+                    description=f"We're excited to see you all here!\n\n"
                                 f"`Welcome to {guild.name}`\n\n"
+                                f"{mentions}\n\n"
                                 f"{rules_text}\n\n"
-                                f"{roles_text}\n\n"
-                                f"{intro_text}\n\n"
-                                f"**Start having fun!** 🎉\n\n"
                                 f"Enjoy your stay! If you have any questions, feel free to ask. | Today at <t:{unix_ts}:t>",
                     color=discord.Color.green()
                 )
                 embed.set_author(name=guild.name, icon_url=guild.icon.url if guild.icon else None)
-                embed.set_thumbnail(url=member.display_avatar.url)
-
-                await welcome_channel.send(embed=embed)
-
-        if rules_channel_id:
-            rules_channel = self.bot.get_channel(rules_channel_id)
-            if rules_channel:
-                msg = await rules_channel.send(f"📜 {member.mention}, please read the rules!")
-                await msg.delete(delay=1)
+                self.bot.outbound.send(welcome_channel, embed=embed, priority=PRIORITY_LOW)
+
+        rules_channel = self.bot.get_channel(rules_channel_id) if rules_channel_id else None
+        if rules_channel:
+            for mentions in chunk_mentions(member_ids, 1900):
+                self.bot.outbound.send(
+                    rules_channel, f"📜 {mentions}, please read the rules!",
+                    priority=PRIORITY_LOW, delete_after=1
+                )
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         guild = member.guild
         guild_id = guild.id
+        member_cache.discard(guild_id, member.id)
 
-            # Get goodbye channel
-        goodbye_channel_id = await get_channel_id(self.bot, guild_id, "goodbye_channel")
+        # Get goodbye channel
+        settings = await get_guild_settings(self.bot, guild_id)
+        goodbye_channel_id = settings.goodbye_channel
 
         if goodbye_channel_id:
             goodbye_channel = self.bot.get_channel(goodbye_channel_id)
             if goodbye_channel:
+                embed = await render_template(self.bot, member, "goodbye")
+                self.bot.outbound.send(goodbye_channel, embed=embed, priority=PRIORITY_LOW)
 
-                embed = discord.Embed(
-                    title=f"👋 Farewell, {member.name}",
-                    description=f"{member.mention} has left **{guild.name}**.\n\n"
-                                f"Thanks for being part of our community.\n"
-                                f"Wish you the best wherever you go! ✨\n\n",
-                    color=discord.Color.red()
-                )
-                embed.set_thumbnail(url=member.display_avatar.url)
-
-                await goodbye_channel.send(embed=embed)
+    @commands.Cog.listener()
+    async def on_guild_update(self, before, after):
+        # Compiled templates bake in the guild name and icon.
+        if before.name != after.name or before.icon != after.icon:
+            template_cache.invalidate(after.id)
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
@@ -109,4 +164,4 @@ class Events(commands.Cog):
             await channel.send(embed=embed)
 
 async def setup(bot):
-    await bot.add_cog(Events(bot))
+    await bot.add_cog(metrics.instrument(Events(bot)))
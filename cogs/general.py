@@ -1,15 +1,61 @@
 # /cogs/general.py
-import discord, random, asyncio, time, re
-from discord.ext import commands
+import discord, random, re
+from discord.ext import commands, tasks
 from discord.ui import View, Button
 from discord import TextChannel
-from discord.utils import utcnow, format_dt
+from discord.utils import utcnow
+from db import database
+from utils import cluster, metrics
+from utils.automod import automod_cache
+from utils.commandsync import sync_commands
+from utils.members import member_cache
+from utils.templates import template_cache
+from config import LOW_MEMORY, COMMAND_SYNC_GUILDS
+
+
+class GiveawayButton(discord.ui.DynamicItem[Button], template=r"giveaway:(?P<id>[0-9]+)"):
+    """Join button that keeps working across restarts via its custom_id."""
+
+    def __init__(self, giveaway_id, disabled=False):
+        super().__init__(Button(
+            label="🎉 Join Giveaway",
+            style=discord.ButtonStyle.green,
+            custom_id=f"giveaway:{giveaway_id}",
+            disabled=disabled
+        ))
+        self.giveaway_id = giveaway_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("General")
+        if cog is None:
+            await interaction.response.send_message("⚠️ Giveaways are unavailable right now.", ephemeral=True)
+            return
+        await cog.join_giveaway(interaction, self.giveaway_id)
+
 
 class General(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.bully_surdi_active = False
         self.surdi_user_id = 609342457301303308
+        # Join clicks are buffered here and written in batches by flush_entries.
+        self._pending_entries = set()
+        self._flushing_entries = set()
+        self._giveaways = {}
+
+    async def cog_load(self):
+        self.bot.add_dynamic_items(GiveawayButton)
+        self.bot.scheduler.register("giveaway_end", self.end_giveaway)
+        self.flush_entries.start()
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(GiveawayButton)
+        self.flush_entries.cancel()
+        await self._flush_entries()
 
     @commands.command()
     async def bully(self, ctx, target: str = None, toggle: str = None):
@@ -36,6 +82,12 @@ class General(commands.Cog):
         if message.author.bot:
             return
 
+        if message.guild is not None:
+            # Keeps recent chatters resolvable without a fetch in low-memory mode.
+            member_cache.put(message.author)
+            if await self.run_automod(message):
+                return
+
         if self.bully_surdi_active:
             for user in message.mentions:
                 if user.id == self.surdi_user_id:
@@ -45,10 +97,165 @@ class General(commands.Cog):
 
 
 
+    async def run_automod(self, message):
+        """Check a message against its guild's compiled rules; True if it was removed."""
+        rules = await automod_cache.get(self.bot, message.guild.id)
+        if not rules or not message.content:
+            return False
+        hit = rules.check(message.content)
+        if hit is None:
+            return False
+        # Moderators are exempt.
+        if isinstance(message.author, discord.Member) and message.author.guild_permissions.manage_messages:
+            return False
+
+        kind, matched = hit
+        try:
+            await message.delete()
+        except discord.HTTPException:
+            pass
+        moderation = self.bot.get_cog("Moderation")
+        if moderation is not None:
+            await moderation.log_action(
+                message.guild, message.guild.me, "Automod", message.author,
+                f"Blocked {kind} `{matched}` in {message.channel.mention}"
+            )
+        return True
+
     @commands.command()
     async def ping(self, ctx):
         await ctx.send(f"🏓 \n Pong! Latency: `{round(self.bot.latency * 1000)}`ams")
 
+    @commands.command()
+    @commands.is_owner()
+    async def cachestats(self, ctx):
+        stats = database.settings_cache.stats()
+        await ctx.send(
+            f"🗂️ Settings cache: `{stats['guilds']}` guilds | "
+            f"hits `{stats['hits']}` | misses `{stats['misses']}` | "
+            f"hit rate `{stats['hit_rate']:.1%}`"
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def queuestats(self, ctx):
+        stats = self.bot.outbound.stats()
+        busiest = sorted(stats.items(), key=lambda item: (item[1]["depth"], item[1]["max_wait"]), reverse=True)[:5]
+        lines = [
+            f"<#{channel_id}>: depth `{s['depth']}` | sent `{s['sent']}` | merged `{s['merged']}` | "
+            f"avg wait `{s['avg_wait']:.2f}s` | max wait `{s['max_wait']:.2f}s`"
+            for channel_id, s in busiest
+        ]
+        autoroles = self.bot.autoroles.stats()
+        lag = f"{autoroles['last_lag']:.2f}s" if autoroles["last_lag"] is not None else "n/a"
+        retries = await database.count_autorole_retries(self.bot)
+        await ctx.send(
+            f"📤 Outbound queue depth: `{self.bot.outbound.depth()}`\n" + ("\n".join(lines) or "No channels queued yet.") +
+            f"\n🎭 Autoroles: queued `{autoroles['queued']}` | applied `{autoroles['applied']}` | "
+            f"waiting to retry `{retries}` | last lag `{lag}`"
+        )
+
+    @commands.command()
+    @commands.is_owner()
+    async def health(self, ctx):
+        await ctx.send(embed=self.bot.health.make_embed())
+
+    @commands.command()
+    @commands.is_owner()
+    async def memory(self, ctx):
+        bot = self.bot
+        rss, peak = metrics.process_memory()
+        lru = member_cache.stats()
+        mode = "low-memory" if LOW_MEMORY else "full member cache"
+        embed = discord.Embed(title="🧠 Memory", color=discord.Color.blurple())
+        embed.description = f"RSS `{rss:.1f} MB` | peak `{peak:.1f} MB` | mode `{mode}`"
+        embed.add_field(name="Gateway cache", value=(
+            f"Guilds `{len(bot.guilds)}` | members `{sum(len(g.members) for g in bot.guilds)}` "
+            f"of `{sum(g.member_count or 0 for g in bot.guilds)}` | users `{len(bot.users)}` | "
+            f"messages `{len(bot.cached_messages)}`"
+        ), inline=False)
+        embed.add_field(name="Member LRU", value=(
+            f"`{lru['members']}/{lru['size']}` | hits `{lru['hits']}` | misses `{lru['misses']}` | fetches `{lru['fetches']}`"
+        ), inline=False)
+        embed.add_field(name="Our caches", value=(
+            f"Settings `{database.settings_cache.stats()['guilds']}` | templates `{len(template_cache)}` | "
+            f"automod `{len(automod_cache)}` | giveaway entries pending `{len(self._pending_entries)}`"
+        ), inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.is_owner()
+    async def dbstats(self, ctx, action: str = None):
+        """Database size and the last retention run; `run` or `vacuum` starts one now."""
+        retention = self.bot.retention
+        if action in ("run", "vacuum"):
+            status = await ctx.send("🗄️ Archiving expired infractions and running maintenance...")
+            await retention.run_once(maintenance=True, vacuum=True if action == "vacuum" else None)
+            await status.delete()
+
+        def mb(size):
+            return f"{size / 1048576:.2f} MB" if size is not None else "n/a"
+
+        stats = await database.table_stats(self.bot)
+        embed = discord.Embed(title=f"🗄️ Database ({database.backend_name()})", color=discord.Color.blurple())
+        embed.description = (
+            f"Size `{mb(stats['database_bytes'])}` | free `{mb(stats['free_bytes'])}` | WAL `{mb(stats['wal_bytes'])}`"
+        )
+        embed.add_field(name="Infractions", value=(
+            f"Active `{stats['rows']['infractions']}` rows, `{mb(stats['tables']['infractions'])}` | "
+            f"archived `{stats['rows']['archived_infractions']}` in `{stats['rows']['infraction_archive']}` "
+            f"blobs, `{mb(stats['tables']['infraction_archive'])}`"
+        ), inline=False)
+        last = retention.last_run
+        if last is not None:
+            before, after = last["before"], last["after"]
+            maintenance = last["maintenance"]
+            done = "no maintenance"
+            if maintenance:
+                done = ("vacuumed" if maintenance["vacuumed"] else "analyzed") + (", WAL checkpointed" if maintenance["checkpointed"] else "")
+            embed.add_field(name="Last retention run", value=(
+                f"<t:{int(last['at'])}:R> in `{last['seconds']:.1f}s` | archived `{last['archived']}` | {done}\n"
+                f"Database `{mb(before['database_bytes'])}` → `{mb(after['database_bytes'])}` | "
+                f"infractions `{mb(before['tables']['infractions'])}` → `{mb(after['tables']['infractions'])}`"
+            ), inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.is_owner()
+    async def synccommands(self, ctx):
+        """Sync slash commands now, even if their hash has not changed."""
+        try:
+            results = await sync_commands(self.bot, COMMAND_SYNC_GUILDS, force=True)
+        except discord.HTTPException as e:
+            await ctx.send(f"❌ Sync failed: {e}")
+            return
+        lines = []
+        for result in results:
+            scope = f"Guild `{result['scope']}`" if result["scope"] else "Global"
+            lines.append(f"{scope}: `{result['commands']}` commands")
+        await ctx.send("🔄 Synced app commands.\n" + "\n".join(lines))
+
+    @commands.command()
+    @commands.is_owner()
+    async def shards(self, ctx):
+        # Stats from every cluster process, read from the shared database.
+        totals = cluster.aggregate(await database.get_cluster_stats(self.bot))
+        if not totals["clusters"]:
+            await cluster.publish_stats(self.bot, self.bot.cluster_id)
+            totals = cluster.aggregate(await database.get_cluster_stats(self.bot))
+
+        embed = discord.Embed(title="🧩 Shards", color=discord.Color.blurple())
+        latency = f"{totals['latency'] * 1000:.0f}ms" if totals["latency"] is not None else "n/a"
+        embed.description = f"**{totals['shards']}** shards | **{totals['guilds']}** guilds | avg latency `{latency}`"
+        for c in totals["clusters"][:25]:
+            c_latency = f"{c['latency'] * 1000:.0f}ms" if c["latency"] is not None else "n/a"
+            embed.add_field(
+                name=f"Cluster {c['cluster_id']}{' ⚠️ stale' if c['stale'] else ''}",
+                value=f"Shards `{c['shards']}` | Guilds `{c['guilds']}` | `{c_latency}`",
+                inline=False
+            )
+        await ctx.send(embed=embed)
+
     @commands.command()
     async def serverinfo(self, ctx):
         guild = ctx.guild
@@ -77,7 +284,7 @@ class General(commands.Cog):
         embed.add_field(name=".serverinfo", value="Provides server information.", inline=False)
         embed.add_field(name=".gamehelp", value="List of Game's commands.", inline=False)
         embed.add_field(name=".modhelp", value="List of admin's commands help.", inline=False)
-        embed.add_field(name=".giveaway", value="To create a Giveaway.", inline=False)
+        embed.add_field(name=".giveaway", value="To create or reroll a Giveaway.", inline=False)
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -87,12 +294,20 @@ class General(commands.Cog):
             color=discord.Color.blue()
         )
         embed.add_field(name=".channelhelp", value="(Admin) Set welcome, rules, or heartbeat channels.", inline=False)
-        embed.add_field(name=".infraction", value="To see Member's list of infractions.", inline=False)
+        embed.add_field(name=".infraction <@member> [archived]", value="To see Member's list of infractions, or the archived ones.", inline=False)
         embed.add_field(name=".clearinfractions", value="To clear member's infractions.", inline=False)
+        embed.add_field(name=".exportinfractions [@member] [csv/jsonl]", value="To download infractions as a file.", inline=False)
+        embed.add_field(name=".importinfractions", value="To import infractions from an attached export file.", inline=False)
+        embed.add_field(name=".retention <set/remove> <action> [days]", value="To archive old infractions of a type after a number of days.", inline=False)
         embed.add_field(name=".mute", value="To mute a member.", inline=False)
+        embed.add_field(name=".setupmute", value="To create the Muted role and apply it to every channel.", inline=False)
         embed.add_field(name=".kick", value="To kick a member.", inline=False)
         embed.add_field(name=".ban", value="To ban a member.", inline=False)
+        embed.add_field(name=".tempban <@user> <duration>", value="To ban a member for a limited time.", inline=False)
+        embed.add_field(name=".massban [ids...] [joined:10m] [delete:1d] [reason]", value="To ban many accounts at once, e.g. everyone who joined during a raid.", inline=False)
         embed.add_field(name=".ar <add/remove/list>", value="To add, remove or see autorole list ", inline=False)
+        embed.add_field(name=".automod <add/remove/list>", value="To manage blocked words and links.", inline=False)
+        embed.add_field(name=".purge [@member] <amount> [match:regex] [attachments] [after:2d] [before:1h]", value="To delete messages in bulk. `.purge cancel` stops a running purge.", inline=False)
         embed.add_field(name=".say", value="To send a message using Bot's embed feature.", inline=False)
         await ctx.send(embed=embed)
 
@@ -122,6 +337,8 @@ class General(commands.Cog):
         embed.add_field(name=".setchannel role", value="Set your role selection channel.", inline=False)
         embed.add_field(name=".setchannel introduction", value="Set your introduction channel.", inline=False)
         embed.add_field(name=".setchannel list", value="Set your member infractions.", inline=False)
+        embed.add_field(name=".settemplate <welcome/goodbye>", value="Customize the welcome or goodbye message (title:, description:, color:).", inline=False)
+        embed.add_field(name=".welcomepreview [welcome/goodbye]", value="Preview the welcome or goodbye message.", inline=False)
         await ctx.send(embed=embed)
 
 
@@ -150,27 +367,96 @@ class General(commands.Cog):
                 total_seconds += int(value) * time_units[unit]
         return total_seconds
 
-    class GiveawayView(View):
-        def __init__(self, timeout):
-            super().__init__(timeout=timeout)
-            self.participants = set()
+    @tasks.loop(seconds=2)
+    async def flush_entries(self):
+        try:
+            await self._flush_entries()
+        except Exception as e:
+            # An exception would stop the loop; the entries are retried on the next tick.
+            print(f"⚠️ Could not save giveaway entries: {e}")
 
-        @discord.ui.button(label="🎉 Join Giveaway", style=discord.ButtonStyle.green)
-        async def join_button(self, interaction: discord.Interaction, button: Button):
-            if interaction.user.id not in self.participants:
-                self.participants.add(interaction.user.id)
-                await interaction.response.send_message("✅ You've joined the giveaway!", ephemeral=True)
-            else:
-                await interaction.response.send_message("⚠️ You already joined!", ephemeral=True)
+    async def _flush_entries(self):
+        if not self._pending_entries:
+            return
+        self._flushing_entries, self._pending_entries = self._pending_entries, set()
+        try:
+            await database.add_giveaway_entries(self.bot, self._flushing_entries)
+        except Exception:
+            # Kept for the next flush instead of dropping everyone who just joined.
+            self._pending_entries |= self._flushing_entries
+            raise
+        finally:
+            self._flushing_entries = set()
+
+    async def get_giveaway(self, giveaway_id):
+        giveaway = self._giveaways.get(giveaway_id)
+        if giveaway is None:
+            giveaway = await database.get_giveaway(self.bot, giveaway_id)
+            if giveaway is not None:
+                self._giveaways[giveaway_id] = giveaway
+        return giveaway
+
+    async def join_giveaway(self, interaction: discord.Interaction, giveaway_id):
+        giveaway = await self.get_giveaway(giveaway_id)
+        if giveaway is None or giveaway["ended"]:
+            await interaction.response.send_message("❌ This giveaway has already ended.", ephemeral=True)
+            return
+
+        entry = (giveaway_id, interaction.user.id)
+        if (entry in self._pending_entries or entry in self._flushing_entries
+                or await database.has_giveaway_entry(self.bot, *entry)):
+            await interaction.response.send_message("⚠️ You already joined!", ephemeral=True)
+            return
+
+        self._pending_entries.add(entry)
+        await interaction.response.send_message("✅ You've joined the giveaway!", ephemeral=True)
+
+    async def pick_winners(self, giveaway_id, winners):
+        """Draw distinct winners by random index, one indexed lookup each."""
+        total = await database.count_giveaway_entries(self.bot, giveaway_id)
+        offsets = random.sample(range(total), max(0, min(winners, total)))
+        return [await database.get_giveaway_entry_at(self.bot, giveaway_id, offset) for offset in offsets]
+
+    async def end_giveaway(self, action):
+        giveaway_id = action["target_id"]
+        await self._flush_entries()
+        giveaway = await database.get_giveaway(self.bot, giveaway_id)
+        if giveaway is None or giveaway["ended"]:
+            return
+
+        # The scheduler only fires this for guilds we serve, so a missing channel was deleted.
+        channel = self.bot.get_channel(giveaway["channel_id"])
+        await database.mark_giveaway_ended(self.bot, giveaway_id)
+        self._giveaways.pop(giveaway_id, None)
+        if channel is None:
+            return
+
+        if giveaway["message_id"]:
+            view = View(timeout=None)
+            view.add_item(GiveawayButton(giveaway_id, disabled=True))
+            try:
+                await channel.get_partial_message(giveaway["message_id"]).edit(view=view)
+            except discord.HTTPException:
+                pass
+
+        winner_ids = await self.pick_winners(giveaway_id, giveaway["winners"])
+        if winner_ids:
+            winner_mentions = ", ".join(f"<@{w}>" for w in winner_ids)
+            self.bot.outbound.send(channel, f"🎉 Congratulations {winner_mentions}! You won **{giveaway['prize']}**!")
+        else:
+            self.bot.outbound.send(channel, "No one joined the giveaway 😢.")
 
     @commands.group()
     @commands.has_permissions(manage_messages=True)
     async def giveaway(self, ctx):
         if ctx.invoked_subcommand is None:
-            await ctx.send("❌ Usage: `.giveaway create <#channel> <winners> <duration> <prize>`")
+            await ctx.send("❌ Usage: `.giveaway create <#channel> <winners> <duration> <prize>` or `.giveaway reroll <message id> [winners]`")
 
     @giveaway.command()
     async def create(self, ctx, channel: TextChannel, winners: int, duration: str, *, prize: str):
+        if winners < 1:
+            await ctx.send("❌ There must be at least 1 winner.")
+            return
         total_seconds = self.parse_time(duration)
         if total_seconds < 30:
             await ctx.send("❌ Duration must be at least 30 seconds.")
@@ -191,19 +477,35 @@ class General(commands.Cog):
             color=discord.Color.gold()
         )
 
-        view = self.GiveawayView(timeout=total_seconds)
-        await channel.send(embed=embed, view=view)
+        giveaway_id = await database.create_giveaway(
+            self.bot, ctx.guild.id, channel.id, ctx.author.id, prize, winners, end_timestamp
+        )
+        view = View(timeout=None)
+        view.add_item(GiveawayButton(giveaway_id))
+        message = await channel.send(embed=embed, view=view)
+        await database.set_giveaway_message(self.bot, giveaway_id, message.id)
+        await self.bot.scheduler.schedule(ctx.guild.id, "giveaway_end", giveaway_id, end_timestamp)
         await ctx.send(f"✅ Giveaway started in {channel.mention} for **{prize}**!")
 
-        await asyncio.sleep(total_seconds)
-        view.stop()
+    @giveaway.command()
+    async def reroll(self, ctx, message_id: int, winners: int = 1):
+        if winners < 1:
+            await ctx.send("❌ There must be at least 1 winner.")
+            return
+        giveaway = await database.get_giveaway_by_message(self.bot, ctx.guild.id, message_id)
+        if giveaway is None:
+            await ctx.send("❌ No giveaway found for that message.")
+            return
+        if not giveaway["ended"]:
+            await ctx.send("❌ That giveaway hasn't ended yet.")
+            return
 
-        if view.participants:
-            winner_ids = random.sample(list(view.participants), min(winners, len(view.participants)))
-            winner_mentions = ", ".join(ctx.guild.get_member(w).mention for w in winner_ids if ctx.guild.get_member(w))
-            await channel.send(f"🎉 Congratulations {winner_mentions}! You won **{prize}**!")
-        else:
-            await channel.send("No one joined the giveaway 😢.")
+        winner_ids = await self.pick_winners(giveaway["id"], winners)
+        if not winner_ids:
+            await ctx.send("No one joined that giveaway 😢.")
+            return
+        winner_mentions = ", ".join(f"<@{w}>" for w in winner_ids)
+        await ctx.send(f"🎉 New winner(s): {winner_mentions}! You won **{giveaway['prize']}**!")
 
     @commands.command()
     async def roll(self, ctx, dice: str):
@@ -219,4 +521,4 @@ class General(commands.Cog):
 
 
 async def setup(bot):
-    await bot.add_cog(General(bot))
+    await bot.add_cog(metrics.instrument(General(bot)))
@@ -1,15 +1,156 @@
 # /cogs/moderation.py
-import discord, time, re, asyncio
+import discord, time, re, asyncio, datetime, tempfile, csv
+import aiohttp
+from collections import OrderedDict
 from discord.ext import commands
 from discord import app_commands
 from discord.ui import View, Button
 from discord.utils import utcnow
-from db.database import get_channel_id, set_channel_id, remove_channel_id, ensure_guild_exists, log_infraction, get_infractions
+from db.database import get_channel_id, set_channel_id, remove_channel_id, get_guild_settings, set_guild_setting, log_infraction
+from db.database import count_infractions, get_infractions_page, clear_infractions, log_infractions, get_recent_joins
+from db.database import count_archived_infractions, get_archived_infractions
+from db.database import get_retention_policies, set_retention_policy, remove_retention_policy
+from db.database import INFRACTION_EXPORT_COLUMNS, count_guild_infractions, iter_infractions, import_infractions
 from db.database import add_autorole, remove_autorole, get_autoroles
+from db.database import set_message_template, delete_message_template
+from db.database import get_automod_rules, add_automod_rules, remove_automod_rules
+from utils.outbound import PRIORITY_MODERATION
+from utils.automod import RULE_KINDS, automod_cache
+from utils.permissions import rollout_overwrites
+from utils.purge import PurgeFilter, PurgeJob
+from utils.members import CachedMember, member_cache
+from utils.export import EXPORT_FORMATS, COMPRESS_ABOVE_ROWS, ExportWriter, open_import, read_rows, read_infraction_batch
+from utils import metrics
+from utils.retention import RETENTION_ACTIONS
+from utils.templates import TEMPLATE_KINDS, render_template, template_cache, template_error
+
+INFRACTIONS_PER_PAGE = 5
+IMPORT_BATCH = 500
+IMPORT_MAX_BYTES = 100 * 1024 * 1024
+# Guild.bulk_ban accepts at most 200 users per request.
+BULK_BAN_CHUNK = 200
+MASSBAN_MAX = 5000
+_USER_ID_RE = re.compile(r"<@!?([0-9]{15,20})>|([0-9]{15,20})")
+MUTED_OVERWRITE = discord.PermissionOverwrite(send_messages=False, speak=False, add_reactions=False)
+
+
+class JumpToPageModal(discord.ui.Modal, title="Jump to page"):
+    page = discord.ui.TextInput(label="Page number", max_length=6)
+
+    def __init__(self, paginator):
+        super().__init__()
+        self.paginator = paginator
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            page = int(self.page.value) - 1
+        except ValueError:
+            await interaction.response.send_message("❌ Please enter a page number.", ephemeral=True)
+            return
+        await self.paginator.show(interaction, page)
+
+
+class InfractionView(View):
+    """Pages through a member's infractions, fetching one page at a time.
+
+    Only the last few pages shown are kept in memory. Pages reached by
+    stepping forward or back are fetched by keyset from a neighbouring
+    page's boundary; jumps to an unseen page fall back to an OFFSET query.
+    """
+
+    title = "Infractions"
+
+    def __init__(self, bot, guild_id, member, total, cache_size=4, archived=0):
+        super().__init__()
+        self.bot = bot
+        self.guild_id = guild_id
+        self.member = member
+        self.archived = archived
+        self.page = 0
+        self.pages = max(1, -(-total // INFRACTIONS_PER_PAGE))
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._after = {}
+
+    async def fetch(self, page):
+        if page in self._cache:
+            self._cache.move_to_end(page)
+            return self._cache[page]
+
+        after = self._after.get(page)
+        rows = await get_infractions_page(
+            self.bot, self.guild_id, self.member.id,
+            limit=INFRACTIONS_PER_PAGE,
+            after=after,
+            offset=0 if after else page * INFRACTIONS_PER_PAGE
+        )
+        if rows:
+            self._after[page + 1] = (rows[-1]["timestamp"], rows[-1]["id"])
+
+        self._cache[page] = rows
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return rows
+
+    def make_embed(self, page, rows):
+        embed = discord.Embed(
+            title=f"{self.title} for {self.member} (Page {page+1}/{self.pages})",
+            color=discord.Color.blurple()
+        )
+        for idx, inf in enumerate(rows, start=page * INFRACTIONS_PER_PAGE + 1):
+            embed.add_field(
+                name=f"{idx}. {inf['action']}",
+                value=f"Reason: {inf['reason']} | Mod: <@{inf['mod_id']}> | Date: <t:{inf['timestamp']}:F>",
+                inline=False
+            )
+        if self.archived:
+            embed.set_footer(text=f"📦 {self.archived} older infraction(s) archived. Use .infraction <member> archived")
+        return embed
+
+    async def show(self, interaction: discord.Interaction, page):
+        page = min(max(page, 0), self.pages - 1)
+        rows = await self.fetch(page)
+        self.page = page
+        await interaction.response.edit_message(embed=self.make_embed(page, rows), view=self)
+
+    @discord.ui.button(label="⬅️", style=discord.ButtonStyle.grey)
+    async def previous(self, interaction: discord.Interaction, button: Button):
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(label="➡️", style=discord.ButtonStyle.grey)
+    async def next(self, interaction: discord.Interaction, button: Button):
+        await self.show(interaction, self.page + 1)
+
+    @discord.ui.button(label="🔢 Page", style=discord.ButtonStyle.grey)
+    async def jump(self, interaction: discord.Interaction, button: Button):
+        await interaction.response.send_modal(JumpToPageModal(self))
+
+
+class ArchivedInfractionView(InfractionView):
+    """InfractionView over a member's archived infractions, decompressed up front."""
+
+    title = "Archived infractions"
+
+    def __init__(self, bot, guild_id, member, rows):
+        super().__init__(bot, guild_id, member, len(rows))
+        self.rows = rows
+
+    async def fetch(self, page):
+        start = page * INFRACTIONS_PER_PAGE
+        return self.rows[start:start + INFRACTIONS_PER_PAGE]
+
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # guild id -> running Muted role permission rollout
+        self._rollouts = {}
+        # channel id -> running PurgeJob
+        self._purges = {}
+
+    async def cog_load(self):
+        self.bot.scheduler.register("unmute", self.expire_mute)
+        self.bot.scheduler.register("unban", self.expire_ban)
 
 # ---------------- Slash Commands ----------------
     @app_commands.command(name="setchannel", description="(Admin) Set moderation or system channels.")
@@ -37,7 +178,6 @@ class Moderation(commands.Cog):
 
         guild_id = interaction.guild.id
         column_name = f"{channel_type.value}_channel"
-        await ensure_guild_exists(self.bot, guild_id)
 
         current_channel_id = await get_channel_id(self.bot, guild_id, column_name)
         if current_channel_id == channel.id:
@@ -62,7 +202,6 @@ class Moderation(commands.Cog):
 
         column_name = f"{channel_type.lower()}_channel"
         guild_id = ctx.guild.id
-        await ensure_guild_exists(self.bot, guild_id)
 
         current_channel_id = await get_channel_id(self.bot, guild_id, column_name)
         if current_channel_id == channel.id:
@@ -105,95 +244,185 @@ class Moderation(commands.Cog):
         await ctx.send(embed=embed)
 
     @commands.command()
-    async def welcomepreview(self, ctx):
+    async def welcomepreview(self, ctx, kind: str = "welcome"):
         if not ctx.author.guild_permissions.manage_guild:
             await ctx.send("You need the 'Manage Server' permission to use this command!", delete_after=5)
             return
 
-        guild = ctx.guild
-        guild_id = guild.id
-        member = ctx.author
-
-        welcome_channel_id = await get_channel_id(self.bot, guild_id, "welcome_channel")
-        rules_channel_id = await get_channel_id(self.bot, guild_id, "rules_channel")
-        roles_channel_id = await get_channel_id(self.bot, guild_id, "role_channel")
-        introduction_channel_id = await get_channel_id(self.bot, guild_id, "introduction_channel")
-
-        now = utcnow()
-        unix_ts = int(now.timestamp())  # "Today at" is added manually below
-
-        rules_text = f"<a:exclamation:1350752095720177684> Read the rules in <#{rules_channel_id}>" if rules_channel_id else "<a:exclamation:1350752095720177684> Read the rules in the rules channel."
-        roles_text = f"<a:exclamation:1350752095720177684> Get yourself a role on <#{roles_channel_id}>" if roles_channel_id else "<a:exclamation:1350752095720177684> Get yourself a role in the roles channel."
-        intro_text = f"<a:exclamation:1350752095720177684> Introduce yourself in <#{introduction_channel_id}>" if introduction_channel_id else "<a:exclamation:1350752095720177684> Introduce yourself in the introduction channel."
-
-        description_text = (
-            f"We're excited to see you here!\n\n"
-            f"`Welcome to {guild.name}`\n\n"
-            f"{rules_text}\n\n"
-            f"{roles_text}\n\n"
-            f"{intro_text}\n\n"
-            f"Enjoy your stay! If you have any questions, feel free to ask. | Today at <t:{unix_ts}:t>"
-        )
-
-        embed = discord.Embed(
-            title=f"👋 Welcome, {member.name}!",
-            description=description_text,
-            color=discord.Color.green()
-        )
-
-        embed.set_author(name=guild.name, icon_url=guild.icon.url if guild.icon else None)
-        embed.set_thumbnail(url=member.display_avatar.url)
+        if kind.lower() not in TEMPLATE_KINDS:
+            await ctx.send("❌ Invalid type! Use `welcome` or `goodbye`.", delete_after=5)
+            return
 
+        # Same cached render path as on_member_join/on_member_remove.
+        embed = await render_template(self.bot, ctx.author, kind.lower())
         await ctx.send(embed=embed)
 
-
-
     @commands.command()
-    @commands.has_permissions(manage_messages=True)
-    async def purge(self, ctx, *args):
-        if not ctx.author.guild_permissions.manage_messages:
-            await ctx.send("❌ You need the `Manage Messages` permission to use this command.", delete_after=5)
+    async def settemplate(self, ctx, kind: str, *, message: str):
+        if not ctx.author.guild_permissions.manage_guild:
+            await ctx.send("❌ You need manage server permissions!", delete_after=3)
             return
-        
-        if len(args) == 0:
-            await ctx.send("❌ Usage: `.purge [@member] <amount>`", delete_after=5)
+
+        kind = kind.lower()
+        if kind not in TEMPLATE_KINDS:
+            await ctx.send("❌ Invalid type! Use `welcome` or `goodbye`.", delete_after=3)
             return
 
+        # Same `key: value` format as .say, continuation lines included.
+        content = {"title": "", "description": "", "color": ""}
+        current_key = None
+        for line in message.splitlines():
+            if ':' in line and line.split(':', 1)[0].lower() in content:
+                key, value = line.split(':', 1)
+                current_key = key.strip().lower()
+                content[current_key] = value.strip()
+            elif current_key:
+                content[current_key] += '\n' + line.strip()
 
-        if len(args) == 1:
+        color = None
+        if content["color"]:
             try:
-                limit = int(args[0])
+                color = discord.Color.from_str(content["color"]).value
             except ValueError:
-                await ctx.send("❌ Please provide a valid number of messages to purge.", delete_after=5)
+                await ctx.send("❌ Invalid color! Use a hex code like `#57F287`.", delete_after=3)
                 return
-            member = None
 
-        else:
-            try:
-                member = await commands.MemberConverter().convert(ctx, args[0])
-                limit = int(args[1])
-            except (commands.BadArgument, ValueError):
-                await ctx.send("❌ Usage: `.purge [@member] <amount>`", delete_after=5)
+        for key in ("title", "description"):
+            error = template_error(content[key])
+            if error:
+                await ctx.send(f"❌ Invalid {key}: {error}. Use `{{{{` and `}}}}` for literal braces.", delete_after=5)
                 return
 
-        if limit > 100:
-            await ctx.send("❌ You can only purge up to 100 messages at a time.", delete_after=5)
+        await set_message_template(
+            self.bot, ctx.guild.id, kind, content["title"] or None, content["description"] or None, color
+        )
+        template_cache.invalidate(ctx.guild.id)
+        await ctx.send(
+            f"✅ {kind.capitalize()} template updated. Preview it with `.welcomepreview {kind}`.\n"
+            f"Placeholders: `{{member_name}}`, `{{member_mention}}`, `{{member_count}}`, `{{guild_name}}`, "
+            f"`{{rules_channel}}`, `{{role_channel}}`, `{{introduction_channel}}`, `{{time}}`"
+        )
+
+    @commands.command()
+    async def resettemplate(self, ctx, kind: str):
+        if not ctx.author.guild_permissions.manage_guild:
+            await ctx.send("❌ You need manage server permissions!", delete_after=3)
             return
 
-        def check(m):
-            return m.author == member if member else True
+        kind = kind.lower()
+        if kind not in TEMPLATE_KINDS:
+            await ctx.send("❌ Invalid type! Use `welcome` or `goodbye`.", delete_after=3)
+            return
+
+        await delete_message_template(self.bot, ctx.guild.id, kind)
+        template_cache.invalidate(ctx.guild.id)
+        await ctx.send(f"✅ {kind.capitalize()} template reset to the default.")
 
-        deleted = await ctx.channel.purge(limit=limit, check=check)
-        if member:
-            await ctx.send(f"✅ Deleted {len(deleted)} messages from {member.mention}.", delete_after=5)
-        else:
-            await ctx.send(f"✅ Deleted {len(deleted)} messages.", delete_after=5)
+
+
+    @commands.group(invoke_without_command=True)
+    @commands.has_permissions(manage_messages=True)
+    async def purge(self, ctx, *args):
+        usage = ("❌ Usage: `.purge [@member ...] <amount> [match:regex] [attachments] "
+                 "[after:2d] [before:1h] [scan:5000]` or `.purge cancel`")
+        if not args:
+            await ctx.send(usage, delete_after=10)
+            return
+
+        if ctx.channel.id in self._purges:
+            await ctx.send("❌ A purge is already running here. Use `.purge cancel` to stop it.", delete_after=5)
+            return
+
+        amount, scan_limit, authors, pattern, attachments, after, before = None, None, [], None, False, None, None
+        for arg in args:
+            key, sep, value = arg.partition(":")
+            key = key.lower()
+            if sep and key in ("match", "regex"):
+                try:
+                    pattern = re.compile(value, re.IGNORECASE)
+                except re.error as e:
+                    await ctx.send(f"❌ Invalid regex: {e}", delete_after=5)
+                    return
+            elif sep and key in ("after", "before"):
+                seconds = self.parse_time(value)
+                if not seconds:
+                    await ctx.send(f"❌ Invalid duration `{value}`. Use e.g. `30m`, `2h`, `7d`.", delete_after=5)
+                    return
+                cutoff = utcnow() - datetime.timedelta(seconds=seconds)
+                if key == "after":
+                    after = cutoff
+                else:
+                    before = cutoff
+            elif sep and key == "scan" and value.isdigit():
+                scan_limit = int(value)
+            elif key in ("attachments", "files"):
+                attachments = True
+            elif arg.isdigit() and len(arg) < 15 and amount is None:
+                amount = int(arg)
+            else:
+                try:
+                    authors.append(await CachedMember().convert(ctx, arg))
+                except commands.BadArgument:
+                    await ctx.send(usage, delete_after=10)
+                    return
+
+        if not amount:
+            await ctx.send(usage, delete_after=10)
+            return
+
+        purge_filter = PurgeFilter(
+            author_ids={m.id for m in authors}, pattern=pattern, attachments=attachments,
+            after=after, before=before or ctx.message
+        )
+        if scan_limit is None and purge_filter.narrowed:
+            # Matching messages are spread out, so look further back than `amount`.
+            scan_limit = amount * 10
+        status = await ctx.send(f"🧹 Purging up to `{amount}` messages...")
+
+        async def progress(job):
+            await status.edit(content=f"🧹 Scanned `{job.scanned}` | deleted `{job.deleted}` | {job.elapsed:.0f}s "
+                                      f"(`.purge cancel` to stop)")
+
+        job = PurgeJob(
+            ctx.channel, purge_filter, limit=amount, scan_limit=scan_limit,
+            reason=f"Purge by {ctx.author}", progress=progress
+        )
+        self._purges[ctx.channel.id] = job
+        try:
+            await job.run()
+        finally:
+            self._purges.pop(ctx.channel.id, None)
+
+        who = f" from {', '.join(m.mention for m in authors)}" if authors else ""
+        summary = f"✅ Deleted {job.deleted} messages{who}."
+        if job.cancelled:
+            summary = f"⏹️ Purge cancelled. Deleted {job.deleted} messages{who}."
+        if job.failed:
+            summary += f" ⚠️ {job.failed} could not be deleted."
+        try:
+            await status.edit(content=summary, delete_after=10)
+        except discord.HTTPException:
+            await ctx.send(summary, delete_after=10)
+        try:
+            await ctx.message.delete()
+        except discord.HTTPException:
+            pass
+
+    @purge.command(name="cancel")
+    @commands.has_permissions(manage_messages=True)
+    async def purge_cancel(self, ctx):
+        job = self._purges.get(ctx.channel.id)
+        if job is None:
+            await ctx.send("❌ No purge is running in this channel.", delete_after=5)
+            return
+        job.cancel()
+        await ctx.message.add_reaction("✅")
 
 
     # Utility for time parsing
     def parse_time(self, time_str):
         time_units = {"m": 60, "h": 3600, "d": 86400, "mo": 2592000, "y": 31536000}
-        pattern = r"(\\d+)([a-zA-Z]+)"
+        pattern = r"(\d+)([a-zA-Z]+)"
         matches = re.findall(pattern, time_str)
         total_seconds = 0
         for value, unit in matches:
@@ -204,62 +433,176 @@ class Moderation(commands.Cog):
 
     # Centralized log function
     async def mod_log(self, ctx, action: str, member: discord.Member, reason: str, duration: str = None):
-        guild_id = ctx.guild.id
-        log_channel_id = await get_channel_id(self.bot, guild_id, "log_channel")
-        list_channel_id = await get_channel_id(self.bot, guild_id, "list_channel")
+        await self.log_action(ctx.guild, ctx.author, action, member, reason, duration)
+
+    # Same as mod_log for actions without a command context (e.g. automod)
+    async def log_action(self, guild, moderator, action: str, member: discord.Member, reason: str, duration: str = None):
+        guild_id = guild.id
+        settings = await get_guild_settings(self.bot, guild_id)
+        log_channel_id = settings.log_channel
+        list_channel_id = settings.list_channel
 
         # ✅ DB logging here
-        await log_infraction(self.bot, guild_id, member.id, ctx.author.id, action, reason, int(time.time()))
+        await log_infraction(self.bot, guild_id, member.id, moderator.id, action, reason, int(time.time()))
 
         # Mod Log Text
         if log_channel_id:
-            log_channel = ctx.guild.get_channel(log_channel_id)
-            await log_channel.send(f"{action} | {member} | by {ctx.author} | Reason: {reason}")
+            log_channel = guild.get_channel(log_channel_id)
+            if log_channel:
+                # Consecutive plain log lines are merged into one message when queued together.
+                self.bot.outbound.send(
+                    log_channel, f"{action} | {member} | by {moderator} | Reason: {reason}",
+                    priority=PRIORITY_MODERATION, merge=True
+                )
 
         # Infractions Embed
-        if list_channel_id:
+        list_channel = guild.get_channel(list_channel_id) if list_channel_id else None
+        if list_channel:
             now = int(time.time())
-            list_channel = ctx.guild.get_channel(list_channel_id)
             embed = discord.Embed(
                 title=f"Infraction: {action} User",
                 color=discord.Color.red() if action in ["Banned", "Muted"] else discord.Color.orange()
             )
             embed.add_field(name="User", value=f"{member} | {member.mention}", inline=False)
-            embed.add_field(name="Mod", value=f"{ctx.author} | {ctx.author.mention}", inline=False)
+            embed.add_field(name="Mod", value=f"{moderator} | {moderator.mention}", inline=False)
             embed.add_field(name="Time/Duration", value=f"<t:{now}:F>{f' | Expires: {duration}' if duration else ''}", inline=False)
             embed.add_field(name="Reason", value=reason, inline=False)
-            await list_channel.send(embed=embed)
+            self.bot.outbound.send(list_channel, embed=embed, priority=PRIORITY_MODERATION)
+
+    async def log_bulk_action(self, guild, moderator, action: str, user_ids, reason: str):
+        """log_action for many members at once: one transaction and one summary entry per channel."""
+        now = int(time.time())
+        await log_infractions(self.bot, guild.id, user_ids, moderator.id, action, reason, now)
+
+        settings = await get_guild_settings(self.bot, guild.id)
+        log_channel = guild.get_channel(settings.log_channel) if settings.log_channel else None
+        if log_channel:
+            self.bot.outbound.send(
+                log_channel, f"{action} {len(user_ids)} users | by {moderator} | Reason: {reason}",
+                priority=PRIORITY_MODERATION, merge=True
+            )
+
+        list_channel = guild.get_channel(settings.list_channel) if settings.list_channel else None
+        if list_channel:
+            shown = " ".join(f"<@{user_id}>" for user_id in user_ids[:40])
+            if len(user_ids) > 40:
+                shown += f" and {len(user_ids) - 40} more"
+            embed = discord.Embed(title=f"Infraction: {action} {len(user_ids)} Users", color=discord.Color.red())
+            embed.add_field(name="Users", value=shown, inline=False)
+            embed.add_field(name="Mod", value=f"{moderator} | {moderator.mention}", inline=False)
+            embed.add_field(name="Time/Duration", value=f"<t:{now}:F>", inline=False)
+            embed.add_field(name="Reason", value=reason[:1024], inline=False)
+            self.bot.outbound.send(list_channel, embed=embed, priority=PRIORITY_MODERATION)
+
+
+    async def get_muted_role(self, guild, create=False):
+        """Return the guild's Muted role, using the id cached in guild settings.
+
+        Falls back to a name lookup once for guilds set up before the id was
+        stored. With ``create=True`` a missing role is created and its channel
+        overwrites are rolled out in the background.
+        """
+        settings = await get_guild_settings(self.bot, guild.id)
+        muted_role = guild.get_role(settings.muted_role) if settings.muted_role else None
+        if muted_role is not None:
+            return muted_role
 
+        muted_role = discord.utils.get(guild.roles, name="Muted")
+        if muted_role is None:
+            if not create:
+                return None
+            muted_role = await guild.create_role(name="Muted", reason="Muted role for .mute")
+            self.start_mute_rollout(guild, muted_role)
+        await set_guild_setting(self.bot, guild.id, "muted_role", muted_role.id)
+        return muted_role
+
+    def start_mute_rollout(self, guild, muted_role, progress=None):
+        task = self._rollouts.get(guild.id)
+        if task is None or task.done():
+            task = asyncio.create_task(rollout_overwrites(
+                guild.channels, muted_role, MUTED_OVERWRITE,
+                reason="Muted role setup", progress=progress
+            ))
+            self._rollouts[guild.id] = task
+        return task
+
+    @commands.command()
+    @commands.has_permissions(manage_roles=True)
+    async def setupmute(self, ctx):
+        muted_role = await self.get_muted_role(ctx.guild)
+        if muted_role is None:
+            muted_role = await ctx.guild.create_role(name="Muted", reason="Muted role for .mute")
+            await set_guild_setting(self.bot, ctx.guild.id, "muted_role", muted_role.id)
+
+        status = await ctx.send(f"⏳ Applying {muted_role.mention} permissions to `{len(ctx.guild.channels)}` channels...")
+
+        async def progress(result):
+            await status.edit(content=f"⏳ Applying {muted_role.mention} permissions... `{result.done}/{result.total}`")
+
+        result = await self.start_mute_rollout(ctx.guild, muted_role, progress=progress)
+        failed = f" | ❌ failed `{len(result.failed)}`" if result.failed else ""
+        await status.edit(content=(
+            f"✅ {muted_role.mention} is set up: updated `{result.applied}` | "
+            f"already set `{result.skipped}` channels{failed}"
+        ))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        settings = await get_guild_settings(self.bot, channel.guild.id)
+        muted_role = channel.guild.get_role(settings.muted_role) if settings.muted_role else None
+        if muted_role is not None:
+            await rollout_overwrites([channel], muted_role, MUTED_OVERWRITE, reason="Muted role setup")
 
     # MUTE Command
     @commands.command()
     @commands.has_permissions(manage_roles=True)
     async def mute(self, ctx, member: discord.Member, duration: str = None, *, reason="No reason provided"):
-        guild = ctx.guild
-        muted_role = discord.utils.get(guild.roles, name="Muted")
+        seconds = self.parse_time(duration) if duration else 0
+        if duration and not seconds:
+            # Not a duration, so it was the first word of the reason.
+            reason = duration if reason == "No reason provided" else f"{duration} {reason}"
+            duration = None
 
-        if not muted_role:
-            muted_role = await guild.create_role(name="Muted")
-            for channel in guild.channels:
-                await channel.set_permissions(muted_role, send_messages=False, speak=False, add_reactions=False)
+        guild = ctx.guild
+        muted_role = await self.get_muted_role(guild, create=True)
 
         await member.add_roles(muted_role, reason=reason)
         await ctx.send(f"🔇 {member.mention} has been muted for {duration or 'indefinitely'}. Reason: {reason}")
 
         await self.mod_log(ctx, "Muted", member, reason, duration)
 
-        # Auto unmute if timed
-        if duration:
-            seconds = self.parse_time(duration)
-            await asyncio.sleep(seconds)
-            if muted_role in member.roles:
-                await member.remove_roles(muted_role)
-                await ctx.send(f"🔊 {member.mention} has been automatically unmuted.")
+        # Auto unmute if timed; a newer mute replaces any pending unmute.
+        await self.bot.scheduler.cancel(guild.id, "unmute", member.id)
+        if seconds:
+            await self.bot.scheduler.schedule(
+                guild.id, "unmute", member.id, time.time() + seconds,
+                {"channel_id": ctx.channel.id}
+            )
+
+    async def expire_mute(self, action):
+        guild = self.bot.get_guild(action["guild_id"])
+        if guild is None:
+            return
+        # Fresh, since the cached copy may predate the Muted role being added.
+        member = await member_cache.resolve(guild, action["target_id"], fresh=True)
+        if member is None:
+            return
+
+        muted_role = await self.get_muted_role(guild)
+        if muted_role and muted_role in member.roles:
+            await member.remove_roles(muted_role, reason="Mute expired")
+            channel = guild.get_channel((action["payload"] or {}).get("channel_id"))
+            if channel:
+                self.bot.outbound.send(
+                    channel, f"🔊 {member.mention} has been automatically unmuted.",
+                    priority=PRIORITY_MODERATION
+                )
 
     @commands.command()
     @commands.has_permissions(manage_roles=True)
     async def unmute(self, ctx, member: discord.Member):
-        muted_role = discord.utils.get(ctx.guild.roles, name="Muted")
+        muted_role = await self.get_muted_role(ctx.guild)
+        await self.bot.scheduler.cancel(ctx.guild.id, "unmute", member.id)
         if muted_role in member.roles:
             await member.remove_roles(muted_role)
             await ctx.send(f"🔊 {member.mention} has been unmuted.")
@@ -269,7 +612,7 @@ class Moderation(commands.Cog):
     # KICK Command
     @commands.command()
     @commands.has_permissions(kick_members=True)
-    async def kick(self, ctx, member: discord.Member, *, reason="No reason provided"):
+    async def kick(self, ctx, member: CachedMember, *, reason="No reason provided"):
         await member.kick(reason=reason)
         await ctx.send(f"👢 {member.mention} has been kicked. Reason: {reason}")
         await self.mod_log(ctx, "Kicked", member, reason)
@@ -277,71 +620,349 @@ class Moderation(commands.Cog):
     # BAN Command
     @commands.command()
     @commands.has_permissions(ban_members=True)
-    async def ban(self, ctx, member: discord.Member, *, reason="No reason provided"):
+    async def ban(self, ctx, member: CachedMember, *, reason="No reason provided"):
         await member.ban(reason=reason)
         await ctx.send(f"⛔ {member.mention} has been banned. Reason: {reason}")
         await self.mod_log(ctx, "Banned", member, reason)
 
+    # TEMPBAN Command
+    @commands.command()
+    @commands.has_permissions(ban_members=True)
+    async def tempban(self, ctx, member: CachedMember, duration: str, *, reason="No reason provided"):
+        seconds = self.parse_time(duration)
+        if not seconds:
+            await ctx.send("❌ Invalid duration! Use something like `30m`, `12h` or `7d`.", delete_after=5)
+            return
+
+        await member.ban(reason=reason)
+        await self.bot.scheduler.schedule(
+            ctx.guild.id, "unban", member.id, time.time() + seconds,
+            {"channel_id": ctx.channel.id}
+        )
+        await ctx.send(f"⛔ {member.mention} has been banned for {duration}. Reason: {reason}")
+        await self.mod_log(ctx, "Banned", member, reason, duration)
+
+    async def expire_ban(self, action):
+        guild = self.bot.get_guild(action["guild_id"])
+        if guild is None:
+            return
+        try:
+            await guild.unban(discord.Object(id=action["target_id"]), reason="Temporary ban expired")
+        except discord.NotFound:
+            return
+
+        channel = guild.get_channel((action["payload"] or {}).get("channel_id"))
+        if channel:
+            self.bot.outbound.send(
+                channel, f"🔓 <@{action['target_id']}> has been automatically unbanned.",
+                priority=PRIORITY_MODERATION
+            )
+
+    def _can_ban(self, ctx, member):
+        me = ctx.guild.me
+        if me is not None and member.top_role >= me.top_role:
+            return False
+        return ctx.author.id == ctx.guild.owner_id or member.top_role < ctx.author.top_role
+
+    # MASSBAN Command
+    @commands.command()
+    @commands.has_permissions(ban_members=True)
+    @commands.bot_has_permissions(ban_members=True)
+    async def massban(self, ctx, *args):
+        usage = "❌ Usage: `.massban [ids or @mentions ...] [joined:10m] [delete:1d] [reason]`"
+        ids, joined, delete_seconds, reason_words = [], None, 86400, []
+        for arg in args:
+            key, sep, value = arg.partition(":")
+            key = key.lower()
+            match = _USER_ID_RE.fullmatch(arg)
+            if match:
+                ids.append(int(match.group(1) or match.group(2)))
+            elif sep and key in ("joined", "delete"):
+                seconds = self.parse_time(value)
+                if not seconds and value != "0":
+                    await ctx.send(f"❌ Invalid duration `{value}`. Use e.g. `10m`, `2h`, `1d`.", delete_after=5)
+                    return
+                if key == "joined":
+                    joined = seconds
+                else:
+                    delete_seconds = min(seconds, 604800)
+            else:
+                reason_words.append(arg)
+        reason = " ".join(reason_words) or "Mass ban"
+
+        if joined:
+            ids.extend(await get_recent_joins(self.bot, ctx.guild.id, time.time() - joined))
+        if not ids:
+            await ctx.send(usage, delete_after=10)
+            return
+
+        targets, skipped = [], 0
+        for user_id in dict.fromkeys(ids):
+            member = ctx.guild.get_member(user_id) or member_cache.get(ctx.guild.id, user_id)
+            if user_id in (ctx.author.id, self.bot.user.id, ctx.guild.owner_id) or (member is not None and not self._can_ban(ctx, member)):
+                skipped += 1
+            else:
+                targets.append(user_id)
+        if not targets:
+            await ctx.send(f"❌ Nobody to ban; skipped `{skipped}` protected account(s).", delete_after=10)
+            return
+        if len(targets) > MASSBAN_MAX:
+            await ctx.send(f"❌ That is `{len(targets)}` accounts; `.massban` handles at most `{MASSBAN_MAX}` at once.", delete_after=10)
+            return
+
+        status = await ctx.send(f"⛔ Banning `{len(targets)}` accounts...")
+        audit_reason = f"Massban by {ctx.author} ({ctx.author.id}): {reason}"[:512]
+        banned, failed, errors = [], [], []
+        for start in range(0, len(targets), BULK_BAN_CHUNK):
+            chunk = targets[start:start + BULK_BAN_CHUNK]
+            try:
+                result = await ctx.guild.bulk_ban(
+                    [discord.Object(id=user_id) for user_id in chunk],
+                    reason=audit_reason, delete_message_seconds=delete_seconds
+                )
+            except discord.HTTPException as e:
+                # Raised when not a single user in the chunk could be banned.
+                failed.extend(chunk)
+                errors.append(e.text or str(e.status))
+            else:
+                banned.extend(user.id for user in result.banned)
+                failed.extend(user.id for user in result.failed)
+            done = min(start + BULK_BAN_CHUNK, len(targets))
+            if done < len(targets):
+                await status.edit(content=(
+                    f"⛔ Banning... `{done}/{len(targets)}` | banned `{len(banned)}` | failed `{len(failed)}`"
+                ))
+
+        for user_id in banned:
+            member_cache.discard(ctx.guild.id, user_id)
+        if banned:
+            await self.log_bulk_action(ctx.guild, ctx.author, "Banned", banned, reason)
+
+        summary = f"{'✅' if not failed else '⚠️'} Banned `{len(banned)}` of `{len(targets)}` accounts."
+        if failed:
+            summary += f" Failed `{len(failed)}`" + (f" ({errors[0]})" if errors else " (already banned or not bannable)") + "."
+            summary += f"\nFailed ids: {' '.join(map(str, failed[:30]))}" + (" ..." if len(failed) > 30 else "")
+        if skipped:
+            summary += f"\nSkipped `{skipped}` protected account(s) (you, me, the owner or higher roles)."
+        await status.edit(content=summary[:2000])
+
     # WARN Command
     @commands.command()
     @commands.has_permissions(kick_members=True)
-    async def warn(self, ctx, member: discord.Member, *, reason="No reason provided"):
+    async def warn(self, ctx, member: CachedMember, *, reason="No reason provided"):
         await ctx.send(f"⚠️ {member.mention} has been warned. Reason: {reason}")
         await self.mod_log(ctx, "Warned", member, reason)
 
     @commands.command(name="infraction")
-    async def infraction(self, ctx, member: discord.Member):
+    async def infraction(self, ctx, member: CachedMember, scope: str = None):
         if not ctx.author.guild_permissions.moderate_members:
             await ctx.send("❌ You need the `Manage Members` permission to use this command.", delete_after=5)
             return
 
-        records = await get_infractions(self.bot, ctx.guild.id, member.id)
-        if not records:
+        if scope and scope.lower() in ("archived", "archive"):
+            # Archived rows are only decompressed when someone asks for them.
+            archived_rows = await get_archived_infractions(self.bot, ctx.guild.id, member.id)
+            if not archived_rows:
+                await ctx.send(f"No archived infractions found for {member}.")
+                return
+            view = ArchivedInfractionView(self.bot, ctx.guild.id, member, archived_rows)
+            await ctx.send(embed=view.make_embed(0, await view.fetch(0)), view=view)
+            return
+
+        total = await count_infractions(self.bot, ctx.guild.id, member.id)
+        archived = await count_archived_infractions(self.bot, ctx.guild.id, member.id)
+        if not total:
+            if archived:
+                await ctx.send(f"No active infractions for {member}; `{archived}` archived. Use `.infraction {member.id} archived` to see them.")
+            else:
+                await ctx.send(f"No infractions found for {member}.")
+            return
+
+        view = InfractionView(self.bot, ctx.guild.id, member, total, archived=archived)
+        rows = await view.fetch(0)
+        await ctx.send(embed=view.make_embed(0, rows), view=view)
+
+    @commands.command(name="clearinfractions")
+    @commands.has_permissions(manage_guild=True)
+    async def clearinfractions(self, ctx, member: CachedMember):
+        if not (await count_infractions(self.bot, ctx.guild.id, member.id)
+                or await count_archived_infractions(self.bot, ctx.guild.id, member.id)):
             await ctx.send(f"No infractions found for {member}.")
             return
 
-        pages = [records[i:i+5] for i in range(0, len(records), 5)]
+        await clear_infractions(self.bot, ctx.guild.id, member.id)
+        await ctx.send(f"✅ Cleared all infractions for {member}.")
 
-        class InfractionView(View):
-            def __init__(self):
-                super().__init__()
-                self.page = 0
+    @commands.command(name="exportinfractions")
+    @commands.has_permissions(moderate_members=True)
+    async def exportinfractions(self, ctx, *args):
+        member, fmt = None, "csv"
+        for arg in args:
+            if arg.lower() in EXPORT_FORMATS:
+                fmt = arg.lower()
+                continue
+            try:
+                member = await CachedMember().convert(ctx, arg)
+            except commands.BadArgument:
+                await ctx.send("❌ Usage: `.exportinfractions [@member] [csv/jsonl]`", delete_after=5)
+                return
 
-            @discord.ui.button(label="⬅️", style=discord.ButtonStyle.grey)
-            async def previous(self, interaction: discord.Interaction, button: Button):
-                if self.page > 0:
-                    self.page -= 1
-                    await interaction.response.edit_message(embed=make_embed(self.page))
+        if member:
+            total = await count_infractions(self.bot, ctx.guild.id, member.id)
+        else:
+            total = await count_guild_infractions(self.bot, ctx.guild.id)
+        if not total:
+            await ctx.send(f"No infractions found for {member or ctx.guild.name}.")
+            return
 
-            @discord.ui.button(label="➡️", style=discord.ButtonStyle.grey)
-            async def next(self, interaction: discord.Interaction, button: Button):
-                if self.page < len(pages) - 1:
-                    self.page += 1
-                    await interaction.response.edit_message(embed=make_embed(self.page))
+        status = await ctx.send(f"📦 Exporting `{total}` infractions...")
+        writer = ExportWriter(
+            INFRACTION_EXPORT_COLUMNS, fmt, compress=total > COMPRESS_ABOVE_ROWS,
+            max_bytes=ctx.guild.filesize_limit,
+            basename=f"infractions-{ctx.guild.id}" + (f"-{member.id}" if member else "")
+        )
+        try:
+            async for row in iter_infractions(self.bot, ctx.guild.id, member.id if member else None):
+                writer.write(row)
+            files = writer.finish()
+            # Discord allows up to 10 attachments per message.
+            for i in range(0, len(files), 10):
+                await ctx.send(files=[discord.File(f, filename=name) for name, f in files[i:i + 10]])
+        finally:
+            writer.discard()
+        await status.edit(content=f"✅ Exported `{writer.rows}` infractions in {len(files)} file(s).")
+
+    @commands.command(name="importinfractions")
+    @commands.has_permissions(manage_guild=True)
+    async def importinfractions(self, ctx):
+        if not ctx.message.attachments:
+            await ctx.send("❌ Attach a `.csv` or `.jsonl` file (optionally `.gz`) from `.exportinfractions`.", delete_after=5)
+            return
+        attachment = ctx.message.attachments[0]
+        if attachment.size > IMPORT_MAX_BYTES:
+            await ctx.send("❌ That file is too large to import.", delete_after=5)
+            return
+        fmt = "jsonl" if ".json" in attachment.filename.lower() else "csv"
+
+        status = await ctx.send("📥 Importing infractions...")
+        imported = skipped = 0
+        before = await count_guild_infractions(self.bot, ctx.guild.id)
+        with tempfile.TemporaryFile() as raw:
+            # Stream the upload to disk rather than reading it into memory.
+            async with aiohttp.ClientSession() as session:
+                async with session.get(attachment.url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        raw.write(chunk)
+            raw.seek(0)
 
-        def make_embed(page):
-            embed = discord.Embed(
-                title=f"Infractions for {member} (Page {page+1}/{len(pages)})",
-                color=discord.Color.blurple()
-            )
-            for idx, inf in enumerate(pages[page], start=1):
-                embed.add_field(
-                    name=f"{idx}. {inf['action']}",
-                    value=f"Reason: {inf['reason']} | Mod: <@{inf['mod_id']}> | Date: <t:{inf['timestamp']}:F>",
-                    inline=False
-                )
-            return embed
+            try:
+                # Decompressing and parsing happen in a thread so a big file never blocks heartbeats.
+                records = read_rows(await asyncio.to_thread(open_import, raw), fmt)
+                while True:
+                    batch, invalid = await asyncio.to_thread(read_infraction_batch, records, IMPORT_BATCH)
+                    skipped += invalid
+                    if not batch:
+                        break
+                    await import_infractions(self.bot, ctx.guild.id, batch)
+                    imported += len(batch)
+            except (ValueError, OSError, EOFError, csv.Error) as e:
+                await status.edit(content=f"⚠️ Import stopped after `{imported}` infractions: {e}")
+                return
 
-        await ctx.send(embed=make_embed(0), view=InfractionView())
+        added = await count_guild_infractions(self.bot, ctx.guild.id) - before
+        message = f"✅ Imported `{added}` infractions."
+        if imported > added:
+            message += f" Skipped `{imported - added}` already on record."
+        if skipped:
+            message += f" Skipped `{skipped}` invalid rows."
+        await status.edit(content=message)
 
-    @commands.command(name="clearinfractions")
+    @commands.group()
     @commands.has_permissions(manage_guild=True)
-    async def clearinfractions(self, ctx, member: discord.Member):
-        await self.bot.db.execute("""
-            DELETE FROM infractions WHERE guild_id = $1 AND user_id = $2
-        """, ctx.guild.id, member.id)
+    async def automod(self, ctx):
+        if ctx.invoked_subcommand is None:
+            await ctx.send("ℹ️ Use `.automod add <word/link> <a, b, ...>`, `.automod remove <word/link> <a, b, ...>` or `.automod list`")
+
+    @staticmethod
+    def _split_patterns(text):
+        # Comma or newline separated so multi-word phrases work and many rules can be added at once.
+        return [p.strip() for p in re.split(r"[,\n]", text) if p.strip()]
+
+    @automod.command(name="add")
+    async def automod_add(self, ctx, kind: str, *, patterns: str):
+        kind = kind.lower()
+        if kind not in RULE_KINDS:
+            await ctx.send("❌ Invalid type! Use `word` or `link` (`link *` blocks every link).", delete_after=5)
+            return
+        patterns = self._split_patterns(patterns.lower())
+        await add_automod_rules(self.bot, ctx.guild.id, kind, patterns)
+        automod_cache.invalidate(ctx.guild.id)
+        await ctx.send(f"✅ Added `{len(patterns)}` {kind} rule(s).")
+
+    @automod.command(name="remove")
+    async def automod_remove(self, ctx, kind: str, *, patterns: str):
+        kind = kind.lower()
+        if kind not in RULE_KINDS:
+            await ctx.send("❌ Invalid type! Use `word` or `link`.", delete_after=5)
+            return
+        patterns = self._split_patterns(patterns.lower())
+        await remove_automod_rules(self.bot, ctx.guild.id, kind, patterns)
+        automod_cache.invalidate(ctx.guild.id)
+        await ctx.send(f"❌ Removed `{len(patterns)}` {kind} rule(s).")
+
+    @automod.command(name="list")
+    async def automod_list(self, ctx):
+        rows = await get_automod_rules(self.bot, ctx.guild.id)
+        if not rows:
+            await ctx.send("ℹ️ No automod rules set.")
+            return
+        words = sorted(p for k, p in rows if k == "word")
+        links = sorted(p for k, p in rows if k == "link")
+        text = (
+            f"🛡️ **{len(words)}** word rule(s): {', '.join(f'`{w}`' for w in words[:50]) or '-'}\n"
+            f"🔗 **{len(links)}** link rule(s): {', '.join(f'`{l}`' for l in links[:50]) or '-'}"
+        )
+        await ctx.send(text[:2000])
 
-        await ctx.send(f"✅ Cleared all infractions for {member}.")
+    @staticmethod
+    def _retention_action(name):
+        # Accepts "warn", "warnings", "Warned", ... for the logged action names.
+        prefix = name.lower()[:4]
+        return next((a for a in RETENTION_ACTIONS if a.lower().startswith(prefix)), None)
+
+    @commands.group(invoke_without_command=True)
+    @commands.has_permissions(manage_guild=True)
+    async def retention(self, ctx):
+        policies = sorted(await get_retention_policies(self.bot, ctx.guild.id), key=lambda p: p[1])
+        if not policies:
+            await ctx.send("ℹ️ No retention policies set; infractions are kept forever. Use `.retention set <action> <days>`.")
+            return
+        lines = [f"`{action}` archived after **{days}** day(s)" for _, action, days in policies]
+        await ctx.send("🗄️ Retention policies:\n" + "\n".join(lines) + "\nArchived infractions stay visible with `.infraction <member> archived`.")
+
+    @retention.command(name="set")
+    @commands.has_permissions(manage_guild=True)
+    async def retention_set(self, ctx, action: str, days: int):
+        resolved = self._retention_action(action)
+        if resolved is None:
+            await ctx.send(f"❌ Unknown action! Use one of: {', '.join(f'`{a}`' for a in RETENTION_ACTIONS)}", delete_after=5)
+            return
+        if days < 1:
+            await ctx.send("❌ Days must be at least 1.", delete_after=5)
+            return
+        await set_retention_policy(self.bot, ctx.guild.id, resolved, days)
+        await ctx.send(f"✅ `{resolved}` infractions older than **{days}** day(s) will be archived.")
+
+    @retention.command(name="remove")
+    @commands.has_permissions(manage_guild=True)
+    async def retention_remove(self, ctx, action: str):
+        resolved = self._retention_action(action)
+        if resolved is None:
+            await ctx.send(f"❌ Unknown action! Use one of: {', '.join(f'`{a}`' for a in RETENTION_ACTIONS)}", delete_after=5)
+            return
+        await remove_retention_policy(self.bot, ctx.guild.id, resolved)
+        await ctx.send(f"❌ `{resolved}` infractions will no longer be archived.")
 
     @commands.group(invoke_without_command=True)
     async def ar(self, ctx):
@@ -371,4 +992,4 @@ class Moderation(commands.Cog):
 
 
 async def setup(bot):
-    await bot.add_cog(Moderation(bot))
+    await bot.add_cog(metrics.instrument(Moderation(bot)))
@@ -0,0 +1,78 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+TOKEN = os.getenv("DISCORD_TOKEN")
+
+# Storage. A file path (the default) uses SQLite; a postgres:// or
+# postgresql:// URL uses PostgreSQL through asyncpg (pip install asyncpg), which
+# lets clusters on several machines share one database. DATABASE_POOL_SIZE is
+# the number of reader connections per process.
+DATABASE_URL = os.getenv("DATABASE_URL") or "yuuki_bot.db"
+DATABASE_POOL_SIZE = _int("DATABASE_POOL_SIZE", 4)
+
+# Sharding. SHARD_COUNT unset lets Discord recommend a count. The cluster
+# launcher (launcher.py) splits shards across CLUSTER_COUNT processes.
+SHARD_COUNT = _int("SHARD_COUNT", None)
+CLUSTER_COUNT = _int("CLUSTER_COUNT", 1)
+CLUSTER_STATS_INTERVAL = _float("CLUSTER_STATS_INTERVAL", 30.0)
+
+# Join-storm coalescing: once a guild sees JOIN_BURST_THRESHOLD joins within
+# JOIN_BURST_WINDOW seconds, welcomes are batched into a digest every
+# JOIN_DIGEST_INTERVAL seconds until the rate drops again.
+JOIN_BURST_THRESHOLD = _int("JOIN_BURST_THRESHOLD", 10)
+JOIN_BURST_WINDOW = _float("JOIN_BURST_WINDOW", 10.0)
+JOIN_DIGEST_INTERVAL = _float("JOIN_DIGEST_INTERVAL", 15.0)
+
+# Prometheus metrics on http://METRICS_HOST:METRICS_PORT/metrics. Each cluster
+# process listens on METRICS_PORT + its cluster id. Set METRICS_PORT=0 to disable.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = _int("METRICS_PORT", 9108)
+
+# Low-memory mode: discord.py keeps no member cache and does not chunk guilds.
+# Cogs fall back to an LRU of MEMBER_LRU_SIZE recently seen members (each kept
+# for at most MEMBER_LRU_TTL seconds) and then to API fetches.
+LOW_MEMORY = os.getenv("LOW_MEMORY", "").lower() in ("1", "true", "yes")
+MEMBER_LRU_SIZE = _int("MEMBER_LRU_SIZE", 2000)
+MEMBER_LRU_TTL = _float("MEMBER_LRU_TTL", 300.0)
+
+# Health monitor: event-loop lag is sampled every HEALTH_SAMPLE_INTERVAL
+# seconds; a sample later than SLOW_CALLBACK_THRESHOLD counts as a stall.
+# A report goes to every configured heartbeat channel each
+# HEALTH_REPORT_INTERVAL seconds. HEALTH_DEBUG_LOOP=1 also turns on asyncio
+# debug mode so the offending callbacks are logged by name (slower).
+HEALTH_SAMPLE_INTERVAL = _float("HEALTH_SAMPLE_INTERVAL", 1.0)
+HEALTH_REPORT_INTERVAL = _float("HEALTH_REPORT_INTERVAL", 1800.0)
+SLOW_CALLBACK_THRESHOLD = _float("SLOW_CALLBACK_THRESHOLD", 0.1)
+HEALTH_DEBUG_LOOP = os.getenv("HEALTH_DEBUG_LOOP", "").lower() in ("1", "true", "yes")
+
+# Infraction retention (.retention). Every RETENTION_INTERVAL seconds,
+# infractions older than their guild's policy move RETENTION_BATCH rows at a
+# time into the compressed infraction_archive table. Every MAINTENANCE_INTERVAL
+# seconds the first cluster also runs ANALYZE and a WAL checkpoint, and VACUUMs
+# once VACUUM_FREE_RATIO of the SQLite file is free pages.
+RETENTION_INTERVAL = _float("RETENTION_INTERVAL", 3600.0)
+RETENTION_BATCH = _int("RETENTION_BATCH", 500)
+MAINTENANCE_INTERVAL = _float("MAINTENANCE_INTERVAL", 86400.0)
+VACUUM_FREE_RATIO = _float("VACUUM_FREE_RATIO", 0.2)
+
+# member_joins keeps each join for JOIN_INDEX_HOURS so `.massban joined:<window>`
+# can find raid accounts without a member cache.
+JOIN_INDEX_HOURS = _float("JOIN_INDEX_HOURS", 72.0)
+
+# App (slash) commands are synced at startup only when their hash changed.
+# COMMAND_SYNC_GUILDS (comma-separated guild ids) syncs them to just those
+# guilds, where updates show up instantly, instead of globally.
+COMMAND_SYNC_GUILDS = [int(g) for g in os.getenv("COMMAND_SYNC_GUILDS", "").split(",") if g.strip()]
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+
+from db import migrations
+from db.pool import ConnectionPool
+from db.writer import WriteQueue
+
+_POSTGRES_SCHEMES = ("postgres://", "postgresql://")
+
+
+class SQLiteBackend:
+    """The default backend: a pool of reader connections plus one group-committing writer.
+
+    Every backend takes SQL written with ``?`` placeholders and offers the
+    same methods, so db/database.py never needs to know which one it has.
+    Several processes can share the file, but only one writes at a time.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path, size=4):
+        self.path = path
+        self.pool = ConnectionPool(path, size=size)
+        self.writer = WriteQueue(path)
+
+    async def migrate(self):
+        return await migrations.migrate(self.path)
+
+    async def connect(self):
+        await self.pool.open()
+        await self.writer.start()
+
+    async def close(self):
+        # Flushes anything still queued before the connections go away.
+        await self.writer.close()
+        await self.pool.close()
+
+    async def fetchone(self, sql, params=()):
+        async with self.pool.acquire() as db:
+            async with db.execute(sql, params) as cursor:
+                return await cursor.fetchone()
+
+    async def fetchall(self, sql, params=()):
+        async with self.pool.acquire() as db:
+            async with db.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+
+    async def iterate(self, sql, params=(), batch_size=500):
+        async with self.pool.acquire() as db:
+            async with db.execute(sql, params) as cursor:
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield tuple(row)
+
+    async def execute(self, sql, params=(), wait=True):
+        await self.writer.execute(sql, params, wait=wait)
+
+    async def executemany(self, sql, seq_of_params, wait=True):
+        await self.writer.executemany(sql, seq_of_params, wait=wait)
+
+    async def insert(self, sql, params=()):
+        """Run an INSERT and return the new row's id."""
+        return await self.writer.execute(sql, params)
+
+    async def transaction(self, statements, wait=True):
+        await self.writer.transaction(statements, wait=wait)
+
+    async def maintain(self, vacuum=False):
+        """ANALYZE and checkpoint the WAL into the main file, VACUUMing first if asked.
+
+        Runs on the writer's connection between batches, so queued writes
+        wait rather than fail with "database is locked".
+        """
+        async def run(conn):
+            if vacuum:
+                await conn.execute("VACUUM")
+            await conn.execute("ANALYZE")
+            async with conn.execute("PRAGMA wal_checkpoint(TRUNCATE)") as cursor:
+                busy, _, _ = await cursor.fetchone()
+            return {"vacuumed": vacuum, "checkpointed": not busy}
+        return await self.writer.call(run)
+
+    async def size_stats(self, tables):
+        page_size = (await self.fetchone("PRAGMA page_size"))[0]
+        pages = (await self.fetchone("PRAGMA page_count"))[0]
+        free = (await self.fetchone("PRAGMA freelist_count"))[0]
+        table_bytes = {}
+        try:
+            for table in tables:
+                # Each table plus its indexes; dbstat only walks the b-trees named.
+                objects = await self.fetchall("SELECT name FROM sqlite_schema WHERE tbl_name = ?", (table,))
+                total = 0
+                for (name,) in objects:
+                    total += (await self.fetchone("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = ?", (name,)))[0]
+                table_bytes[table] = total
+        except sqlite3.OperationalError:
+            pass  # SQLite built without the dbstat table
+        wal = self.path + "-wal"
+        return {
+            "database_bytes": page_size * pages,
+            "free_bytes": page_size * free,
+            "wal_bytes": os.path.getsize(wal) if os.path.exists(wal) else 0,
+            "tables": {table: table_bytes.get(table) for table in tables},
+        }
+
+    async def flush(self):
+        await self.writer.flush()
+
+    @property
+    def pending(self):
+        return self.writer.pending
+
+    def stats(self):
+        return self.writer.stats()
+
+
+def open_backend(url, size=4):
+    """The backend for DATABASE_URL: PostgreSQL for postgres:// URLs, otherwise a SQLite file path."""
+    if url.startswith(_POSTGRES_SCHEMES):
+        from db.postgres import PostgresBackend
+        return PostgresBackend(url, size=size)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteBackend(url, size=size)
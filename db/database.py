@@ -1,90 +1,662 @@
-import aiosqlite
-
-DB_PATH = "yuuki_bot.db"
-
-async def initialize():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS guild_settings (
-                guild_id INTEGER PRIMARY KEY,
-                welcome_channel INTEGER,
-                rules_channel INTEGER,
-                heartbeat_channel INTEGER,
-                role_channel INTEGER,
-                introduction_channel INTEGER,
-                goodbye_channel INTEGER,
-                list_channel INTEGER,
-                log_channel INTEGER
-            );
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS autoroles (
-                guild_id INTEGER,
-                role_id INTEGER
-            );
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS infractions (
-                guild_id INTEGER,
-                user_id INTEGER,
-                mod_id INTEGER,
-                action TEXT,
-                reason TEXT,
-                timestamp INTEGER
-            );
-        """)
-        await db.commit()
+import contextvars
+import functools
+import json
+import time
+import zlib
 
+from config import DATABASE_URL, DATABASE_POOL_SIZE
+from db.backends import open_backend
+from db.settings import SETTINGS_COLUMNS, GuildSettings, SettingsCache
+from utils import metrics
+
+# Everything below goes through one storage backend (db/backends.py), chosen
+# by DATABASE_URL: a SQLite file by default, or PostgreSQL for postgres:// URLs.
+# Queries are written with ? placeholders and the backend adapts them.
+_backend = None
+settings_cache = SettingsCache()
+# guild id -> autorole ids. Once warm_autorole_cache has run, a guild that is
+# missing here has no autoroles, so joins never need to query for them.
+_autoroles = {}
+_autoroles_warm = False
+
+async def connect(url=DATABASE_URL, size=DATABASE_POOL_SIZE):
+    global _backend
+    if _backend is None:
+        _backend = open_backend(url, size=size)
+    await _backend.connect()
+
+async def close():
+    global _backend, _autoroles_warm
+    _autoroles.clear()
+    _autoroles_warm = False
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+def backend_name():
+    return _backend.name if _backend is not None else None
+
+def _get_backend():
+    if _backend is None:
+        raise RuntimeError("Database is not connected. Call database.connect() first.")
+    return _backend
+
+# Name of the helper below that is running, for the query label on db metrics.
+_query = contextvars.ContextVar("db_query", default="unknown")
+
+def _timed(func):
+    """Label every query ``func`` runs with its name in yuuki_db_query_duration_seconds."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _query.set(func.__name__)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _query.reset(token)
+    return wrapper
+
+async def _fetchone(sql, params=()):
+    with metrics.db_timer("read", _query.get()):
+        return await _get_backend().fetchone(sql, params)
+
+async def _fetchall(sql, params=()):
+    with metrics.db_timer("read", _query.get()):
+        return await _get_backend().fetchall(sql, params)
+
+async def _iterate(query, sql, params=(), batch_size=500):
+    """Stream rows from ``sql``; only the time spent waiting on the database is timed."""
+    rows = _get_backend().iterate(sql, params, batch_size)
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                row = await rows.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - started
+            yield row
+    finally:
+        await rows.aclose()
+        metrics.db_latency.observe(elapsed, query, "read")
+
+async def _execute(sql, params=(), wait=True):
+    with metrics.db_timer("write", _query.get()):
+        await _get_backend().execute(sql, params, wait=wait)
+
+async def _executemany(sql, seq_of_params, wait=True):
+    with metrics.db_timer("write", _query.get()):
+        await _get_backend().executemany(sql, seq_of_params, wait=wait)
+
+async def _transaction(statements, wait=True):
+    """Run ``(sql, seq_of_params)`` pairs in one transaction."""
+    with metrics.db_timer("write", _query.get()):
+        await _get_backend().transaction(statements, wait=wait)
+
+async def _insert(sql, params=()):
+    """Run an INSERT through the write queue and return the new row's id."""
+    with metrics.db_timer("write", _query.get()):
+        return await _get_backend().insert(sql, params)
+
+async def flush():
+    """Wait until every queued write is committed."""
+    if _backend is not None:
+        await _backend.flush()
+
+def write_queue_stats():
+    return _backend.stats() if _backend is not None else {}
+
+async def initialize(url=DATABASE_URL):
+    # Runs before connect(), on its own connection.
+    backend = _backend or open_backend(url)
+    applied = await backend.migrate()
+    if applied:
+        print(f"✅ Applied database migrations: {', '.join(map(str, applied))}")
+
+@_timed
 async def ensure_guild_exists(bot, guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("INSERT OR IGNORE INTO guild_settings (guild_id) VALUES (?)", (guild_id,))
-        await db.commit()
+    await _execute("INSERT INTO guild_settings (guild_id) VALUES (?) ON CONFLICT (guild_id) DO NOTHING", (guild_id,))
+
+def _check_column(column):
+    if column not in SETTINGS_COLUMNS:
+        raise ValueError(f"Unknown guild setting: {column}")
+
+_SETTINGS_SELECT = f"SELECT guild_id, {', '.join(SETTINGS_COLUMNS)} FROM guild_settings"
+
+@_timed
+async def warm_settings_cache(bot):
+    rows = await _fetchall(_SETTINGS_SELECT)
+    for row in rows:
+        settings_cache.put(GuildSettings.from_row(row))
+    return len(rows)
 
+@_timed
+async def get_guild_settings(bot, guild_id):
+    settings = settings_cache.get(guild_id)
+    if settings is None:
+        row = await _fetchone(f"{_SETTINGS_SELECT} WHERE guild_id = ?", (guild_id,))
+        settings = GuildSettings.from_row(row) if row else GuildSettings(guild_id)
+        settings_cache.put(settings)
+    return settings
+
+@_timed
+async def set_guild_setting(bot, guild_id, column, value):
+    _check_column(column)
+    await _execute(f"""
+        INSERT INTO guild_settings (guild_id, {column}) VALUES (?, ?)
+        ON CONFLICT (guild_id) DO UPDATE SET {column} = excluded.{column}
+    """, (guild_id, value))
+    settings_cache.set(guild_id, column, value)
+
+@_timed
 async def set_channel_id(bot, guild_id, column, channel_id):
-    await ensure_guild_exists(bot, guild_id)
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(f"UPDATE guild_settings SET {column} = ? WHERE guild_id = ?", (channel_id, guild_id))
-        await db.commit()
+    await set_guild_setting(bot, guild_id, column, channel_id)
 
+@_timed
 async def get_channel_id(bot, guild_id, column):
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute(f"SELECT {column} FROM guild_settings WHERE guild_id = ?", (guild_id,)) as cursor:
-            row = await cursor.fetchone()
-            return row[0] if row else None
+    _check_column(column)
+    settings = await get_guild_settings(bot, guild_id)
+    return settings[column]
 
+@_timed
 async def remove_channel_id(bot, guild_id, column):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(f"UPDATE guild_settings SET {column} = NULL WHERE guild_id = ?", (guild_id,))
-        await db.commit()
+    _check_column(column)
+    await _execute(f"UPDATE guild_settings SET {column} = NULL WHERE guild_id = ?", (guild_id,))
+    settings_cache.set(guild_id, column, None)
+
+@_timed
+async def get_channels_for(bot, column):
+    """``(guild_id, channel_id)`` for every guild that has ``column`` set, in one query."""
+    _check_column(column)
+    rows = await _fetchall(f"SELECT guild_id, {column} FROM guild_settings WHERE {column} IS NOT NULL")
+    return [tuple(row) for row in rows]
 
+@_timed
+async def warm_autorole_cache(bot):
+    global _autoroles_warm
+    rows = await _fetchall("SELECT guild_id, role_id FROM autoroles")
+    _autoroles.clear()
+    for guild_id, role_id in rows:
+        _autoroles.setdefault(guild_id, []).append(role_id)
+    _autoroles_warm = True
+    return len(_autoroles)
+
+@_timed
 async def add_autorole(bot, guild_id, role_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("INSERT INTO autoroles (guild_id, role_id) VALUES (?, ?)", (guild_id, role_id))
-        await db.commit()
+    await _execute("""
+        INSERT INTO autoroles (guild_id, role_id) VALUES (?, ?)
+        ON CONFLICT (guild_id, role_id) DO NOTHING
+    """, (guild_id, role_id))
+    roles = _autoroles.get(guild_id)
+    if roles is not None and role_id not in roles:
+        roles.append(role_id)
+    elif roles is None and _autoroles_warm:
+        _autoroles[guild_id] = [role_id]
 
+@_timed
 async def remove_autorole(bot, guild_id, role_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("DELETE FROM autoroles WHERE guild_id = ? AND role_id = ?", (guild_id, role_id))
-        await db.commit()
+    await _execute("DELETE FROM autoroles WHERE guild_id = ? AND role_id = ?", (guild_id, role_id))
+    roles = _autoroles.get(guild_id)
+    if roles is not None and role_id in roles:
+        roles.remove(role_id)
 
+@_timed
 async def get_autoroles(bot, guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute("SELECT role_id FROM autoroles WHERE guild_id = ?", (guild_id,)) as cursor:
-            return [row[0] for row in await cursor.fetchall()]
-
-async def log_infraction(bot, guild_id, user_id, mod_id, action, reason, timestamp):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            INSERT INTO infractions (guild_id, user_id, mod_id, action, reason, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (guild_id, user_id, mod_id, action, reason, timestamp))
-        await db.commit()
+    roles = _autoroles.get(guild_id)
+    if roles is None:
+        if _autoroles_warm:
+            return []
+        rows = await _fetchall("SELECT role_id FROM autoroles WHERE guild_id = ?", (guild_id,))
+        roles = _autoroles[guild_id] = [row[0] for row in rows]
+    return list(roles)
+
+@_timed
+async def save_autorole_retries(bot, rows, wait=True):
+    """Upsert ``(guild_id, user_id, joined_at, attempts, next_attempt_at, last_error)`` rows."""
+    await _executemany("""
+        INSERT INTO autorole_retries (guild_id, user_id, joined_at, attempts, next_attempt_at, last_error)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (guild_id, user_id) DO UPDATE SET
+            attempts = excluded.attempts,
+            next_attempt_at = excluded.next_attempt_at,
+            last_error = excluded.last_error
+    """, rows, wait=wait)
+
+@_timed
+async def get_due_autorole_retries(bot, now, limit=100, shard_count=None, shard_ids=None):
+    """Due retries, only for guilds on ``shard_ids`` when a shard split is given."""
+    shard_filter, params = "", (now,)
+    if shard_count and shard_ids is not None:
+        # Discord's own guild-to-shard mapping, so other clusters' rows stay in the table.
+        shard_filter = f"AND (guild_id >> 22) % ? IN ({', '.join('?' * len(shard_ids))})"
+        params += (shard_count, *shard_ids)
+    rows = await _fetchall(f"""
+        SELECT guild_id, user_id, joined_at, attempts
+        FROM autorole_retries
+        WHERE next_attempt_at <= ? {shard_filter}
+        ORDER BY next_attempt_at
+        LIMIT ?
+    """, params + (limit,))
+    return [tuple(row) for row in rows]
+
+@_timed
+async def delete_autorole_retry(bot, guild_id, user_id):
+    await _execute("DELETE FROM autorole_retries WHERE guild_id = ? AND user_id = ?", (guild_id, user_id), wait=False)
+
+@_timed
+async def count_autorole_retries(bot):
+    row = await _fetchone("SELECT COUNT(*) FROM autorole_retries")
+    return row[0]
+
+@_timed
+async def log_infraction(bot, guild_id, user_id, mod_id, action, reason, timestamp, wait=False):
+    # Queued and group-committed; pass wait=True to return only once it is on disk.
+    await _execute("""
+        INSERT INTO infractions (guild_id, user_id, mod_id, action, reason, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (guild_id, user_id, mod_id, action, reason, timestamp), wait=wait)
+
+@_timed
+async def log_infractions(bot, guild_id, user_ids, mod_id, action, reason, timestamp):
+    """The same infraction for many members, committed in one transaction."""
+    await _executemany("""
+        INSERT INTO infractions (guild_id, user_id, mod_id, action, reason, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(guild_id, user_id, mod_id, action, reason, timestamp) for user_id in user_ids])
+
+async def _flush_pending():
+    # Reads that must see just-queued writes (e.g. an infraction logged a
+    # moment ago) wait for the write queue first; this is free when it is idle.
+    if _backend is not None and _backend.pending:
+        await _backend.flush()
 
+@_timed
 async def get_infractions(bot, guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute("""
-            SELECT mod_id, action, reason, timestamp
+    await _flush_pending()
+    rows = await _fetchall("""
+        SELECT mod_id, action, reason, timestamp
+        FROM infractions
+        WHERE guild_id = ? AND user_id = ?
+        ORDER BY timestamp, id
+    """, (guild_id, user_id))
+    return [{"mod_id": row[0], "action": row[1], "reason": row[2], "timestamp": row[3]} for row in rows]
+
+@_timed
+async def count_infractions(bot, guild_id, user_id):
+    await _flush_pending()
+    row = await _fetchone("SELECT COUNT(*) FROM infractions WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+    return row[0]
+
+INFRACTION_EXPORT_COLUMNS = ("id", "user_id", "mod_id", "action", "reason", "timestamp")
+
+async def iter_infractions(bot, guild_id, user_id=None, batch_size=500):
+    """Yield a guild's (or one member's) infractions as tuples, oldest first.
+
+    Rows come off a single cursor ``batch_size`` at a time, so memory stays
+    flat however many there are. Columns are INFRACTION_EXPORT_COLUMNS.
+    """
+    await _flush_pending()
+    sql = f"SELECT {', '.join(INFRACTION_EXPORT_COLUMNS)} FROM infractions WHERE guild_id = ?"
+    params = (guild_id,)
+    if user_id is not None:
+        sql += " AND user_id = ?"
+        params += (user_id,)
+    sql += " ORDER BY timestamp, id"
+    # An async generator cannot take @_timed, so it names itself.
+    async for row in _iterate("iter_infractions", sql, params, batch_size):
+        yield row
+
+@_timed
+async def clear_infractions(bot, guild_id, user_id):
+    await _transaction([
+        ("DELETE FROM infractions WHERE guild_id = ? AND user_id = ?", [(guild_id, user_id)]),
+        ("DELETE FROM infraction_archive WHERE guild_id = ? AND user_id = ?", [(guild_id, user_id)]),
+    ])
+
+@_timed
+async def count_guild_infractions(bot, guild_id):
+    await _flush_pending()
+    row = await _fetchone("SELECT COUNT(*) FROM infractions WHERE guild_id = ?", (guild_id,))
+    return row[0]
+
+@_timed
+async def import_infractions(bot, guild_id, rows):
+    """Insert ``(user_id, mod_id, action, reason, timestamp)`` rows in one transaction.
+
+    Rows matching an existing infraction (member, action, reason and
+    timestamp) are skipped, so importing the same export twice is harmless.
+    """
+    await _executemany("""
+        INSERT INTO infractions (guild_id, user_id, mod_id, action, reason, timestamp)
+        SELECT ?, ?, ?, ?, ?, ?
+        WHERE NOT EXISTS (
+            SELECT 1 FROM infractions
+            WHERE guild_id = ? AND user_id = ? AND timestamp = ? AND action = ? AND COALESCE(reason, '') = ?
+        )
+    """, [
+        (guild_id, user_id, mod_id, action, reason, timestamp, guild_id, user_id, timestamp, action, reason or "")
+        for user_id, mod_id, action, reason, timestamp in rows
+    ])
+
+@_timed
+async def get_infractions_page(bot, guild_id, user_id, limit=5, after=None, offset=0):
+    """Return up to ``limit`` infractions ordered oldest first.
+
+    ``after`` is the ``(timestamp, id)`` key of the last row already shown and
+    seeks straight to the next page through the member index. ``offset`` is
+    only used when jumping to a page whose start key is not known yet.
+    """
+    await _flush_pending()
+    if after is not None:
+        rows = await _fetchall("""
+            SELECT id, mod_id, action, reason, timestamp
+            FROM infractions
+            WHERE guild_id = ? AND user_id = ? AND (timestamp, id) > (?, ?)
+            ORDER BY timestamp, id
+            LIMIT ?
+        """, (guild_id, user_id, after[0], after[1], limit))
+    else:
+        rows = await _fetchall("""
+            SELECT id, mod_id, action, reason, timestamp
             FROM infractions
             WHERE guild_id = ? AND user_id = ?
-        """, (guild_id, user_id)) as cursor:
-            return [{"mod_id": row[0], "action": row[1], "reason": row[2], "timestamp": row[3]} for row in await cursor.fetchall()]
+            ORDER BY timestamp, id
+            LIMIT ? OFFSET ?
+        """, (guild_id, user_id, limit, offset))
+    return [{"id": row[0], "mod_id": row[1], "action": row[2], "reason": row[3], "timestamp": row[4]} for row in rows]
+
+@_timed
+async def get_retention_policies(bot, guild_id=None):
+    """``(guild_id, action, days)`` for one guild, or for every guild."""
+    if guild_id is None:
+        rows = await _fetchall("SELECT guild_id, action, days FROM retention_policies")
+    else:
+        rows = await _fetchall("SELECT guild_id, action, days FROM retention_policies WHERE guild_id = ?", (guild_id,))
+    return [tuple(row) for row in rows]
+
+@_timed
+async def set_retention_policy(bot, guild_id, action, days):
+    await _execute("""
+        INSERT INTO retention_policies (guild_id, action, days) VALUES (?, ?, ?)
+        ON CONFLICT (guild_id, action) DO UPDATE SET days = excluded.days
+    """, (guild_id, action, days))
+
+@_timed
+async def remove_retention_policy(bot, guild_id, action):
+    await _execute("DELETE FROM retention_policies WHERE guild_id = ? AND action = ?", (guild_id, action))
+
+@_timed
+async def get_expired_infractions(bot, guild_id, action, cutoff, limit=500):
+    """Up to ``limit`` ``(id, user_id, mod_id, action, reason, timestamp)`` rows older than ``cutoff``."""
+    await _flush_pending()
+    rows = await _fetchall("""
+        SELECT id, user_id, mod_id, action, reason, timestamp
+        FROM infractions
+        WHERE guild_id = ? AND action = ? AND timestamp < ?
+        ORDER BY timestamp
+        LIMIT ?
+    """, (guild_id, action, cutoff, limit))
+    return [tuple(row) for row in rows]
+
+@_timed
+async def archive_infractions(bot, guild_id, rows):
+    """Move infraction rows into infraction_archive, compressed per member, in one transaction."""
+    by_member = {}
+    for infraction_id, user_id, mod_id, action, reason, timestamp in rows:
+        by_member.setdefault(user_id, []).append([infraction_id, mod_id, action, reason, timestamp])
+    now = int(time.time())
+    archive = [
+        (guild_id, user_id, len(items), min(i[4] for i in items), max(i[4] for i in items), now,
+         zlib.compress(json.dumps(items, separators=(",", ":")).encode(), 6))
+        for user_id, items in by_member.items()
+    ]
+    await _transaction([
+        ("""
+            INSERT INTO infraction_archive (guild_id, user_id, count, first_timestamp, last_timestamp, archived_at, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, archive),
+        ("DELETE FROM infractions WHERE id = ?", [(row[0],) for row in rows]),
+    ])
+
+@_timed
+async def count_archived_infractions(bot, guild_id, user_id):
+    row = await _fetchone(
+        "SELECT COALESCE(SUM(count), 0) FROM infraction_archive WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+    )
+    return row[0]
+
+@_timed
+async def get_archived_infractions(bot, guild_id, user_id):
+    """A member's archived infractions, decompressed, oldest first (same keys as get_infractions_page)."""
+    rows = await _fetchall("SELECT data FROM infraction_archive WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+    infractions = [
+        {"id": item[0], "mod_id": item[1], "action": item[2], "reason": item[3], "timestamp": item[4]}
+        for row in rows for item in json.loads(zlib.decompress(row[0]))
+    ]
+    infractions.sort(key=lambda inf: (inf["timestamp"], inf["id"]))
+    return infractions
+
+INFRACTION_TABLES = ("infractions", "infraction_archive")
+
+@_timed
+async def table_stats(bot):
+    """Database size and, for the infraction tables, rows and bytes (including indexes)."""
+    await _flush_pending()
+    stats = await _get_backend().size_stats(INFRACTION_TABLES)
+    stats["rows"] = {
+        "infractions": (await _fetchone("SELECT COUNT(*) FROM infractions"))[0],
+        "infraction_archive": (await _fetchone("SELECT COUNT(*) FROM infraction_archive"))[0],
+        "archived_infractions": (await _fetchone("SELECT COALESCE(SUM(count), 0) FROM infraction_archive"))[0],
+    }
+    return stats
+
+@_timed
+async def maintain(bot, vacuum=False):
+    """ANALYZE and checkpoint the WAL (SQLite), optionally VACUUMing first."""
+    await flush()
+    return await _get_backend().maintain(vacuum=vacuum)
+
+@_timed
+async def record_member_join(bot, guild_id, user_id, joined_at):
+    # Not awaited to disk: during a raid these group-commit with everything else.
+    await _execute(
+        "INSERT INTO member_joins (guild_id, joined_at, user_id) VALUES (?, ?, ?) ON CONFLICT DO NOTHING",
+        (guild_id, int(joined_at), user_id), wait=False
+    )
+
+@_timed
+async def get_recent_joins(bot, guild_id, since):
+    """Ids of members who joined at or after ``since``, oldest join first."""
+    await _flush_pending()
+    rows = await _fetchall(
+        "SELECT user_id FROM member_joins WHERE guild_id = ? AND joined_at >= ? ORDER BY joined_at", (guild_id, int(since))
+    )
+    return list(dict.fromkeys(row[0] for row in rows))
+
+@_timed
+async def prune_member_joins(bot, before):
+    await _execute("DELETE FROM member_joins WHERE joined_at < ?", (int(before),))
+
+@_timed
+async def add_scheduled_action(bot, guild_id, action, target_id, run_at, payload=None):
+    return await _insert("""
+        INSERT INTO scheduled_actions (guild_id, action, target_id, run_at, payload)
+        VALUES (?, ?, ?, ?, ?)
+    """, (guild_id, action, target_id, run_at, json.dumps(payload) if payload is not None else None))
+
+@_timed
+async def get_scheduled_action_times(bot):
+    # Only (run_at, id) is needed to rebuild the timer, plus guild_id to pick
+    # out this cluster's share; payloads are loaded when due.
+    return await _fetchall("SELECT run_at, id, guild_id FROM scheduled_actions")
+
+@_timed
+async def get_scheduled_actions(bot, action_ids):
+    placeholders = ", ".join("?" * len(action_ids))
+    rows = await _fetchall(f"""
+        SELECT id, guild_id, action, target_id, run_at, payload
+        FROM scheduled_actions
+        WHERE id IN ({placeholders})
+    """, tuple(action_ids))
+    return [{
+        "id": row[0], "guild_id": row[1], "action": row[2], "target_id": row[3],
+        "run_at": row[4], "payload": json.loads(row[5]) if row[5] else None
+    } for row in rows]
+
+@_timed
+async def delete_scheduled_actions(bot, action_ids):
+    await _executemany("DELETE FROM scheduled_actions WHERE id = ?", [(i,) for i in action_ids])
+
+@_timed
+async def set_scheduled_action_payloads(bot, payloads):
+    """Rewrite payloads from ``(action_id, payload)`` pairs, e.g. to count failed attempts."""
+    await _executemany(
+        "UPDATE scheduled_actions SET payload = ? WHERE id = ?",
+        [(json.dumps(payload) if payload is not None else None, action_id) for action_id, payload in payloads]
+    )
+
+@_timed
+async def cancel_scheduled_actions(bot, guild_id, action, target_id):
+    await _execute(
+        "DELETE FROM scheduled_actions WHERE guild_id = ? AND action = ? AND target_id = ?",
+        (guild_id, action, target_id)
+    )
+
+_GIVEAWAY_SELECT = "SELECT id, guild_id, channel_id, message_id, host_id, prize, winners, ends_at, ended FROM giveaways"
+
+def _giveaway_from_row(row):
+    if row is None:
+        return None
+    return {
+        "id": row[0], "guild_id": row[1], "channel_id": row[2], "message_id": row[3], "host_id": row[4],
+        "prize": row[5], "winners": row[6], "ends_at": row[7], "ended": bool(row[8])
+    }
+
+@_timed
+async def create_giveaway(bot, guild_id, channel_id, host_id, prize, winners, ends_at):
+    return await _insert("""
+        INSERT INTO giveaways (guild_id, channel_id, host_id, prize, winners, ends_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (guild_id, channel_id, host_id, prize, winners, ends_at))
+
+@_timed
+async def set_giveaway_message(bot, giveaway_id, message_id):
+    await _execute("UPDATE giveaways SET message_id = ? WHERE id = ?", (message_id, giveaway_id))
+
+@_timed
+async def mark_giveaway_ended(bot, giveaway_id):
+    await _execute("UPDATE giveaways SET ended = 1 WHERE id = ?", (giveaway_id,))
+
+@_timed
+async def get_giveaway(bot, giveaway_id):
+    return _giveaway_from_row(await _fetchone(f"{_GIVEAWAY_SELECT} WHERE id = ?", (giveaway_id,)))
+
+@_timed
+async def get_giveaway_by_message(bot, guild_id, message_id):
+    return _giveaway_from_row(await _fetchone(
+        f"{_GIVEAWAY_SELECT} WHERE guild_id = ? AND message_id = ?", (guild_id, message_id)
+    ))
+
+@_timed
+async def add_giveaway_entries(bot, entries):
+    await _executemany("""
+        INSERT INTO giveaway_entries (giveaway_id, user_id) VALUES (?, ?)
+        ON CONFLICT (giveaway_id, user_id) DO NOTHING
+    """, entries)
+
+@_timed
+async def has_giveaway_entry(bot, giveaway_id, user_id):
+    row = await _fetchone(
+        "SELECT 1 FROM giveaway_entries WHERE giveaway_id = ? AND user_id = ?", (giveaway_id, user_id)
+    )
+    return row is not None
+
+@_timed
+async def count_giveaway_entries(bot, giveaway_id):
+    row = await _fetchone("SELECT COUNT(*) FROM giveaway_entries WHERE giveaway_id = ?", (giveaway_id,))
+    return row[0]
+
+@_timed
+async def get_giveaway_entry_at(bot, giveaway_id, offset):
+    # Walks the primary key index, so entrants are never loaded into Python.
+    row = await _fetchone("""
+        SELECT user_id FROM giveaway_entries
+        WHERE giveaway_id = ?
+        ORDER BY user_id
+        LIMIT 1 OFFSET ?
+    """, (giveaway_id, offset))
+    return row[0] if row else None
+
+@_timed
+async def get_message_template(bot, guild_id, kind):
+    row = await _fetchone(
+        "SELECT title, description, color FROM message_templates WHERE guild_id = ? AND kind = ?", (guild_id, kind)
+    )
+    return {"title": row[0], "description": row[1], "color": row[2]} if row else None
+
+@_timed
+async def set_message_template(bot, guild_id, kind, title, description, color):
+    await _execute("""
+        INSERT INTO message_templates (guild_id, kind, title, description, color) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (guild_id, kind) DO UPDATE SET
+            title = excluded.title, description = excluded.description, color = excluded.color
+    """, (guild_id, kind, title, description, color))
+
+@_timed
+async def delete_message_template(bot, guild_id, kind):
+    await _execute("DELETE FROM message_templates WHERE guild_id = ? AND kind = ?", (guild_id, kind))
+
+@_timed
+async def publish_cluster_stats(bot, cluster_id, pid, shards, updated_at):
+    # shards: {shard_id: {"latency": float, "guilds": int}}
+    await _execute("""
+        INSERT INTO cluster_stats (cluster_id, pid, shards, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (cluster_id) DO UPDATE SET
+            pid = excluded.pid, shards = excluded.shards, updated_at = excluded.updated_at
+    """, (cluster_id, pid, json.dumps(shards), updated_at))
+
+@_timed
+async def get_cluster_stats(bot):
+    rows = await _fetchall("SELECT cluster_id, pid, shards, updated_at FROM cluster_stats ORDER BY cluster_id")
+    return [{
+        "cluster_id": row[0], "pid": row[1],
+        "shards": {int(k): v for k, v in json.loads(row[2]).items()}, "updated_at": row[3]
+    } for row in rows]
+
+@_timed
+async def clear_cluster_stats(bot):
+    await _execute("DELETE FROM cluster_stats")
+
+@_timed
+async def get_command_sync_hash(bot, application_id, scope):
+    row = await _fetchone(
+        "SELECT hash FROM app_command_sync WHERE application_id = ? AND scope = ?", (application_id, scope)
+    )
+    return row[0] if row else None
+
+@_timed
+async def set_command_sync_hash(bot, application_id, scope, digest, synced_at):
+    await _execute("""
+        INSERT INTO app_command_sync (application_id, scope, hash, synced_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (application_id, scope) DO UPDATE SET hash = excluded.hash, synced_at = excluded.synced_at
+    """, (application_id, scope, digest, synced_at))
+
+@_timed
+async def get_automod_rules(bot, guild_id):
+    rows = await _fetchall("SELECT kind, pattern FROM automod_rules WHERE guild_id = ?", (guild_id,))
+    return [tuple(row) for row in rows]
+
+@_timed
+async def add_automod_rules(bot, guild_id, kind, patterns):
+    await _executemany("""
+        INSERT INTO automod_rules (guild_id, kind, pattern) VALUES (?, ?, ?)
+        ON CONFLICT (guild_id, kind, pattern) DO NOTHING
+    """, [(guild_id, kind, pattern) for pattern in patterns])
+
+@_timed
+async def remove_automod_rules(bot, guild_id, kind, patterns):
+    await _executemany(
+        "DELETE FROM automod_rules WHERE guild_id = ? AND kind = ? AND pattern = ?",
+        [(guild_id, kind, pattern) for pattern in patterns]
+    )
@@ -0,0 +1,423 @@
+import time
+
+from db.pool import open_connection
+
+# Ordered list of (version, name, statements). Never edit a migration that
+# has shipped; append a new one instead.
+MIGRATIONS = [
+    (1, "initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER PRIMARY KEY,
+            welcome_channel INTEGER,
+            rules_channel INTEGER,
+            heartbeat_channel INTEGER,
+            role_channel INTEGER,
+            introduction_channel INTEGER,
+            goodbye_channel INTEGER,
+            list_channel INTEGER,
+            log_channel INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS autoroles (
+            guild_id INTEGER,
+            role_id INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS infractions (
+            guild_id INTEGER,
+            user_id INTEGER,
+            mod_id INTEGER,
+            action TEXT,
+            reason TEXT,
+            timestamp INTEGER
+        )
+        """,
+    ]),
+    (2, "keys and lookup indexes", [
+        # infractions gets an explicit id so rows can be paged and referenced
+        # without relying on the implicit rowid.
+        """
+        CREATE TABLE infractions_new (
+            id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            mod_id INTEGER,
+            action TEXT,
+            reason TEXT,
+            timestamp INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        INSERT INTO infractions_new (guild_id, user_id, mod_id, action, reason, timestamp)
+        SELECT guild_id, user_id, mod_id, action, reason, COALESCE(timestamp, 0)
+        FROM infractions
+        WHERE guild_id IS NOT NULL AND user_id IS NOT NULL
+        ORDER BY rowid
+        """,
+        "DROP TABLE infractions",
+        "ALTER TABLE infractions_new RENAME TO infractions",
+        "CREATE INDEX idx_infractions_member ON infractions (guild_id, user_id, timestamp)",
+        # Duplicate autoroles are dropped here and rejected from now on.
+        """
+        CREATE TABLE autoroles_new (
+            guild_id INTEGER NOT NULL,
+            role_id INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, role_id)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT OR IGNORE INTO autoroles_new (guild_id, role_id)
+        SELECT guild_id, role_id FROM autoroles
+        WHERE guild_id IS NOT NULL AND role_id IS NOT NULL
+        """,
+        "DROP TABLE autoroles",
+        "ALTER TABLE autoroles_new RENAME TO autoroles",
+    ]),
+    (3, "scheduled actions", [
+        """
+        CREATE TABLE scheduled_actions (
+            id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            target_id INTEGER,
+            run_at INTEGER NOT NULL,
+            payload TEXT
+        )
+        """,
+        "CREATE INDEX idx_scheduled_actions_target ON scheduled_actions (guild_id, action, target_id)",
+    ]),
+    (4, "giveaways", [
+        """
+        CREATE TABLE giveaways (
+            id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            message_id INTEGER,
+            host_id INTEGER NOT NULL,
+            prize TEXT NOT NULL,
+            winners INTEGER NOT NULL,
+            ends_at INTEGER NOT NULL,
+            ended INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX idx_giveaways_message ON giveaways (guild_id, message_id)",
+        """
+        CREATE TABLE giveaway_entries (
+            giveaway_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (giveaway_id, user_id)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (5, "message templates", [
+        """
+        CREATE TABLE message_templates (
+            guild_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            title TEXT,
+            description TEXT,
+            color INTEGER,
+            PRIMARY KEY (guild_id, kind)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (6, "cached muted role", [
+        "ALTER TABLE guild_settings ADD COLUMN muted_role INTEGER",
+    ]),
+    (7, "cluster stats", [
+        """
+        CREATE TABLE cluster_stats (
+            cluster_id INTEGER PRIMARY KEY,
+            pid INTEGER,
+            shards TEXT NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        """,
+    ]),
+    (8, "automod rules", [
+        """
+        CREATE TABLE automod_rules (
+            guild_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            pattern TEXT NOT NULL,
+            PRIMARY KEY (guild_id, kind, pattern)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (9, "autorole retries", [
+        """
+        CREATE TABLE autorole_retries (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            joined_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at INTEGER NOT NULL,
+            last_error TEXT,
+            PRIMARY KEY (guild_id, user_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX idx_autorole_retries_due ON autorole_retries (next_attempt_at)",
+    ]),
+    (10, "infraction retention", [
+        """
+        CREATE TABLE retention_policies (
+            guild_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            days INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, action)
+        ) WITHOUT ROWID
+        """,
+        # Expired infractions, one row per member per archival batch. data is
+        # zlib-compressed JSON of [id, mod_id, action, reason, timestamp] rows.
+        """
+        CREATE TABLE infraction_archive (
+            id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            first_timestamp INTEGER NOT NULL,
+            last_timestamp INTEGER NOT NULL,
+            archived_at INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+        """,
+        "CREATE INDEX idx_infraction_archive_member ON infraction_archive (guild_id, user_id)",
+        "CREATE INDEX idx_infractions_age ON infractions (guild_id, action, timestamp)",
+    ]),
+    (11, "member join index", [
+        # Recent joins per guild, so raid cleanup can find everyone who joined
+        # in a window without a member cache. Pruned by the retention job.
+        """
+        CREATE TABLE member_joins (
+            guild_id INTEGER NOT NULL,
+            joined_at INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, joined_at, user_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX idx_member_joins_age ON member_joins (joined_at)",
+    ]),
+    (12, "app command sync hashes", [
+        # Hash of the last synced app command tree per application and scope
+        # (0 = global, otherwise a guild id), so unchanged trees are not re-synced.
+        """
+        CREATE TABLE app_command_sync (
+            application_id INTEGER NOT NULL,
+            scope INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            synced_at INTEGER NOT NULL,
+            PRIMARY KEY (application_id, scope)
+        ) WITHOUT ROWID
+        """,
+    ]),
+]
+
+# The same schema for PostgreSQL (see db/postgres.py), versioned in step with
+# MIGRATIONS so both backends report the same schema_version. Version 9 creates
+# everything SQLite reached through 1-9; later versions are appended to both lists.
+# Discord ids do not fit in a 32-bit INTEGER, so they are BIGINT here.
+POSTGRES_MIGRATIONS = [
+    (9, "initial schema", [
+        """
+        CREATE TABLE guild_settings (
+            guild_id BIGINT PRIMARY KEY,
+            welcome_channel BIGINT,
+            rules_channel BIGINT,
+            heartbeat_channel BIGINT,
+            role_channel BIGINT,
+            introduction_channel BIGINT,
+            goodbye_channel BIGINT,
+            list_channel BIGINT,
+            log_channel BIGINT,
+            muted_role BIGINT
+        )
+        """,
+        """
+        CREATE TABLE autoroles (
+            guild_id BIGINT NOT NULL,
+            role_id BIGINT NOT NULL,
+            PRIMARY KEY (guild_id, role_id)
+        )
+        """,
+        """
+        CREATE TABLE infractions (
+            id BIGSERIAL PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            mod_id BIGINT,
+            action TEXT,
+            reason TEXT,
+            timestamp BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX idx_infractions_member ON infractions (guild_id, user_id, timestamp)",
+        """
+        CREATE TABLE scheduled_actions (
+            id BIGSERIAL PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            action TEXT NOT NULL,
+            target_id BIGINT,
+            run_at BIGINT NOT NULL,
+            payload TEXT
+        )
+        """,
+        "CREATE INDEX idx_scheduled_actions_target ON scheduled_actions (guild_id, action, target_id)",
+        """
+        CREATE TABLE giveaways (
+            id BIGSERIAL PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            channel_id BIGINT NOT NULL,
+            message_id BIGINT,
+            host_id BIGINT NOT NULL,
+            prize TEXT NOT NULL,
+            winners INTEGER NOT NULL,
+            ends_at BIGINT NOT NULL,
+            ended INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX idx_giveaways_message ON giveaways (guild_id, message_id)",
+        """
+        CREATE TABLE giveaway_entries (
+            giveaway_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            PRIMARY KEY (giveaway_id, user_id)
+        )
+        """,
+        """
+        CREATE TABLE message_templates (
+            guild_id BIGINT NOT NULL,
+            kind TEXT NOT NULL,
+            title TEXT,
+            description TEXT,
+            color INTEGER,
+            PRIMARY KEY (guild_id, kind)
+        )
+        """,
+        """
+        CREATE TABLE cluster_stats (
+            cluster_id INTEGER PRIMARY KEY,
+            pid INTEGER,
+            shards TEXT NOT NULL,
+            updated_at BIGINT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE automod_rules (
+            guild_id BIGINT NOT NULL,
+            kind TEXT NOT NULL,
+            pattern TEXT NOT NULL,
+            PRIMARY KEY (guild_id, kind, pattern)
+        )
+        """,
+        """
+        CREATE TABLE autorole_retries (
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            joined_at DOUBLE PRECISION NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at BIGINT NOT NULL,
+            last_error TEXT,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """,
+        "CREATE INDEX idx_autorole_retries_due ON autorole_retries (next_attempt_at)",
+    ]),
+    (10, "infraction retention", [
+        """
+        CREATE TABLE retention_policies (
+            guild_id BIGINT NOT NULL,
+            action TEXT NOT NULL,
+            days INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, action)
+        )
+        """,
+        """
+        CREATE TABLE infraction_archive (
+            id BIGSERIAL PRIMARY KEY,
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            count INTEGER NOT NULL,
+            first_timestamp BIGINT NOT NULL,
+            last_timestamp BIGINT NOT NULL,
+            archived_at BIGINT NOT NULL,
+            data BYTEA NOT NULL
+        )
+        """,
+        "CREATE INDEX idx_infraction_archive_member ON infraction_archive (guild_id, user_id)",
+        "CREATE INDEX idx_infractions_age ON infractions (guild_id, action, timestamp)",
+    ]),
+    (11, "member join index", [
+        """
+        CREATE TABLE member_joins (
+            guild_id BIGINT NOT NULL,
+            joined_at BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            PRIMARY KEY (guild_id, joined_at, user_id)
+        )
+        """,
+        "CREATE INDEX idx_member_joins_age ON member_joins (joined_at)",
+    ]),
+    (12, "app command sync hashes", [
+        """
+        CREATE TABLE app_command_sync (
+            application_id BIGINT NOT NULL,
+            scope BIGINT NOT NULL,
+            hash TEXT NOT NULL,
+            synced_at BIGINT NOT NULL,
+            PRIMARY KEY (application_id, scope)
+        )
+        """,
+    ]),
+]
+
+
+async def current_version(conn):
+    async with conn.execute("SELECT MAX(version) FROM schema_version") as cursor:
+        row = await cursor.fetchone()
+    return row[0] or 0
+
+
+async def migrate(path):
+    """Bring the database at ``path`` up to the latest schema version.
+
+    Each migration runs in its own transaction together with its
+    schema_version row, so a failed upgrade leaves the file at the last
+    good version. Returns the list of versions that were applied.
+    """
+    conn = await open_connection(path, isolation_level=None)
+    applied = []
+    try:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at INTEGER NOT NULL
+            )
+        """)
+        if await current_version(conn) >= MIGRATIONS[-1][0]:
+            return applied
+        for number, name, statements in MIGRATIONS:
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Checked inside the write lock in case another process
+                # sharing this file upgraded it first.
+                if await current_version(conn) >= number:
+                    await conn.execute("ROLLBACK")
+                    continue
+                for statement in statements:
+                    await conn.execute(statement)
+                await conn.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                    (number, name, int(time.time()))
+                )
+            except Exception:
+                await conn.execute("ROLLBACK")
+                raise
+            await conn.execute("COMMIT")
+            applied.append(number)
+    finally:
+        await conn.close()
+    return applied
@@ -0,0 +1,69 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+# Applied to every connection when it is opened. WAL lets readers run while
+# a write is in progress, NORMAL sync is safe under WAL and skips an fsync
+# per commit, and busy_timeout makes concurrent writers wait instead of failing.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 134217728",
+)
+
+
+async def open_connection(path, cached_statements=128, **kwargs):
+    # sqlite3 keeps an LRU of compiled statements per connection, so reusing
+    # the same SQL text on a long-lived connection skips re-preparing it.
+    conn = await aiosqlite.connect(path, cached_statements=cached_statements, **kwargs)
+    for pragma in PRAGMAS:
+        await conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """A fixed number of long-lived aiosqlite connections shared by the bot."""
+
+    def __init__(self, path, size=4, cached_statements=128):
+        self.path = path
+        self.size = size
+        self.cached_statements = cached_statements
+        self._connections = []
+        self._idle = asyncio.Queue()
+        self._closed = True
+
+    async def open(self):
+        if not self._closed:
+            return
+        for _ in range(self.size):
+            conn = await open_connection(self.path, self.cached_statements)
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+        self._closed = False
+
+    @asynccontextmanager
+    async def acquire(self):
+        if self._closed:
+            raise RuntimeError("Database pool is not open.")
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # Wait for connections that are still checked out before closing them.
+        for _ in range(len(self._connections)):
+            conn = await self._idle.get()
+            try:
+                await conn.execute("PRAGMA optimize")
+            finally:
+                await conn.close()
+        self._connections.clear()
@@ -0,0 +1,171 @@
+import itertools
+import re
+import time
+from functools import lru_cache
+
+from db import migrations
+from db.writer import WriteQueue
+
+# asyncpg keeps this many prepared statements per connection, keyed by SQL
+# text. db/database.py only builds a few dozen distinct statements, so after
+# warm-up every query runs from a prepared statement.
+STATEMENT_CACHE_SIZE = 256
+
+# Any constant shared by every process; pg_advisory_xact_lock on it keeps two
+# clusters from migrating at the same time.
+MIGRATION_LOCK = 0x59554B49
+
+_PLACEHOLDER = re.compile(r"\?")
+
+
+def _asyncpg():
+    try:
+        import asyncpg
+    except ImportError:
+        raise RuntimeError("DATABASE_URL is a PostgreSQL URL but asyncpg is not installed (pip install asyncpg).") from None
+    return asyncpg
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    """Rewrite ``?`` placeholders as ``$1, $2, ...``.
+
+    Queries in db/database.py never contain a literal ``?``, so a plain
+    substitution is enough.
+    """
+    numbers = itertools.count(1)
+    return _PLACEHOLDER.sub(lambda _: f"${next(numbers)}", sql)
+
+
+class PostgresWriteQueue(WriteQueue):
+    """WriteQueue on a dedicated asyncpg connection, one transaction per batch."""
+
+    async def _open(self):
+        return await _asyncpg().connect(self.path, statement_cache_size=STATEMENT_CACHE_SIZE)
+
+    async def _apply(self, writes):
+        if self._conn.is_closed():
+            # The server restarted or dropped us; reconnect instead of failing every batch from now on.
+            self._conn = await self._open()
+        results = []
+        async with self._conn.transaction():
+            for write in writes:
+                if write.many == "group":
+                    for sql, seq_of_params in write.sql:
+                        await self._conn.executemany(sql, seq_of_params)
+                    results.append(None)
+                elif write.many:
+                    await self._conn.executemany(write.sql, write.params)
+                    results.append(None)
+                else:
+                    # Only INSERT ... RETURNING id produces a value; everything else gives None.
+                    results.append(await self._conn.fetchval(write.sql, *write.params))
+        return results
+
+
+class PostgresBackend:
+    """PostgreSQL through an asyncpg connection pool, for clusters sharing one database.
+
+    Reads go straight to the pool; writes keep the SQLite backend's
+    write-behind behaviour through PostgresWriteQueue, so ``wait=False``
+    and ``flush()`` mean the same thing on both.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn, size=4):
+        self.dsn = dsn
+        self.size = size
+        self.pool = None
+        self.writer = PostgresWriteQueue(dsn)
+
+    async def migrate(self):
+        conn = await _asyncpg().connect(self.dsn)
+        applied = []
+        try:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at BIGINT NOT NULL
+                )
+            """)
+            for number, name, statements in migrations.POSTGRES_MIGRATIONS:
+                async with conn.transaction():
+                    await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK)
+                    if await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_version") >= number:
+                        continue
+                    for statement in statements:
+                        await conn.execute(statement)
+                    await conn.execute(
+                        "INSERT INTO schema_version (version, name, applied_at) VALUES ($1, $2, $3)",
+                        number, name, int(time.time())
+                    )
+                applied.append(number)
+        finally:
+            await conn.close()
+        return applied
+
+    async def connect(self):
+        if self.pool is None:
+            self.pool = await _asyncpg().create_pool(
+                self.dsn, min_size=self.size, max_size=self.size, statement_cache_size=STATEMENT_CACHE_SIZE
+            )
+        await self.writer.start()
+
+    async def close(self):
+        await self.writer.close()
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def fetchone(self, sql, params=()):
+        return await self.pool.fetchrow(translate(sql), *params)
+
+    async def fetchall(self, sql, params=()):
+        return await self.pool.fetch(translate(sql), *params)
+
+    async def iterate(self, sql, params=(), batch_size=500):
+        # Server-side cursors only live inside a transaction.
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                async for row in conn.cursor(translate(sql), *params, prefetch=batch_size):
+                    yield tuple(row)
+
+    async def execute(self, sql, params=(), wait=True):
+        await self.writer.execute(translate(sql), tuple(params), wait=wait)
+
+    async def executemany(self, sql, seq_of_params, wait=True):
+        await self.writer.executemany(translate(sql), [tuple(p) for p in seq_of_params], wait=wait)
+
+    async def insert(self, sql, params=()):
+        return await self.writer.execute(translate(sql.rstrip() + " RETURNING id"), tuple(params))
+
+    async def transaction(self, statements, wait=True):
+        await self.writer.transaction(
+            [(translate(sql), [tuple(p) for p in seq_of_params]) for sql, seq_of_params in statements], wait=wait
+        )
+
+    async def maintain(self, vacuum=False):
+        # VACUUM cannot run inside a transaction, so it gets a pool connection
+        # of its own. WAL checkpoints are left to the server.
+        async with self.pool.acquire() as conn:
+            await conn.execute("VACUUM (ANALYZE)" if vacuum else "ANALYZE")
+        return {"vacuumed": vacuum, "checkpointed": False}
+
+    async def size_stats(self, tables):
+        database_bytes = await self.pool.fetchval("SELECT pg_database_size(current_database())")
+        table_bytes = {}
+        for table in tables:
+            table_bytes[table] = await self.pool.fetchval("SELECT pg_total_relation_size($1::regclass)", table)
+        return {"database_bytes": database_bytes, "free_bytes": None, "wal_bytes": None, "tables": table_bytes}
+
+    async def flush(self):
+        await self.writer.flush()
+
+    @property
+    def pending(self):
+        return self.writer.pending
+
+    def stats(self):
+        return self.writer.stats()
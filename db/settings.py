@@ -0,0 +1,82 @@
+SETTINGS_COLUMNS = (
+    "welcome_channel",
+    "rules_channel",
+    "heartbeat_channel",
+    "role_channel",
+    "introduction_channel",
+    "goodbye_channel",
+    "list_channel",
+    "log_channel",
+    "muted_role",
+)
+
+
+class GuildSettings:
+    """One guild_settings row, loaded as a whole and kept in memory."""
+
+    __slots__ = ("guild_id",) + SETTINGS_COLUMNS
+
+    def __init__(self, guild_id, **values):
+        self.guild_id = guild_id
+        for column in SETTINGS_COLUMNS:
+            setattr(self, column, values.get(column))
+
+    @classmethod
+    def from_row(cls, row):
+        # Rows are selected as (guild_id, *SETTINGS_COLUMNS).
+        return cls(row[0], **dict(zip(SETTINGS_COLUMNS, row[1:])))
+
+    def __getitem__(self, column):
+        return getattr(self, column)
+
+
+class SettingsCache:
+    """Write-through cache of GuildSettings keyed by guild id.
+
+    Guilds without a row are cached as empty settings too, so a guild that
+    never configured anything does not hit the database on every event.
+    """
+
+    def __init__(self):
+        self._guilds = {}
+        self.hits = 0
+        self.misses = 0
+        # Called as listener(guild_id, column) after every write, so caches
+        # derived from settings (e.g. compiled templates) can invalidate.
+        self.listeners = []
+
+    def get(self, guild_id):
+        settings = self._guilds.get(guild_id)
+        if settings is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return settings
+
+    def put(self, settings):
+        self._guilds[settings.guild_id] = settings
+
+    def set(self, guild_id, column, value):
+        settings = self._guilds.get(guild_id)
+        if settings is not None:
+            setattr(settings, column, value)
+        for listener in self.listeners:
+            listener(guild_id, column)
+
+    def evict(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def clear(self):
+        self._guilds.clear()
+
+    def __len__(self):
+        return len(self._guilds)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "guilds": len(self._guilds),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,212 @@
+import asyncio
+import time
+
+from db.pool import open_connection
+
+
+class _Write:
+    __slots__ = ("sql", "params", "many", "future")
+
+    def __init__(self, sql, params, many, future):
+        self.sql = sql
+        self.params = params
+        self.many = many
+        self.future = future
+
+
+def _ignore_result(future):
+    # Fire-and-forget writes report their own errors, so mark the exception
+    # as retrieved to keep asyncio from warning about it on garbage collection.
+    if not future.cancelled():
+        future.exception()
+
+
+class WriteQueue:
+    """Write-behind queue that group-commits statements on one connection.
+
+    Writes are collected for up to ``max_delay`` seconds or ``max_batch``
+    statements and committed in a single transaction, so a burst of
+    moderation actions costs one commit instead of one per row.
+    """
+
+    def __init__(self, path, max_batch=200, max_delay=0.005):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = 0
+        self.batches = 0
+        self.statements = 0
+        self.last_commit_ms = 0.0
+        self._queue = asyncio.Queue()
+        self._conn = None
+        self._task = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._conn = await self._open()
+        self._task = asyncio.create_task(self._run(), name="db-write-queue")
+
+    async def _open(self):
+        # Autocommit mode so the batch controls its own BEGIN/COMMIT.
+        return await open_connection(self.path, isolation_level=None)
+
+    def submit(self, sql, params=(), many=False):
+        if self._task is None:
+            raise RuntimeError("Write queue is not running.")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Write(sql, params, many, future))
+        self.pending += 1
+        return future
+
+    async def execute(self, sql, params=(), wait=True):
+        """Queue one statement; when waiting, returns its lastrowid."""
+        future = self.submit(sql, params)
+        if wait:
+            return await future
+        future.add_done_callback(_ignore_result)
+
+    async def executemany(self, sql, seq_of_params, wait=True):
+        future = self.submit(sql, list(seq_of_params), many=True)
+        if wait:
+            await future
+        else:
+            future.add_done_callback(_ignore_result)
+
+    async def transaction(self, statements, wait=True):
+        """Queue ``(sql, seq_of_params)`` pairs that commit together or not at all."""
+        future = self.submit([(sql, list(seq)) for sql, seq in statements], many="group")
+        if wait:
+            await future
+        else:
+            future.add_done_callback(_ignore_result)
+
+    async def call(self, fn):
+        """Run ``await fn(connection)`` on the writer's connection between batches.
+
+        Nothing else writes while it runs and no transaction is open, which
+        is what VACUUM and WAL checkpoints need. Returns fn's result.
+        """
+        return await self.submit(fn, many="call")
+
+    async def flush(self):
+        """Wait until everything queued so far has been committed."""
+        if self._task is None:
+            return
+        await self.submit(None)
+
+    async def close(self):
+        if self._task is None:
+            return
+        if not self._task.done():
+            await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._conn.close()
+        self._conn = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._commit(batch)
+
+    async def _commit(self, batch):
+        calls = [w for w in batch if w.many == "call"]
+        await self._commit_writes([w for w in batch if w.many != "call"] if calls else batch)
+        for write in calls:
+            try:
+                result = await write.sql(self._conn)
+            except Exception as e:
+                self._resolve(write, error=e)
+            else:
+                self._resolve(write, result)
+
+    async def _commit_writes(self, batch):
+        writes = [w for w in batch if w.sql is not None]
+        results = None
+        error = None
+        if writes:
+            started = time.perf_counter()
+            try:
+                results = await self._apply(writes)
+            except Exception as e:
+                error = e
+            self.last_commit_ms = (time.perf_counter() - started) * 1000
+            self.batches += 1
+            self.statements += len(writes)
+
+        if error is not None:
+            # One bad statement should not fail everyone else's write, so
+            # replay the batch one statement per transaction.
+            print(f"⚠️ Batched write failed, retrying individually: {error}")
+            for write in writes:
+                try:
+                    [result] = await self._apply([write])
+                except Exception as e:
+                    print(f"⚠️ Write failed: {e}")
+                    self._resolve(write, error=e)
+                else:
+                    self._resolve(write, result)
+            for write in batch:
+                if write.sql is None:
+                    self._resolve(write)
+            return
+
+        results = iter(results or ())
+        for write in batch:
+            self._resolve(write, None if write.sql is None else next(results))
+
+    async def _apply(self, writes):
+        """Run writes in one transaction, returning each statement's lastrowid."""
+        results = []
+        await self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for write in writes:
+                if write.many == "group":
+                    for sql, seq_of_params in write.sql:
+                        await self._conn.executemany(sql, seq_of_params)
+                    results.append(None)
+                elif write.many:
+                    await self._conn.executemany(write.sql, write.params)
+                    results.append(None)
+                else:
+                    cursor = await self._conn.execute(write.sql, write.params)
+                    results.append(cursor.lastrowid)
+                    await cursor.close()
+        except Exception:
+            await self._conn.execute("ROLLBACK")
+            raise
+        await self._conn.execute("COMMIT")
+        return results
+
+    def _resolve(self, write, result=None, error=None):
+        self.pending -= 1
+        if write.future.done():
+            return
+        if error is None:
+            write.future.set_result(result)
+        else:
+            write.future.set_exception(error)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "pending": self.pending,
+            "batches": self.batches,
+            "statements": self.statements,
+            "last_commit_ms": self.last_commit_ms,
+        }
@@ -0,0 +1,135 @@
+# launcher.py
+"""Run the bot as several processes ("clusters"), each owning a group of shards.
+
+    python launcher.py --clusters 4                # shard count from Discord
+    python launcher.py --clusters 2 --shards 8
+    python launcher.py --clusters 2 --shards 8 --stub --duration 30
+
+All clusters share one database (yuuki_bot.db, or PostgreSQL through
+DATABASE_URL). Each one publishes per-shard latency and guild counts to the
+cluster_stats table, which the launcher and the .shards command aggregate.
+--stub swaps the Discord gateway for a fake one so the process layout and
+stats path can be exercised without a token.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import signal
+import time
+import urllib.request
+
+from config import TOKEN, SHARD_COUNT, CLUSTER_COUNT, CLUSTER_STATS_INTERVAL
+from db import database
+from utils import cluster
+
+
+def recommended_shard_count():
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {TOKEN}", "User-Agent": "DiscordBot (Yuuki launcher, 1.0)"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)["shards"]
+
+
+async def run_stub_cluster(cluster_id, shard_ids, shard_count, interval):
+    await database.connect()
+    gateway = cluster.StubGateway(shard_ids, shard_count)
+    try:
+        while True:
+            await cluster.publish_stats(gateway, cluster_id)
+            await asyncio.sleep(interval)
+    finally:
+        await database.close()
+
+
+async def _until_terminated(coro):
+    # SIGTERM cancels the cluster's main task, so its finally blocks (flushing
+    # queued writes, closing the pool) run while the loop is still alive.
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    await coro
+
+
+def run_cluster(cluster_id, shard_ids, shard_count, stub, interval):
+    import discord
+    discord.utils.setup_logging()
+    if stub:
+        coro = run_stub_cluster(cluster_id, shard_ids, shard_count, interval)
+    else:
+        from main import create_bot, run_bot
+        coro = run_bot(create_bot(cluster_id, shard_ids, shard_count))
+    try:
+        asyncio.run(_until_terminated(coro))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+def format_totals(totals):
+    latency = f"{totals['latency'] * 1000:.0f}ms" if totals["latency"] is not None else "n/a"
+    parts = [f"{totals['shards']} shards | {totals['guilds']} guilds | avg latency {latency}"]
+    for c in totals["clusters"]:
+        c_latency = f"{c['latency'] * 1000:.0f}ms" if c["latency"] is not None else "n/a"
+        stale = " (stale)" if c["stale"] else ""
+        parts.append(f"  cluster {c['cluster_id']}: shards {c['shards']} | {c['guilds']} guilds | {c_latency}{stale}")
+    return "\n".join(parts)
+
+
+async def supervise(args):
+    shard_count = args.shards or SHARD_COUNT or (8 if args.stub else recommended_shard_count())
+    groups = cluster.split_shards(shard_count, args.clusters)
+    interval = 2.0 if args.stub else CLUSTER_STATS_INTERVAL
+
+    # Migrate once here so the clusters don't race each other on startup.
+    await database.initialize()
+    await database.connect()
+    await database.clear_cluster_stats(None)
+
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+
+    def spawn(cluster_id):
+        process = context.Process(
+            target=run_cluster, name=f"cluster-{cluster_id}",
+            args=(cluster_id, groups[cluster_id], shard_count, args.stub, interval)
+        )
+        process.start()
+        processes[cluster_id] = process
+        print(f"🚀 Cluster {cluster_id} started (pid {process.pid}, shards {groups[cluster_id]})")
+
+    for cluster_id in range(len(groups)):
+        spawn(cluster_id)
+
+    started = time.monotonic()
+    try:
+        while not args.duration or time.monotonic() - started < args.duration:
+            await asyncio.sleep(interval)
+            for cluster_id, process in list(processes.items()):
+                if not process.is_alive():
+                    print(f"⚠️ Cluster {cluster_id} exited with code {process.exitcode}, restarting.")
+                    spawn(cluster_id)
+            totals = cluster.aggregate(await database.get_cluster_stats(None), stale_after=interval * 4)
+            print(format_totals(totals))
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(15)
+        await database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Yuuki as multiple shard clusters.")
+    parser.add_argument("--clusters", type=int, default=CLUSTER_COUNT, help="number of processes")
+    parser.add_argument("--shards", type=int, default=None, help="total shard count (default: SHARD_COUNT or Discord's recommendation)")
+    parser.add_argument("--stub", action="store_true", help="use a fake gateway instead of connecting to Discord")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    args = parser.parse_args()
+    try:
+        asyncio.run(supervise(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
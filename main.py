@@ -1,40 +1,182 @@
 # main.py
-import os
+import asyncio
+import time
 import discord
 from discord.ext import commands, tasks
-from dotenv import load_dotenv
+from config import TOKEN, SHARD_COUNT, CLUSTER_STATS_INTERVAL, METRICS_HOST, METRICS_PORT, LOW_MEMORY
+from config import HEALTH_SAMPLE_INTERVAL, HEALTH_REPORT_INTERVAL, SLOW_CALLBACK_THRESHOLD, HEALTH_DEBUG_LOOP
+from config import RETENTION_INTERVAL, RETENTION_BATCH, MAINTENANCE_INTERVAL, VACUUM_FREE_RATIO, JOIN_INDEX_HOURS
+from config import COMMAND_SYNC_GUILDS
 from db import database
+from utils import cluster, metrics
+from utils.autoroles import AutoroleWorkers
+from utils.commandsync import sync_on_startup
+from utils.health import HealthMonitor
+from utils.outbound import OutboundQueue
+from utils.retention import RetentionJob
+from utils.scheduler import Scheduler
 
-load_dotenv()
-TOKEN = os.getenv('DISCORD_TOKEN')
-
-intents = discord.Intents.default()
-intents.members = True
-intents.message_content = True
-
-bot = commands.Bot(command_prefix=".", intents=intents, help_command=None)
-
-@tasks.loop(minutes=1)
-async def update_status():
-    await bot.change_presence(activity=discord.Activity(
-        type=discord.ActivityType.watching,
-        name=f".help"
-    ))
-
-@bot.event
-async def setup_hook():
-    for cog in [
-        "cogs.general",
-        "cogs.moderation",
-        "cogs.events",
-    ]:
-        await bot.load_extension(cog)
-    print("✅ All cogs loaded.")
-
-@bot.event
-async def on_ready():
+COGS = [
+    "cogs.general",
+    "cogs.moderation",
+    "cogs.events",
+]
+
+
+class StartupTimer:
+    """Times consecutive startup phases for one summary log line.
+
+    Each ``mark(name)`` closes a phase that began at the previous mark.
+    """
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def summary(self):
+        parts = [f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases]
+        return " | ".join(parts) + f" | total {(self._last - self.started) * 1000:.0f}ms"
+
+
+def create_bot(cluster_id=0, shard_ids=None, shard_count=SHARD_COUNT):
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+
+    cache_options = {}
+    if LOW_MEMORY:
+        # Still receive join/leave events, but keep no members around and skip
+        # chunking every guild at startup. Cogs use utils.members instead.
+        cache_options = {"member_cache_flags": discord.MemberCacheFlags.none(), "chunk_guilds_at_startup": False}
+
+    bot = commands.AutoShardedBot(
+        command_prefix=".", intents=intents, help_command=None,
+        shard_ids=shard_ids, shard_count=shard_count, **cache_options
+    )
+    bot.cluster_id = cluster_id
+    bot.metrics_server = None
+    bot.command_sync = None
+    bot.startup = StartupTimer()
+
+    bot.before_invoke(metrics.before_invoke)
+    bot.after_invoke(metrics.after_invoke)
+
+    @tasks.loop(minutes=1)
+    async def update_status():
+        await bot.change_presence(activity=discord.Activity(
+            type=discord.ActivityType.watching,
+            name=f".help"
+        ))
+
+    @update_status.before_loop
+    async def before_update_status():
+        await bot.wait_until_ready()
+
+    @tasks.loop(seconds=CLUSTER_STATS_INTERVAL)
+    async def publish_cluster_stats():
+        await bot.wait_until_ready()
+        await cluster.publish_stats(bot, bot.cluster_id)
+
+    @bot.event
+    async def setup_hook():
+        # The database is already open and warm; see prepare_database.
+        bot.startup.mark("login")
+        bot.scheduler = Scheduler(bot)
+        bot.outbound = OutboundQueue()
+        bot.autoroles = AutoroleWorkers(bot)
+        bot.health = HealthMonitor(
+            bot, sample_interval=HEALTH_SAMPLE_INTERVAL, report_interval=HEALTH_REPORT_INTERVAL,
+            slow_threshold=SLOW_CALLBACK_THRESHOLD, debug_loop=HEALTH_DEBUG_LOOP
+        )
+        bot.retention = RetentionJob(
+            bot, interval=RETENTION_INTERVAL, batch_size=RETENTION_BATCH,
+            maintenance_interval=MAINTENANCE_INTERVAL, vacuum_ratio=VACUUM_FREE_RATIO,
+            join_index_ttl=JOIN_INDEX_HOURS * 3600
+        )
+
+        await asyncio.gather(*(bot.load_extension(cog) for cog in COGS))
+        bot.startup.mark("cogs")
+        print(f"✅ Loaded {len(COGS)} cogs.")
+
+        if bot.cluster_id == 0:
+            # App commands belong to the application, not a shard, so one cluster syncs for all.
+            bot.command_sync = asyncio.create_task(sync_on_startup(bot, COMMAND_SYNC_GUILDS), name="command-sync")
+
+        await bot.scheduler.start()
+        await bot.autoroles.start()
+        await bot.health.start()
+        await bot.retention.start()
+        publish_cluster_stats.start()
+        update_status.start()
+
+        if METRICS_PORT:
+            metrics.watch_bot(bot)
+            try:
+                bot.metrics_server = await metrics.start_server(METRICS_HOST, METRICS_PORT + bot.cluster_id)
+            except OSError as e:
+                print(f"⚠️ Metrics server failed to start: {e}")
+        bot.startup.mark("services")
+
+    @bot.event
+    async def on_ready():
+        print(f"Logged in as {bot.user} (cluster {bot.cluster_id}, shards {sorted(bot.shards)})")
+        # on_ready fires again after reconnects; only the first one ends startup.
+        if bot.startup is not None:
+            bot.startup.mark("gateway")
+            print(f"⏱️ Startup: {bot.startup.summary()}")
+            bot.startup = None
+
+    return bot
+
+
+async def prepare_database(bot):
+    """Migrate, connect and warm the caches once, before logging in."""
     await database.initialize()
-    print(f"Logged in as {bot.user}")
+    bot.startup.mark("migrate")
+    await database.connect()
+    bot.startup.mark("connect")
+    settings, autoroles = await asyncio.gather(
+        database.warm_settings_cache(bot), database.warm_autorole_cache(bot)
+    )
+    bot.startup.mark("warm caches")
+    print(f"✅ Database ready, cached settings for {settings} guilds and autoroles for {autoroles}.")
+
+
+async def run_bot(bot):
+    try:
+        await prepare_database(bot)
+        async with bot:
+            await bot.start(TOKEN)
+    finally:
+        # Unloading runs each cog's cog_unload so buffered writes are flushed.
+        for extension in list(bot.extensions):
+            await bot.unload_extension(extension)
+        if bot.command_sync is not None:
+            bot.command_sync.cancel()
+        if hasattr(bot, "scheduler"):
+            await bot.scheduler.stop()
+        if hasattr(bot, "health"):
+            await bot.health.stop()
+        if hasattr(bot, "retention"):
+            await bot.retention.stop()
+        if hasattr(bot, "autoroles"):
+            await bot.autoroles.stop()
+        if hasattr(bot, "outbound"):
+            await bot.outbound.close()
+        if bot.metrics_server is not None:
+            await bot.metrics_server.cleanup()
+        await database.close()
+        print("✅ Database pool closed.")
 
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    discord.utils.setup_logging()
+    try:
+        asyncio.run(run_bot(create_bot()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,242 @@
+"""db/database.py against every storage backend.
+
+The same cases run on a fresh SQLite file and, when TEST_POSTGRES_URL is set
+(e.g. postgresql://postgres@localhost/yuuki_test), on PostgreSQL. Each
+PostgreSQL test gets its own schema, dropped afterwards, so the database it
+points at is left as it was.
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+import uuid
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import database
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+GUILD = 1 << 40
+OTHER_GUILD = (1 << 40) + (1 << 22)  # on the next shard of a two-shard split
+MEMBER = 111
+MOD = 222
+
+
+class DatabaseCases:
+    """Mixed into one TestCase per backend; ``open_url`` gives the URL to test against."""
+
+    async def open_url(self):
+        raise NotImplementedError
+
+    async def drop(self):
+        pass
+
+    async def asyncSetUp(self):
+        database.settings_cache.clear()
+        url = await self.open_url()
+        await database.initialize(url)
+        await database.connect(url, size=2)
+
+    async def asyncTearDown(self):
+        await database.close()
+        database.settings_cache.clear()
+        await self.drop()
+
+    async def test_guild_settings(self):
+        await database.set_channel_id(None, GUILD, "welcome_channel", 42)
+        database.settings_cache.clear()
+        self.assertEqual(await database.get_channel_id(None, GUILD, "welcome_channel"), 42)
+        self.assertEqual(await database.get_channels_for(None, "welcome_channel"), [(GUILD, 42)])
+
+        await database.remove_channel_id(None, GUILD, "welcome_channel")
+        database.settings_cache.clear()
+        self.assertIsNone(await database.get_channel_id(None, GUILD, "welcome_channel"))
+        with self.assertRaises(ValueError):
+            await database.get_channel_id(None, GUILD, "not_a_column")
+
+    async def test_autoroles(self):
+        await database.add_autorole(None, GUILD, 5)
+        await database.add_autorole(None, GUILD, 6)
+        await database.remove_autorole(None, GUILD, 5)
+        self.assertEqual(await database.get_autoroles(None, GUILD), [6])
+
+    async def test_autorole_retries_by_shard(self):
+        await database.save_autorole_retries(None, [
+            (GUILD, MEMBER, 1.5, 0, 10, "429"),
+            (OTHER_GUILD, MEMBER, 1.5, 0, 10, "429"),
+            (GUILD, MEMBER + 1, 1.5, 0, 99, "429"),
+        ])
+        self.assertEqual(len(await database.get_due_autorole_retries(None, 50)), 2)
+        due = await database.get_due_autorole_retries(None, 50, shard_count=2, shard_ids=[0])
+        self.assertEqual(due, [(GUILD, MEMBER, 1.5, 0)])
+
+        await database.delete_autorole_retry(None, GUILD, MEMBER)
+        await database.flush()
+        self.assertEqual(await database.count_autorole_retries(None), 2)
+
+    async def test_infractions(self):
+        await database.log_infraction(None, GUILD, MEMBER, MOD, "Warned", "spam", 100)
+        await database.log_infractions(None, GUILD, [MEMBER, MEMBER + 1], MOD, "Banned", "raid", 200)
+        self.assertEqual(await database.count_infractions(None, GUILD, MEMBER), 2)
+        self.assertEqual(
+            [i["action"] for i in await database.get_infractions(None, GUILD, MEMBER)], ["Warned", "Banned"]
+        )
+
+        first = await database.get_infractions_page(None, GUILD, MEMBER, limit=1)
+        after = (first[0]["timestamp"], first[0]["id"])
+        second = await database.get_infractions_page(None, GUILD, MEMBER, limit=1, after=after)
+        self.assertEqual(second[0]["reason"], "raid")
+
+        rows = [row async for row in database.iter_infractions(None, GUILD, batch_size=1)]
+        self.assertEqual([row[1] for row in rows], [MEMBER, MEMBER, MEMBER + 1])
+
+        await database.clear_infractions(None, GUILD, MEMBER)
+        self.assertEqual(await database.count_infractions(None, GUILD, MEMBER), 0)
+        self.assertEqual(await database.count_guild_infractions(None, GUILD), 1)
+
+    async def test_import_skips_existing(self):
+        await database.log_infraction(None, GUILD, MEMBER, MOD, "Warned", None, 50, wait=True)
+        rows = [(MEMBER, MOD, "Warned", "spam", 100), (MEMBER, MOD, "Warned", "", 50)]
+        await database.import_infractions(None, GUILD, rows)
+        await database.import_infractions(None, GUILD, rows)
+        self.assertEqual(await database.count_infractions(None, GUILD, MEMBER), 2)
+
+    async def test_retention_archive(self):
+        await database.set_retention_policy(None, GUILD, "Warned", 30)
+        self.assertEqual(await database.get_retention_policies(None, GUILD), [(GUILD, "Warned", 30)])
+        await database.import_infractions(None, GUILD, [
+            (MEMBER, MOD, "Warned", "old", 100),
+            (MEMBER, MOD, "Warned", "new", 10_000),
+            (MEMBER, MOD, "Banned", "old ban", 100),
+        ])
+
+        expired = await database.get_expired_infractions(None, GUILD, "Warned", cutoff=1_000)
+        self.assertEqual([row[4] for row in expired], ["old"])
+        await database.archive_infractions(None, GUILD, expired)
+
+        self.assertEqual(await database.count_infractions(None, GUILD, MEMBER), 2)
+        self.assertEqual(await database.count_archived_infractions(None, GUILD, MEMBER), 1)
+        archived = await database.get_archived_infractions(None, GUILD, MEMBER)
+        self.assertEqual((archived[0]["reason"], archived[0]["timestamp"]), ("old", 100))
+
+        stats = await database.table_stats(None)
+        self.assertEqual(stats["rows"]["archived_infractions"], 1)
+        self.assertGreater(stats["database_bytes"], 0)
+        result = await database.maintain(None, vacuum=True)
+        self.assertTrue(result["vacuumed"])
+
+        await database.clear_infractions(None, GUILD, MEMBER)
+        self.assertEqual(await database.count_archived_infractions(None, GUILD, MEMBER), 0)
+        await database.remove_retention_policy(None, GUILD, "Warned")
+        self.assertEqual(await database.get_retention_policies(None), [])
+
+    async def test_member_joins(self):
+        now = int(time.time())
+        await database.record_member_join(None, GUILD, MEMBER, now - 600)
+        await database.record_member_join(None, GUILD, MEMBER + 1, now - 30)
+        await database.record_member_join(None, GUILD, MEMBER + 1, now - 30)
+        await database.flush()
+        self.assertEqual(await database.get_recent_joins(None, GUILD, now - 60), [MEMBER + 1])
+
+        await database.prune_member_joins(None, now - 60)
+        self.assertEqual(await database.get_recent_joins(None, GUILD, 0), [MEMBER + 1])
+
+    async def test_scheduled_actions(self):
+        first = await database.add_scheduled_action(None, GUILD, "unmute", MEMBER, 100, {"channel_id": 7})
+        second = await database.add_scheduled_action(None, OTHER_GUILD, "unban", MEMBER, 200)
+        self.assertNotEqual(first, second)
+        self.assertEqual(
+            sorted(tuple(row) for row in await database.get_scheduled_action_times(None)),
+            [(100, first, GUILD), (200, second, OTHER_GUILD)]
+        )
+
+        actions = await database.get_scheduled_actions(None, [first])
+        self.assertEqual(actions[0]["payload"], {"channel_id": 7})
+        await database.set_scheduled_action_payloads(None, [(first, {"channel_id": 7, "attempts": 1})])
+        actions = await database.get_scheduled_actions(None, [first])
+        self.assertEqual(actions[0]["payload"], {"channel_id": 7, "attempts": 1})
+        await database.delete_scheduled_actions(None, [first])
+        await database.cancel_scheduled_actions(None, OTHER_GUILD, "unban", MEMBER)
+        self.assertEqual(await database.get_scheduled_action_times(None), [])
+
+    async def test_giveaways(self):
+        giveaway_id = await database.create_giveaway(None, GUILD, 7, MOD, "Nitro", 1, 500)
+        await database.set_giveaway_message(None, giveaway_id, 99)
+        await database.add_giveaway_entries(None, [(giveaway_id, MEMBER), (giveaway_id, MEMBER)])
+        self.assertEqual(await database.count_giveaway_entries(None, giveaway_id), 1)
+        self.assertTrue(await database.has_giveaway_entry(None, giveaway_id, MEMBER))
+        self.assertEqual(await database.get_giveaway_entry_at(None, giveaway_id, 0), MEMBER)
+
+        await database.mark_giveaway_ended(None, giveaway_id)
+        giveaway = await database.get_giveaway_by_message(None, GUILD, 99)
+        self.assertEqual((giveaway["id"], giveaway["ended"]), (giveaway_id, True))
+
+    async def test_templates_and_automod(self):
+        await database.set_message_template(None, GUILD, "welcome", "Hi {member_name}", None, 0xFF0000)
+        self.assertEqual(
+            await database.get_message_template(None, GUILD, "welcome"),
+            {"title": "Hi {member_name}", "description": None, "color": 0xFF0000}
+        )
+        await database.delete_message_template(None, GUILD, "welcome")
+        self.assertIsNone(await database.get_message_template(None, GUILD, "welcome"))
+
+        await database.add_automod_rules(None, GUILD, "word", ["foo", "bar", "foo"])
+        await database.remove_automod_rules(None, GUILD, "word", ["bar"])
+        self.assertEqual(await database.get_automod_rules(None, GUILD), [("word", "foo")])
+
+    async def test_command_sync_hash(self):
+        self.assertIsNone(await database.get_command_sync_hash(None, 1, 0))
+        await database.set_command_sync_hash(None, 1, 0, "a" * 64, 100)
+        await database.set_command_sync_hash(None, 1, 0, "b" * 64, 200)
+        self.assertEqual(await database.get_command_sync_hash(None, 1, 0), "b" * 64)
+
+    async def test_cluster_stats(self):
+        await database.publish_cluster_stats(None, 0, 1234, {0: {"latency": 0.05, "guilds": 3}}, 100)
+        stats = await database.get_cluster_stats(None)
+        self.assertEqual(len(stats), 1)
+        await database.clear_cluster_stats(None)
+        self.assertEqual(await database.get_cluster_stats(None), [])
+
+
+class SQLiteDatabaseTest(DatabaseCases, unittest.IsolatedAsyncioTestCase):
+    async def open_url(self):
+        self.directory = tempfile.mkdtemp()
+        return os.path.join(self.directory, "yuuki_test.db")
+
+    async def drop(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+@unittest.skipUnless(POSTGRES_URL, "TEST_POSTGRES_URL is not set")
+class PostgresDatabaseTest(DatabaseCases, unittest.IsolatedAsyncioTestCase):
+    async def open_url(self):
+        import asyncpg
+
+        self.schema = f"yuuki_test_{uuid.uuid4().hex[:12]}"
+        conn = await asyncpg.connect(POSTGRES_URL)
+        try:
+            await conn.execute(f"CREATE SCHEMA {self.schema}")
+        finally:
+            await conn.close()
+        # asyncpg passes unknown URL parameters on as server settings.
+        separator = "&" if "?" in POSTGRES_URL else "?"
+        return f"{POSTGRES_URL}{separator}search_path={quote(self.schema)}"
+
+    async def drop(self):
+        import asyncpg
+
+        conn = await asyncpg.connect(POSTGRES_URL)
+        try:
+            await conn.execute(f"DROP SCHEMA {self.schema} CASCADE")
+        finally:
+            await conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
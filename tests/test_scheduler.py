@@ -0,0 +1,90 @@
+"""utils/scheduler.py against a throwaway SQLite database.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import database
+from utils.scheduler import Scheduler
+
+GUILD = 1 << 40
+
+
+class FakeBot:
+    shard_ids = None
+    shard_count = None
+
+    def get_guild(self, guild_id):
+        return object()
+
+    async def wait_until_ready(self):
+        # Keeps the timer task idle; the tests drive _fire themselves.
+        await asyncio.Event().wait()
+
+
+class SchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.mkdtemp()
+        url = os.path.join(self.directory, "yuuki_test.db")
+        await database.initialize(url)
+        await database.connect(url, size=2)
+        self.scheduler = Scheduler(FakeBot())
+        await self.scheduler.start()
+
+    async def asyncTearDown(self):
+        await self.scheduler.stop()
+        await database.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    async def test_success_deletes_row(self):
+        ran = []
+
+        async def handler(action):
+            ran.append(action["target_id"])
+
+        self.scheduler.register("unmute", handler)
+        action_id = await self.scheduler.schedule(GUILD, "unmute", 5, 0, {"channel_id": 7})
+        await self.scheduler._fire([action_id])
+        self.assertEqual(ran, [5])
+        self.assertEqual(self.scheduler.fired, 1)
+        self.assertEqual(await database.get_scheduled_actions(None, [action_id]), [])
+
+    async def test_failing_handler_keeps_row(self):
+        async def handler(action):
+            raise RuntimeError("503 Service Unavailable")
+
+        self.scheduler.register("unban", handler)
+        action_id = await self.scheduler.schedule(GUILD, "unban", 5, 0, {"channel_id": 7})
+        await self.scheduler._fire([action_id])
+
+        actions = await database.get_scheduled_actions(None, [action_id])
+        self.assertEqual(actions[0]["payload"], {"channel_id": 7, "attempts": 1})
+        self.assertEqual(self.scheduler.fired, 0)
+        self.assertIn(action_id, [entry[1] for entry in self.scheduler._heap])
+
+    async def test_failing_handler_gives_up(self):
+        async def handler(action):
+            raise RuntimeError("still failing")
+
+        self.scheduler.register("unban", handler)
+        action_id = await self.scheduler.schedule(GUILD, "unban", 5, 0)
+        for _ in range(Scheduler.MAX_ATTEMPTS):
+            await self.scheduler._fire([action_id])
+        self.assertEqual(await database.get_scheduled_actions(None, [action_id]), [])
+        self.assertEqual(self.scheduler.fired, 0)
+
+    async def test_missing_handler_keeps_row(self):
+        action_id = await self.scheduler.schedule(GUILD, "giveaway_end", 5, 0)
+        await self.scheduler._fire([action_id])
+        self.assertEqual(len(await database.get_scheduled_actions(None, [action_id])), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import re
+
+from db import database
+
+RULE_KINDS = ("word", "link")
+
+# Hosts in http(s) links and bare "something.tld/..." mentions.
+_LINK_RE = re.compile(r"(?:https?://)?((?:[a-z0-9-]+\.)+[a-z]{2,})(?::\d+)?(?:[/?#]\S*)?", re.ASCII)
+
+
+def trie_pattern(words):
+    """Build one regex alternation from ``words``, factored as a prefix trie.
+
+    A flat ``a|b|c`` alternation retries every word at every position; the
+    trie form shares prefixes, so the regex engine does a handful of
+    character comparisons per position regardless of how many words there are.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        terminal = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if terminal else body
+
+    return build(trie)
+
+
+class CompiledRules:
+    """A guild's automod rules compiled for matching against message content."""
+
+    __slots__ = ("word_re", "domains", "block_all_links", "count")
+
+    def __init__(self, words=(), domains=()):
+        words = {w.lower() for w in words if w}
+        domains = {d.lower().lstrip(".") for d in domains if d}
+        self.block_all_links = "*" in domains
+        domains.discard("*")
+        self.domains = frozenset(domains)
+        self.count = len(words) + len(domains) + self.block_all_links
+        # Words only match on their own, so "ass" does not hit "class".
+        self.word_re = re.compile(rf"(?<!\w)(?:{trie_pattern(words)})(?!\w)") if words else None
+
+    def __bool__(self):
+        return self.count > 0
+
+    def check(self, content):
+        """Return ``(kind, matched text)`` for the first rule hit, or None."""
+        lowered = content.lower()
+        if self.word_re is not None:
+            match = self.word_re.search(lowered)
+            if match:
+                return "word", match.group(0)
+        if (self.domains or self.block_all_links) and "." in lowered:
+            for match in _LINK_RE.finditer(lowered):
+                host = match.group(1)
+                if self.block_all_links:
+                    return "link", host
+                # Check the host and each parent domain: a.b.example.com, b.example.com, example.com
+                parts = host.split(".")
+                for i in range(len(parts) - 1):
+                    if ".".join(parts[i:]) in self.domains:
+                        return "link", host
+        return None
+
+
+EMPTY_RULES = CompiledRules()
+
+
+class AutomodCache:
+    """Compiled rules per guild, rebuilt only when that guild's rules change."""
+
+    def __init__(self):
+        self._guilds = {}
+        self.builds = 0
+
+    async def get(self, bot, guild_id):
+        rules = self._guilds.get(guild_id)
+        if rules is None:
+            rows = await database.get_automod_rules(bot, guild_id)
+            words = [pattern for kind, pattern in rows if kind == "word"]
+            domains = [pattern for kind, pattern in rows if kind == "link"]
+            rules = CompiledRules(words, domains) if rows else EMPTY_RULES
+            self._guilds[guild_id] = rules
+            self.builds += 1
+        return rules
+
+    def invalidate(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def __len__(self):
+        return len(self._guilds)
+
+
+automod_cache = AutomodCache()
@@ -0,0 +1,205 @@
+import asyncio
+import random
+import time
+
+import discord
+
+from db import database
+from utils import cluster, metrics
+from utils.members import member_cache
+
+LAG_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 3600.0)
+
+assignment_lag = metrics.registry.histogram(
+    "yuuki_autorole_lag_seconds", "Time from a member joining to their autoroles being applied.",
+    buckets=LAG_BUCKETS
+)
+assignments = metrics.registry.counter(
+    "yuuki_autorole_assignments_total", "Autorole jobs by outcome.", ("result",)
+)
+
+
+class AutoroleJob:
+    __slots__ = ("guild_id", "user_id", "joined_at", "attempts", "member", "persisted")
+
+    def __init__(self, guild_id, user_id, joined_at, attempts=0, member=None, persisted=False):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.joined_at = joined_at
+        self.attempts = attempts
+        self.member = member
+        self.persisted = persisted
+
+    def retry_row(self, next_attempt_at, error):
+        return (self.guild_id, self.user_id, self.joined_at, self.attempts, int(next_attempt_at), error)
+
+
+class AutoroleWorkers:
+    """Applies autoroles to new members from a queue with a fixed number of workers.
+
+    Joins only enqueue a job, so a raid cannot flood the HTTP client with
+    role requests. Rate limits and server errors are retried in place with
+    exponential backoff; a job that still fails is written to
+    autorole_retries and picked up again later, surviving restarts. The
+    guild's autoroles are looked up when the job runs, so retries apply the
+    current configuration. Each cluster only picks up retries for guilds on
+    its own shards.
+    """
+
+    def __init__(self, bot, workers=4, retries=4, base_delay=1.0, max_queue=10000,
+                 retry_interval=60, retry_batch=200, max_attempts=8):
+        self.bot = bot
+        self.workers = workers
+        self.retries = retries
+        self.base_delay = base_delay
+        self.retry_interval = retry_interval
+        self.retry_batch = retry_batch
+        self.max_attempts = max_attempts
+        self._queue = asyncio.Queue(max_queue)
+        self._queued = set()
+        self._running = set()
+        self._tasks = []
+        self.applied = 0
+        self.deferred = 0
+        self.last_lag = None
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._work(), name=f"autorole-{i}") for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._poll_retries(), name="autorole-retries"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs still waiting or cut off mid-request are saved so they run after the restart.
+        leftover = [job.retry_row(time.time(), "shutdown") for job in self._running]
+        while not self._queue.empty():
+            leftover.append(self._queue.get_nowait().retry_row(time.time(), "shutdown"))
+        self._running.clear()
+        if leftover:
+            await database.save_autorole_retries(self.bot, leftover)
+        self._queued.clear()
+
+    async def submit(self, member):
+        joined_at = member.joined_at.timestamp() if member.joined_at else time.time()
+        await self._enqueue(AutoroleJob(member.guild.id, member.id, joined_at, member=member))
+
+    async def _enqueue(self, job):
+        key = (job.guild_id, job.user_id)
+        if key in self._queued:
+            return
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            await self._defer(job, "queue full", delay=0)
+            return
+        self._queued.add(key)
+
+    async def _defer(self, job, error, delay=None):
+        if delay is None:
+            delay = min(3600, self.retry_interval * 2 ** job.attempts)
+        self.deferred += 1
+        assignments.inc("deferred")
+        await database.save_autorole_retries(self.bot, [job.retry_row(time.time() + delay, error)], wait=False)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "applied": self.applied, "deferred": self.deferred,
+                "last_lag": self.last_lag}
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            self._queued.discard((job.guild_id, job.user_id))
+            self._running.add(job)
+            try:
+                await self._run(job)
+            except Exception as e:
+                print(f"⚠️ Autorole job for {job.user_id} in {job.guild_id} failed: {e}")
+            finally:
+                self._running.discard(job)
+
+    async def _finish(self, job, result):
+        assignments.inc(result)
+        if job.persisted:
+            await database.delete_autorole_retry(self.bot, job.guild_id, job.user_id)
+
+    async def _run(self, job):
+        guild = self.bot.get_guild(job.guild_id)
+        if guild is None:
+            if not cluster.owns_guild(self.bot, job.guild_id):
+                return  # another cluster's guild; its row is left for that cluster
+            # Ours but unavailable (an outage, or not cached yet): try again later.
+            job.attempts += 1
+            job.member = None
+            if job.attempts >= self.max_attempts:
+                await self._finish(job, "gone")
+            else:
+                await self._defer(job, "guild unavailable")
+            return
+        role_ids = await database.get_autoroles(self.bot, job.guild_id)
+        roles = [r for r in (guild.get_role(rid) for rid in role_ids) if r is not None]
+        if not roles:
+            await self._finish(job, "no_roles")
+            return
+
+        member = job.member or await member_cache.resolve(guild, job.user_id, fresh=True)
+        if member is None:
+            await self._finish(job, "gone")
+            return
+
+        for attempt in range(self.retries + 1):
+            try:
+                await member.add_roles(*roles, reason="Autorole")
+            except discord.NotFound:
+                await self._finish(job, "gone")
+                return
+            except discord.Forbidden as e:
+                print(f"⚠️ Could not assign autoroles to {member} in {guild.name}: {e}")
+                await self._finish(job, "forbidden")
+                return
+            except discord.HTTPException as e:
+                if (e.status == 429 or e.status >= 500) and attempt < self.retries:
+                    await asyncio.sleep(self.base_delay * 2 ** attempt * random.uniform(1, 1.5))
+                    continue
+                job.attempts += 1
+                job.member = None
+                if job.attempts >= self.max_attempts:
+                    print(f"⚠️ Giving up on autoroles for {member} in {guild.name}: {e}")
+                    await self._finish(job, "failed")
+                else:
+                    await self._defer(job, f"{e.status} {e.text}"[:200])
+                return
+
+            lag = max(0.0, time.time() - job.joined_at)
+            self.last_lag = lag
+            self.applied += 1
+            assignment_lag.observe(lag)
+            await self._finish(job, "applied")
+            return
+
+    async def _poll_retries(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                due = await database.get_due_autorole_retries(
+                    self.bot, int(time.time()), limit=self.retry_batch,
+                    shard_count=self.bot.shard_count, shard_ids=self.bot.shard_ids
+                )
+            except Exception as e:
+                print(f"⚠️ Could not load autorole retries: {e}")
+                due = []
+            if due:
+                # Pushed out first so a row is not picked up again while its attempt runs.
+                await database.save_autorole_retries(self.bot, [
+                    (guild_id, user_id, joined_at, attempts, int(time.time()) + self.retry_interval * 5, "in progress")
+                    for guild_id, user_id, joined_at, attempts in due
+                ])
+            for guild_id, user_id, joined_at, attempts in due:
+                await self._enqueue(AutoroleJob(guild_id, user_id, joined_at, attempts, persisted=True))
+            await asyncio.sleep(self.retry_interval)
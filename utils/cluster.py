@@ -0,0 +1,115 @@
+import os
+import time
+
+from db import database
+
+
+def split_shards(shard_count, cluster_count):
+    """Split shard ids 0..shard_count-1 into ``cluster_count`` contiguous groups."""
+    cluster_count = max(1, min(cluster_count, shard_count))
+    size, extra = divmod(shard_count, cluster_count)
+    groups, start = [], 0
+    for cluster_id in range(cluster_count):
+        end = start + size + (1 if cluster_id < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+def owns_guild(bot, guild_id):
+    """Whether ``guild_id`` lives on one of the shards this process runs.
+
+    Works before the gateway connects, unlike ``bot.get_guild``. A process
+    started without explicit shard ids runs every shard.
+    """
+    if bot.shard_ids is None or not bot.shard_count:
+        return True
+    return (guild_id >> 22) % bot.shard_count in bot.shard_ids
+
+
+def collect_shard_stats(bot):
+    """Per-shard gateway latency and guild count for the shards this process runs."""
+    guilds = {}
+    for guild in bot.guilds:
+        guilds[guild.shard_id] = guilds.get(guild.shard_id, 0) + 1
+
+    latencies = getattr(bot, "latencies", None) or [(0, bot.latency)]
+    return {
+        shard_id: {
+            "latency": latency if latency == latency else None,  # NaN before the first heartbeat
+            "guilds": guilds.get(shard_id, 0),
+        }
+        for shard_id, latency in latencies
+    }
+
+
+async def publish_stats(bot, cluster_id):
+    await database.publish_cluster_stats(
+        bot, cluster_id, os.getpid(), collect_shard_stats(bot), int(time.time())
+    )
+
+
+def aggregate(clusters, stale_after=120):
+    """Fold cluster_stats rows into totals; clusters silent for too long are flagged stale."""
+    now = time.time()
+    latencies = []
+    total = {"clusters": [], "shards": 0, "guilds": 0, "latency": None}
+    for cluster in clusters:
+        shard_latencies = [s["latency"] for s in cluster["shards"].values() if s["latency"] is not None]
+        guilds = sum(s["guilds"] for s in cluster["shards"].values())
+        total["clusters"].append({
+            "cluster_id": cluster["cluster_id"],
+            "shards": sorted(cluster["shards"]),
+            "guilds": guilds,
+            "latency": sum(shard_latencies) / len(shard_latencies) if shard_latencies else None,
+            "stale": now - cluster["updated_at"] > stale_after,
+        })
+        total["shards"] += len(cluster["shards"])
+        total["guilds"] += guilds
+        latencies.extend(shard_latencies)
+    if latencies:
+        total["latency"] = sum(latencies) / len(latencies)
+    return total
+
+
+class _StubShard:
+    def __init__(self, shard_id):
+        self.id = shard_id
+
+
+class _StubGuild:
+    __slots__ = ("id", "shard_id")
+
+    def __init__(self, guild_id, shard_id):
+        self.id = guild_id
+        self.shard_id = shard_id
+
+
+class StubGateway:
+    """Stands in for a connected AutoShardedBot when testing the launcher locally.
+
+    Exposes just what collect_shard_stats reads: ``guilds``, ``latency``
+    and ``latencies``. Guilds are assigned to shards with Discord's
+    ``(guild_id >> 22) % shard_count`` rule.
+    """
+
+    def __init__(self, shard_ids, shard_count, guilds_per_shard=50):
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.shards = {shard_id: _StubShard(shard_id) for shard_id in shard_ids}
+        self.guilds = []
+        guild_id = 1 << 22
+        while len(self.guilds) < guilds_per_shard * len(shard_ids):
+            shard_id = (guild_id >> 22) % shard_count
+            if shard_id in self.shards:
+                self.guilds.append(_StubGuild(guild_id, shard_id))
+            guild_id += 1 << 22
+
+    @property
+    def latencies(self):
+        return [(shard_id, 0.04 + 0.01 * (shard_id % 5)) for shard_id in self.shard_ids]
+
+    @property
+    def latency(self):
+        latencies = self.latencies
+        return sum(l for _, l in latencies) / len(latencies)
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import time
+
+import discord
+
+from db import database
+
+
+def tree_hash(tree, guild=None):
+    """A stable hash of the payload ``tree.sync(guild=guild)`` would upload."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda c: (c.get("type", 1), c["name"])
+    )
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+async def sync_commands(bot, guild_ids=(), force=False):
+    """Sync the app command tree to every scope whose hash changed since its last sync.
+
+    With ``guild_ids`` the global commands are copied into those guilds and
+    synced there instead of globally. Hashes live in app_command_sync, which
+    every cluster shares, so restarting with unchanged commands costs one
+    query per scope instead of a heavily rate-limited sync request. Returns
+    one ``{"scope", "synced", "commands"}`` dict per scope.
+    """
+    tree = bot.tree
+    results = []
+    for guild in [discord.Object(id=guild_id) for guild_id in guild_ids] or [None]:
+        if guild is not None:
+            tree.copy_global_to(guild=guild)
+        scope = guild.id if guild is not None else 0
+        label = f"guild {scope}" if scope else "global"
+        digest = tree_hash(tree, guild)
+        if not force and await database.get_command_sync_hash(bot, bot.application_id, scope) == digest:
+            print(f"✅ App commands unchanged ({label}), skipped sync.")
+            results.append({"scope": scope, "synced": False, "commands": len(tree.get_commands(guild=guild))})
+            continue
+        synced = await tree.sync(guild=guild)
+        # Stored only after a successful sync, so a failed one is retried next start.
+        await database.set_command_sync_hash(bot, bot.application_id, scope, digest, int(time.time()))
+        print(f"✅ Synced {len(synced)} app commands ({label}).")
+        results.append({"scope": scope, "synced": True, "commands": len(synced)})
+    return results
+
+
+async def sync_on_startup(bot, guild_ids=()):
+    # Runs as a background task so a rate-limited sync never holds up startup.
+    try:
+        await sync_commands(bot, guild_ids)
+    except discord.HTTPException as e:
+        print(f"⚠️ App command sync failed: {e}")
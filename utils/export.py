@@ -0,0 +1,141 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+
+EXPORT_FORMATS = ("csv", "jsonl")
+# Exports with more rows than this are gzip-compressed.
+COMPRESS_ABOVE_ROWS = 5000
+# Leaves room for data still buffered in the compressor when a part's size is checked.
+_PART_MARGIN = 512 * 1024
+
+
+class ExportWriter:
+    """Writes rows to temporary files as CSV or JSONL, never holding them in memory.
+
+    When ``compress`` is set each part is a standalone .gz file. Once a part
+    reaches ``max_bytes`` on disk a new one is started, so every file fits
+    under Discord's upload limit; CSV parts each repeat the header.
+    """
+
+    def __init__(self, columns, fmt="csv", compress=False, max_bytes=8 * 1024 * 1024, basename="export"):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}")
+        self.columns = columns
+        self.fmt = fmt
+        self.compress = compress
+        self.max_bytes = max(max_bytes - _PART_MARGIN, 64 * 1024)
+        self.basename = basename
+        self.rows = 0
+        self.parts = []
+        self._raw = self._text = self._gzip = self._csv = None
+
+    def _open_part(self):
+        self._raw = tempfile.TemporaryFile()
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6) if self.compress else None
+        self._text = io.TextIOWrapper(self._gzip or self._raw, encoding="utf-8", newline="")
+        if self.fmt == "csv":
+            self._csv = csv.writer(self._text)
+            self._csv.writerow(self.columns)
+
+    def _close_part(self):
+        self._text.flush()
+        self._text.detach()
+        if self._gzip is not None:
+            self._gzip.close()
+        self._raw.seek(0)
+        self.parts.append(self._raw)
+        self._raw = self._text = self._gzip = self._csv = None
+
+    def write(self, row):
+        if self._raw is None:
+            self._open_part()
+        if self.fmt == "csv":
+            self._csv.writerow(row)
+        else:
+            self._text.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + "\n")
+        self.rows += 1
+        if self.rows % 1000 == 0:
+            self._text.flush()
+            if self._raw.tell() >= self.max_bytes:
+                self._close_part()
+
+    def finish(self):
+        """Close the last part and return ``[(filename, file), ...]``."""
+        if self._raw is None and not self.parts:
+            self._open_part()
+        if self._raw is not None:
+            self._close_part()
+        ext = self.fmt + (".gz" if self.compress else "")
+        if len(self.parts) == 1:
+            return [(f"{self.basename}.{ext}", self.parts[0])]
+        return [(f"{self.basename}.part{i}.{ext}", f) for i, f in enumerate(self.parts, start=1)]
+
+    def discard(self):
+        for f in self.parts + ([self._raw] if self._raw is not None else []):
+            f.close()
+        self.parts = []
+        self._raw = None
+
+
+def open_import(fileobj):
+    """Wrap an uploaded file (plain or gzip) for reading as text."""
+    magic = fileobj.read(2)
+    fileobj.seek(0)
+    if magic == b"\x1f\x8b":
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    return io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+
+
+def read_rows(text, fmt):
+    """Yield one dict per record from a CSV (with header) or JSONL text stream.
+
+    Lines that are not valid JSON yield None so the caller can count them.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(text)
+        return
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else None
+
+
+def infraction_from_record(record):
+    """``(user_id, mod_id, action, reason, timestamp)`` from an exported record, or None if invalid."""
+    if not record:
+        return None
+    try:
+        user_id = int(record["user_id"])
+        mod_id = int(record["mod_id"])
+        timestamp = int(record["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    action = str(record.get("action") or "").strip()
+    if not action:
+        return None
+    return user_id, mod_id, action[:64], str(record.get("reason") or ""), timestamp
+
+
+def read_infraction_batch(records, size):
+    """The next ``size`` valid rows from ``records`` plus how many invalid ones were passed over.
+
+    Decompressing and parsing block, so callers on the event loop run this
+    through asyncio.to_thread.
+    """
+    batch, skipped = [], 0
+    for record in records:
+        row = infraction_from_record(record)
+        if row is None:
+            skipped += 1
+            continue
+        batch.append(row)
+        if len(batch) == size:
+            break
+    return batch, skipped
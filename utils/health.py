@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import deque
+
+import discord
+
+from db import database
+from utils import metrics
+from utils.outbound import PRIORITY_LOW
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.0f}ms" if seconds is not None else "n/a"
+
+
+class HealthMonitor:
+    """Samples process health in the background and posts heartbeat reports.
+
+    Every ``sample_interval`` seconds one timer measures how late the event
+    loop woke it up (anything over ``slow_threshold`` means some callback
+    held the loop and counts as a stall) and records each shard's gateway
+    latency. Samples from the last ``window`` seconds are kept.
+
+    Every ``report_interval`` seconds a single snapshot is built and the
+    same embed is queued for every guild's heartbeat channel.
+    """
+
+    def __init__(self, bot, sample_interval=1.0, report_interval=1800.0, slow_threshold=0.1,
+                 window=300.0, debug_loop=False):
+        self.bot = bot
+        self.sample_interval = sample_interval
+        self.report_interval = report_interval
+        self.slow_threshold = slow_threshold
+        self.debug_loop = debug_loop
+        samples = max(1, int(window / sample_interval))
+        self._lags = deque(maxlen=samples)
+        self._gateway = deque(maxlen=samples * 4)
+        self._stalls = deque()
+        self.window = window
+        self.started = time.monotonic()
+        self.reports_sent = 0
+        self._tasks = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        if self.debug_loop:
+            # asyncio then logs each callback slower than this, with its name.
+            loop.slow_callback_duration = self.slow_threshold
+            loop.set_debug(True)
+        self._tasks = [
+            asyncio.create_task(self._sample(), name="health-sample"),
+            asyncio.create_task(self._report(), name="health-report"),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.sample_interval)
+            now = loop.time()
+            lag = max(0.0, now - started - self.sample_interval)
+            self._lags.append(lag)
+            if lag >= self.slow_threshold:
+                self._stalls.append((now, lag))
+                print(f"⚠️ Event loop stalled for {lag * 1000:.0f}ms")
+            while self._stalls and now - self._stalls[0][0] > self.window:
+                self._stalls.popleft()
+
+            for _, latency in getattr(self.bot, "latencies", None) or [(0, self.bot.latency)]:
+                if latency == latency and latency != float("inf"):
+                    self._gateway.append(latency)
+
+    def snapshot(self):
+        lags = sorted(self._lags)
+        gateway = sorted(self._gateway)
+        queue = database.write_queue_stats()
+        autoroles = getattr(self.bot, "autoroles", None)
+        outbound = getattr(self.bot, "outbound", None)
+        return {
+            "uptime": time.monotonic() - self.started,
+            "guilds": len(self.bot.guilds),
+            "loop_lag_p50": _percentile(lags, 0.50),
+            "loop_lag_p99": _percentile(lags, 0.99),
+            "loop_lag_max": lags[-1] if lags else None,
+            "stalls": len(self._stalls),
+            "worst_stall": max((lag for _, lag in self._stalls), default=None),
+            "gateway_p50": _percentile(gateway, 0.50),
+            "gateway_p99": _percentile(gateway, 0.99),
+            "tasks": len(asyncio.all_tasks()),
+            "db_queued": queue.get("queued", 0),
+            "db_pending": queue.get("pending", 0),
+            "db_last_commit_ms": queue.get("last_commit_ms"),
+            "outbound": outbound.depth() if outbound is not None else 0,
+            "autoroles": autoroles.depth() if autoroles is not None else 0,
+            "memory_mb": metrics.process_memory()[0],
+        }
+
+    def make_embed(self, snap=None):
+        snap = snap or self.snapshot()
+        healthy = snap["stalls"] == 0 and (snap["gateway_p99"] or 0) < 1.0
+        hours, rest = divmod(int(snap["uptime"]), 3600)
+        embed = discord.Embed(
+            title=f"{'💚' if healthy else '🟠'} Heartbeat",
+            color=discord.Color.green() if healthy else discord.Color.orange(),
+            timestamp=discord.utils.utcnow()
+        )
+        embed.description = (
+            f"Uptime `{hours}h {rest // 60}m` | guilds `{snap['guilds']}` | memory `{snap['memory_mb']:.0f} MB`"
+        )
+        embed.add_field(name="Event loop", value=(
+            f"lag p50 `{_ms(snap['loop_lag_p50'])}` p99 `{_ms(snap['loop_lag_p99'])}` | "
+            f"stalls `{snap['stalls']}` (worst `{_ms(snap['worst_stall'])}`) | tasks `{snap['tasks']}`"
+        ), inline=False)
+        embed.add_field(name="Gateway", value=(
+            f"p50 `{_ms(snap['gateway_p50'])}` | p99 `{_ms(snap['gateway_p99'])}`"
+        ), inline=False)
+        embed.add_field(name="Queues", value=(
+            f"db `{snap['db_queued']}` queued / `{snap['db_pending']}` pending | "
+            f"outbound `{snap['outbound']}` | autoroles `{snap['autoroles']}`"
+        ), inline=False)
+        return embed
+
+    async def send_reports(self):
+        """Build one report and queue it for every heartbeat channel this process can see."""
+        embed = self.make_embed()
+        sent = 0
+        for _, channel_id in await database.get_channels_for(self.bot, "heartbeat_channel"):
+            channel = self.bot.get_channel(channel_id)
+            if channel is not None:
+                self.bot.outbound.send(channel, embed=embed, priority=PRIORITY_LOW)
+                sent += 1
+        self.reports_sent += sent
+        return sent
+
+    async def _report(self):
+        await self.bot.wait_until_ready()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            try:
+                await self.send_reports()
+            except Exception as e:
+                print(f"⚠️ Heartbeat report failed: {e}")
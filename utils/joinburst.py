@@ -0,0 +1,61 @@
+import time
+from collections import deque
+
+
+class JoinBurstDetector:
+    """Tracks per-guild join rate and flags guilds that are in a join storm.
+
+    A guild enters burst mode once ``threshold`` joins land inside
+    ``window`` seconds and leaves it when the rate falls below half of that,
+    so a rate hovering around the threshold does not flip back and forth.
+    Guilds without a join in the last ``window`` seconds are swept out at
+    most once per window, so memory tracks recently active guilds only.
+    """
+
+    def __init__(self, threshold, window):
+        self.threshold = max(1, threshold)
+        self.window = window
+        self._joins = {}
+        self._bursting = set()
+        self._next_sweep = 0.0
+
+    def record(self, guild_id, now=None):
+        now = time.monotonic() if now is None else now
+        if now >= self._next_sweep:
+            self._sweep(now)
+        joins = self._joins.get(guild_id)
+        if joins is None:
+            # Only the newest `threshold` joins are needed to tell whether
+            # the rate is above the threshold.
+            joins = self._joins[guild_id] = deque(maxlen=self.threshold)
+        joins.append(now)
+        self._prune(joins, now)
+
+        if len(joins) >= self.threshold:
+            self._bursting.add(guild_id)
+        elif len(joins) < self.threshold / 2:
+            self._bursting.discard(guild_id)
+        return guild_id in self._bursting
+
+    def is_bursting(self, guild_id, now=None):
+        joins = self._joins.get(guild_id)
+        if joins is not None:
+            self._prune(joins, time.monotonic() if now is None else now)
+            if len(joins) < self.threshold / 2:
+                self._bursting.discard(guild_id)
+            if not joins:
+                del self._joins[guild_id]
+        return guild_id in self._bursting
+
+    def _sweep(self, now):
+        # Same clean-up is_bursting does for one guild, across every guild.
+        for guild_id, joins in list(self._joins.items()):
+            self._prune(joins, now)
+            if not joins:
+                del self._joins[guild_id]
+                self._bursting.discard(guild_id)
+        self._next_sweep = now + self.window
+
+    def _prune(self, joins, now):
+        while joins and joins[0] <= now - self.window:
+            joins.popleft()
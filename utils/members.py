@@ -0,0 +1,100 @@
+import re
+import time
+from collections import OrderedDict
+
+import discord
+from discord.ext import commands
+
+from config import LOW_MEMORY, MEMBER_LRU_SIZE, MEMBER_LRU_TTL
+
+_MENTION_RE = re.compile(r"<@!?([0-9]{15,20})>$|([0-9]{15,20})$")
+
+
+class MemberCache:
+    """A small LRU of recently touched members.
+
+    In low-memory mode discord.py keeps no members, so anything that needs
+    one would otherwise go to the API every time. Entries expire after
+    ``ttl`` seconds because nothing updates them when roles or nicknames
+    change; callers that need current roles should pass ``fresh=True``.
+    """
+
+    def __init__(self, size=1000, ttl=300.0):
+        self.size = size
+        self.ttl = ttl
+        self._members = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+
+    def put(self, member):
+        if not self.size or not isinstance(member, discord.Member):
+            return
+        key = (member.guild.id, member.id)
+        self._members[key] = (member, time.monotonic())
+        self._members.move_to_end(key)
+        if len(self._members) > self.size:
+            self._members.popitem(last=False)
+
+    def get(self, guild_id, user_id):
+        entry = self._members.get((guild_id, user_id))
+        if entry is None:
+            self.misses += 1
+            return None
+        member, stored = entry
+        if time.monotonic() - stored > self.ttl:
+            del self._members[(guild_id, user_id)]
+            self.misses += 1
+            return None
+        self._members.move_to_end((guild_id, user_id))
+        self.hits += 1
+        return member
+
+    def discard(self, guild_id, user_id):
+        self._members.pop((guild_id, user_id), None)
+
+    async def resolve(self, guild, user_id, fresh=False):
+        """The member from the gateway cache, this LRU, or the API; None if they left."""
+        member = guild.get_member(user_id)
+        if member is not None:
+            return member
+        if not fresh:
+            member = self.get(guild.id, user_id)
+            if member is not None:
+                return member
+        try:
+            member = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            return None
+        self.fetches += 1
+        self.put(member)
+        return member
+
+    def stats(self):
+        return {"members": len(self._members), "size": self.size, "hits": self.hits,
+                "misses": self.misses, "fetches": self.fetches}
+
+    def __len__(self):
+        return len(self._members)
+
+
+member_cache = MemberCache(MEMBER_LRU_SIZE if LOW_MEMORY else 0, MEMBER_LRU_TTL)
+
+
+class CachedMember(commands.Converter):
+    """Like discord.Member, but checks the member LRU before asking the gateway.
+
+    For commands that only need who the member is (kick, ban, warn, ...);
+    roles on an LRU hit may be a few minutes old.
+    """
+
+    async def convert(self, ctx, argument):
+        match = _MENTION_RE.match(argument)
+        if match and ctx.guild is not None:
+            user_id = int(match.group(1) or match.group(2))
+            member = ctx.guild.get_member(user_id) or member_cache.get(ctx.guild.id, user_id)
+            if member is not None:
+                return member
+        member = await commands.MemberConverter().convert(ctx, argument)
+        member_cache.put(member)
+        return member
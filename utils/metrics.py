@@ -0,0 +1,300 @@
+import functools
+import os
+import resource
+import time
+
+from aiohttp import web
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+
+    def observe(self, value, *labels):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        else:
+            state[len(self.buckets)] += 1
+        state[-1] += value
+
+    def render(self):
+        lines = self.header()
+        for labels, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), state[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {state[-1]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A gauge whose samples are read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self):
+        lines = self.header()
+        try:
+            samples = self.callback() if self.callback else ()
+        except Exception as e:
+            print(f"⚠️ Metric {self.name} failed: {e}")
+            samples = ()
+        for labels, value in samples:
+            if value is None or value != value:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class GuildLabels:
+    """Keeps per-guild label cardinality bounded.
+
+    The first ``limit`` guilds seen get their own label; every guild after
+    that is reported as "other".
+    """
+
+    def __init__(self, limit=50):
+        self.limit = limit
+        self._seen = set()
+
+    def __call__(self, guild_id):
+        if guild_id is None:
+            return "dm"
+        if guild_id in self._seen:
+            return str(guild_id)
+        if len(self._seen) < self.limit:
+            self._seen.add(guild_id)
+            return str(guild_id)
+        return "other"
+
+
+registry = Registry()
+guild_label = GuildLabels()
+
+command_latency = registry.histogram(
+    "yuuki_command_duration_seconds", "Time spent running prefix commands.", ("command", "status")
+)
+guild_commands = registry.counter(
+    "yuuki_guild_commands_total", "Commands run per guild (top guilds only, the rest as 'other').", ("guild",)
+)
+listener_latency = registry.histogram(
+    "yuuki_listener_duration_seconds", "Time spent in cog event listeners.", ("cog", "event", "status")
+)
+db_latency = registry.histogram(
+    "yuuki_db_query_duration_seconds", "Time spent in database helpers.", ("query", "op")
+)
+
+
+async def before_invoke(ctx):
+    ctx.metrics_started = time.perf_counter()
+
+
+async def after_invoke(ctx):
+    started = getattr(ctx, "metrics_started", None)
+    if started is None or ctx.command is None:
+        return
+    status = "error" if ctx.command_failed else "ok"
+    command_latency.observe(time.perf_counter() - started, ctx.command.qualified_name, status)
+    guild_commands.inc(guild_label(ctx.guild.id if ctx.guild else None))
+
+
+def _wrap_listener(cog_name, event, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            listener_latency.observe(time.perf_counter() - started, cog_name, event, status)
+    return wrapper
+
+
+def instrument(cog):
+    """Time every listener on ``cog``. Call before ``bot.add_cog``.
+
+    The wrappers are set as instance attributes, which is what add_cog and
+    remove_cog look up, so unloading the cog removes them cleanly.
+    """
+    for event, method_name in type(cog).__cog_listeners__:
+        setattr(cog, method_name, _wrap_listener(cog.qualified_name, event, getattr(cog, method_name)))
+    return cog
+
+
+class db_timer:
+    """Times a database call, labelled with the db helper (``query``) that issued it."""
+
+    __slots__ = ("op", "query", "started")
+
+    def __init__(self, op, query):
+        self.op = op
+        self.query = query
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        db_latency.observe(time.perf_counter() - self.started, self.query, self.op)
+        return False
+
+
+def process_memory():
+    """Current and peak resident memory of this process, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        rss = peak
+    return rss, peak
+
+
+def watch_bot(bot):
+    """Register gauges that read live state off ``bot`` at scrape time."""
+    from db import database  # db.database imports this module
+
+    def gateway_latency():
+        latencies = getattr(bot, "latencies", None) or [(0, bot.latency)]
+        return [((shard_id,), latency) for shard_id, latency in latencies]
+
+    def guilds():
+        return [((), len(bot.guilds))]
+
+    def settings_cache():
+        stats = database.settings_cache.stats()
+        return [(("hits",), stats["hits"]), (("misses",), stats["misses"]), (("guilds",), stats["guilds"])]
+
+    def write_queue():
+        stats = database.write_queue_stats()
+        return [((key,), stats[key]) for key in ("queued", "pending", "batches", "statements") if key in stats]
+
+    def loop_lag():
+        health = getattr(bot, "health", None)
+        if health is None:
+            return []
+        snap = health.snapshot()
+        return [(("p50",), snap["loop_lag_p50"]), (("p99",), snap["loop_lag_p99"]), (("max",), snap["loop_lag_max"])]
+
+    def autorole_depth():
+        autoroles = getattr(bot, "autoroles", None)
+        return [((), autoroles.depth())] if autoroles is not None else []
+
+    def outbound_depth():
+        outbound = getattr(bot, "outbound", None)
+        return [((), outbound.depth())] if outbound is not None else []
+
+    registry.gauge("yuuki_gateway_latency_seconds", "Gateway heartbeat latency per shard.", ("shard",), gateway_latency)
+    registry.gauge("yuuki_guilds", "Guilds this process is in.", (), guilds)
+    registry.gauge("yuuki_settings_cache", "Guild settings cache counters.", ("kind",), settings_cache)
+    registry.gauge("yuuki_write_queue", "Database write queue counters.", ("kind",), write_queue)
+    registry.gauge("yuuki_resident_memory_mb", "Resident memory of this process.", (),
+                   lambda: [((), process_memory()[0])])
+    registry.gauge("yuuki_cached_members", "Members held by the gateway cache.", (),
+                   lambda: [((), sum(len(g.members) for g in bot.guilds))])
+    registry.gauge("yuuki_event_loop_lag_seconds", "Event loop lag over the health window.", ("quantile",), loop_lag)
+    registry.gauge("yuuki_autorole_queue_depth", "Members waiting for autoroles.", (), autorole_depth)
+    registry.gauge("yuuki_outbound_queue_depth", "Messages waiting in the outbound queue.", (), outbound_depth)
+
+
+async def _handle_metrics(request):
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def start_server(host, port):
+    """Serve /metrics in Prometheus text format on the running event loop."""
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"✅ Metrics on http://{host}:{port}/metrics")
+    return runner
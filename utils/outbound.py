@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+# Lower numbers are sent first within a channel.
+PRIORITY_MODERATION = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+MESSAGE_LIMIT = 2000
+
+
+class TokenBucket:
+    def __init__(self, capacity, per):
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _Outgoing:
+    __slots__ = ("priority", "seq", "content", "kwargs", "merge", "futures", "enqueued_at")
+
+    def __init__(self, priority, seq, content, kwargs, merge, future):
+        self.priority = priority
+        self.seq = seq
+        self.content = content
+        self.kwargs = kwargs
+        self.merge = merge
+        self.futures = [future]
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _ChannelQueue:
+    def __init__(self, channel, capacity, per):
+        self.channel = channel
+        self.bucket = TokenBucket(capacity, per)
+        self.heap = []
+        self.task = None
+        self.sent = 0
+        self.merged = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"⚠️ Queued message failed to send: {future.exception()}")
+
+
+class OutboundQueue:
+    """Per-channel outbound message queue with pacing and priority lanes.
+
+    Each channel gets its own heap ordered by (priority, arrival) and a
+    token bucket matched to Discord's per-channel limit, so a flood of
+    welcomes in one channel never delays a mod log in another, and a
+    moderation message jumps ahead of welcome/goodbye traffic waiting in
+    the same channel. Plain-text messages queued with ``merge=True`` are
+    combined with their queued neighbours into one message when they fit.
+    """
+
+    def __init__(self, capacity=5, per=5.0):
+        self.capacity = capacity
+        self.per = per
+        self._channels = {}
+        self._seq = itertools.count()
+        self._closed = False
+
+    def send(self, channel, content=None, *, priority=PRIORITY_NORMAL, merge=False, **kwargs):
+        """Queue a message and return a future resolving to the sent Message.
+
+        The future may be ignored; failures are logged either way.
+        """
+        if self._closed:
+            raise RuntimeError("Outbound queue is closed.")
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_log_failure)
+
+        queue = self._channels.get(channel.id)
+        if queue is None:
+            queue = self._channels[channel.id] = _ChannelQueue(channel, self.capacity, self.per)
+        queue.channel = channel
+        mergeable = merge and content is not None and not kwargs
+        heapq.heappush(queue.heap, _Outgoing(priority, next(self._seq), content, kwargs, mergeable, future))
+        if queue.task is None:
+            queue.task = asyncio.create_task(self._drain(queue), name=f"outbound-{channel.id}")
+        return future
+
+    async def _drain(self, queue):
+        try:
+            while queue.heap:
+                await queue.bucket.acquire()
+                item = heapq.heappop(queue.heap)
+                if item.merge:
+                    self._merge_following(queue, item)
+
+                wait = time.monotonic() - item.enqueued_at
+                queue.last_wait = wait
+                queue.max_wait = max(queue.max_wait, wait)
+                queue.total_wait += wait
+                try:
+                    message = await queue.channel.send(item.content, **item.kwargs)
+                except Exception as e:
+                    for future in item.futures:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for future in item.futures:
+                        if not future.done():
+                            future.set_result(message)
+                queue.sent += 1
+        finally:
+            queue.task = None
+
+    def _merge_following(self, queue, item):
+        while queue.heap:
+            following = queue.heap[0]
+            if not following.merge or following.priority != item.priority:
+                break
+            if len(item.content) + 1 + len(following.content) > MESSAGE_LIMIT:
+                break
+            heapq.heappop(queue.heap)
+            item.content = f"{item.content}\n{following.content}"
+            item.futures.extend(following.futures)
+            queue.merged += 1
+
+    def depth(self, channel_id=None):
+        if channel_id is not None:
+            queue = self._channels.get(channel_id)
+            return len(queue.heap) if queue else 0
+        return sum(len(queue.heap) for queue in self._channels.values())
+
+    def stats(self):
+        return {
+            channel_id: {
+                "depth": len(queue.heap),
+                "sent": queue.sent,
+                "merged": queue.merged,
+                "last_wait": queue.last_wait,
+                "max_wait": queue.max_wait,
+                "avg_wait": queue.total_wait / queue.sent if queue.sent else 0.0,
+            }
+            for channel_id, queue in self._channels.items()
+        }
+
+    async def close(self, timeout=10):
+        """Stop accepting messages and give queued ones a chance to go out."""
+        self._closed = True
+        tasks = [queue.task for queue in self._channels.values() if queue.task is not None]
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import discord
+
+
+class RolloutResult:
+    __slots__ = ("total", "applied", "skipped", "failed")
+
+    def __init__(self, total):
+        self.total = total
+        self.applied = 0
+        self.skipped = 0
+        self.failed = []
+
+    @property
+    def done(self):
+        return self.applied + self.skipped + len(self.failed)
+
+
+async def rollout_overwrites(channels, target, overwrite, *, concurrency=5, retries=4,
+                             reason=None, progress=None, progress_interval=2.0):
+    """Apply ``overwrite`` for ``target`` to every channel in ``channels``.
+
+    Up to ``concurrency`` requests run at once. Rate limits and server
+    errors are retried with exponential backoff, and channels that already
+    carry the overwrite are skipped so an interrupted rollout can simply be
+    run again. ``progress`` is awaited with the RolloutResult at most every
+    ``progress_interval`` seconds and once more at the end.
+    """
+    channels = list(channels)
+    result = RolloutResult(len(channels))
+    semaphore = asyncio.Semaphore(concurrency)
+    last_report = time.monotonic()
+
+    async def report(final=False):
+        nonlocal last_report
+        if progress is None:
+            return
+        now = time.monotonic()
+        if final or now - last_report >= progress_interval:
+            last_report = now
+            try:
+                await progress(result)
+            except Exception as e:
+                print(f"⚠️ Rollout progress update failed: {e}")
+
+    async def apply(channel):
+        if channel.overwrites_for(target) == overwrite:
+            result.skipped += 1
+            return
+        async with semaphore:
+            for attempt in range(retries + 1):
+                try:
+                    await channel.set_permissions(target, overwrite=overwrite, reason=reason)
+                except discord.Forbidden:
+                    result.failed.append(channel)
+                    return
+                except discord.HTTPException as e:
+                    if (e.status == 429 or e.status >= 500) and attempt < retries:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                    result.failed.append(channel)
+                    return
+                result.applied += 1
+                return
+
+    async def apply_and_report(channel):
+        await apply(channel)
+        await report()
+
+    await asyncio.gather(*(apply_and_report(c) for c in channels))
+    await report(final=True)
+    return result
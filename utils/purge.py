@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+import time
+
+import discord
+from discord.utils import utcnow
+
+BULK_LIMIT = 100
+# Discord refuses bulk deletes of messages older than 14 days; keep a margin
+# so a message does not age out between being read and being deleted.
+BULK_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+
+
+class PurgeFilter:
+    """Which messages a purge deletes. Unset criteria match everything.
+
+    ``after`` and ``before`` are datetimes or messages bounding the history scan.
+    """
+
+    __slots__ = ("author_ids", "pattern", "attachments", "after", "before")
+
+    def __init__(self, author_ids=None, pattern=None, attachments=False, after=None, before=None):
+        self.author_ids = frozenset(author_ids) if author_ids else None
+        self.pattern = pattern
+        self.attachments = attachments
+        self.after = after
+        self.before = before
+
+    @property
+    def narrowed(self):
+        return bool(self.author_ids or self.pattern or self.attachments)
+
+    def matches(self, message):
+        if self.author_ids is not None and message.author.id not in self.author_ids:
+            return False
+        if self.attachments and not message.attachments:
+            return False
+        if self.pattern is not None and not self.pattern.search(message.content):
+            return False
+        return True
+
+
+class PurgeJob:
+    """Streams a channel's history newest first and deletes what ``filter`` matches.
+
+    Only one page of history and at most one bulk-delete chunk are held at
+    a time. Messages young enough are deleted 100 at a time; older ones go
+    one by one, ``old_delay`` seconds apart. ``progress`` is awaited with the
+    job every ``progress_interval`` seconds and once at the end.
+    """
+
+    def __init__(self, channel, filter, *, limit, scan_limit=None,
+                 old_delay=1.0, reason=None, progress=None, progress_interval=3.0):
+        self.channel = channel
+        self.filter = filter
+        self.limit = limit
+        self.scan_limit = scan_limit
+        self.old_delay = old_delay
+        self.reason = reason
+        self.progress = progress
+        self.progress_interval = progress_interval
+
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.failed = 0
+        self.started = None
+        self.finished = None
+        self._cancelled = asyncio.Event()
+        self._last_report = 0.0
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def cancel(self):
+        self._cancelled.set()
+
+    async def _report(self, final=False):
+        if self.progress is None:
+            return
+        now = time.monotonic()
+        if final or now - self._last_report >= self.progress_interval:
+            self._last_report = now
+            try:
+                await self.progress(self)
+            except Exception as e:
+                print(f"⚠️ Purge progress update failed: {e}")
+
+    async def _delete_bulk(self, chunk):
+        try:
+            await self.channel.delete_messages(chunk, reason=self.reason)
+            self.deleted += len(chunk)
+        except discord.HTTPException:
+            # One bad message fails the whole request; fall back to deleting singly.
+            for message in chunk:
+                await self._delete_one(message)
+
+    async def _delete_one(self, message):
+        try:
+            await message.delete()
+            self.deleted += 1
+        except discord.NotFound:
+            pass
+        except discord.HTTPException:
+            self.failed += 1
+
+    async def _pause(self, seconds):
+        # Returns early if the job is cancelled during the pause.
+        try:
+            await asyncio.wait_for(self._cancelled.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        self.started = time.monotonic()
+        chunk = []
+        bulk_cutoff = utcnow() - BULK_MAX_AGE
+        try:
+            history = self.channel.history(
+                limit=self.scan_limit, before=self.filter.before,
+                after=self.filter.after, oldest_first=False
+            )
+            async for message in history:
+                if self.cancelled:
+                    break
+                self.scanned += 1
+                if not self.filter.matches(message):
+                    continue
+                self.matched += 1
+
+                if message.created_at > bulk_cutoff:
+                    chunk.append(message)
+                    if len(chunk) == BULK_LIMIT:
+                        await self._delete_bulk(chunk)
+                        chunk = []
+                else:
+                    # History is newest first, so anything still buffered is bulk-deletable now.
+                    if chunk:
+                        await self._delete_bulk(chunk)
+                        chunk = []
+                    await self._delete_one(message)
+                    await self._pause(self.old_delay)
+
+                await self._report()
+                if self.matched >= self.limit:
+                    break
+
+            if chunk and not self.cancelled:
+                await self._delete_bulk(chunk)
+        finally:
+            self.finished = time.monotonic()
+        await self._report(final=True)
+        return self
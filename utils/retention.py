@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+from db import database
+from utils import metrics
+
+# Infraction actions a retention policy can name, as logged by Moderation.
+RETENTION_ACTIONS = ("Warned", "Muted", "Kicked", "Banned", "Automod")
+
+archived_total = metrics.registry.counter(
+    "yuuki_infractions_archived_total", "Infractions moved to the archive by retention policies."
+)
+
+
+class RetentionJob:
+    """Moves infractions past their guild's retention policy into infraction_archive.
+
+    Every ``interval`` seconds each policy of a guild this process serves is
+    applied ``batch_size`` rows at a time, pausing between batches so
+    moderation writes are not stuck behind a large backlog, and member_joins
+    rows older than ``join_index_ttl`` seconds are dropped. Every
+    ``maintenance_interval`` seconds cluster 0 also runs database
+    maintenance: ANALYZE, a WAL checkpoint and, once ``vacuum_ratio`` of the
+    file is free pages, VACUUM. Sizes before and after the last run that
+    archived or maintained anything are kept in ``last_run``.
+    """
+
+    def __init__(self, bot, interval=3600.0, batch_size=500, maintenance_interval=86400.0,
+                 vacuum_ratio=0.2, join_index_ttl=259200.0, pause=0.05):
+        self.bot = bot
+        self.interval = interval
+        self.batch_size = batch_size
+        self.maintenance_interval = maintenance_interval
+        self.vacuum_ratio = vacuum_ratio
+        self.join_index_ttl = join_index_ttl
+        self.pause = pause
+        self.last_run = None
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="retention")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def archive_expired(self, before_archiving=None):
+        """Archive every expired infraction; ``before_archiving`` is awaited once, ahead of the first batch."""
+        archived = 0
+        now = int(time.time())
+        for guild_id, action, days in await database.get_retention_policies(self.bot):
+            if self.bot.get_guild(guild_id) is None:
+                continue  # another cluster's guild
+            cutoff = now - days * 86400
+            while True:
+                rows = await database.get_expired_infractions(self.bot, guild_id, action, cutoff, self.batch_size)
+                if rows:
+                    if before_archiving is not None and not archived:
+                        await before_archiving()
+                    await database.archive_infractions(self.bot, guild_id, rows)
+                    archived += len(rows)
+                    archived_total.inc(amount=len(rows))
+                if len(rows) < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+        return archived
+
+    async def run_once(self, maintenance=False, vacuum=None):
+        """Archive expired infractions now, optionally followed by maintenance.
+
+        ``vacuum=None`` lets the free-page ratio decide. Table sizes are only
+        measured when something is archived or maintenance runs, since each
+        measurement walks the tables; ``last_run`` keeps the latest such run.
+        Returns the run's summary, or None when there was nothing to do.
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            before = None
+
+            async def measure():
+                nonlocal before
+                before = await database.table_stats(self.bot)
+
+            if maintenance:
+                await measure()
+            archived = await self.archive_expired(before_archiving=None if maintenance else measure)
+            await database.prune_member_joins(self.bot, time.time() - self.join_index_ttl)
+            if before is None:
+                return None
+            result = None
+            if maintenance:
+                if vacuum is None:
+                    current = await database.table_stats(self.bot) if archived else before
+                    free = current["free_bytes"]
+                    # PostgreSQL does not report free space; a plain VACUUM there is cheap and non-blocking.
+                    vacuum = free is None or free >= current["database_bytes"] * self.vacuum_ratio
+                result = await database.maintain(self.bot, vacuum=vacuum)
+            after = await database.table_stats(self.bot)
+            self.last_run = {
+                "at": time.time(), "seconds": time.perf_counter() - started, "archived": archived,
+                "maintenance": result, "before": before, "after": after,
+            }
+        print(
+            f"🗄️ Retention: archived {archived} infractions, database "
+            f"{before['database_bytes'] / 1048576:.1f} MB -> {after['database_bytes'] / 1048576:.1f} MB"
+            + (" (vacuumed)" if result and result["vacuumed"] else "")
+        )
+        return self.last_run
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        last_maintenance = time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            due = (getattr(self.bot, "cluster_id", 0) == 0
+                   and time.monotonic() - last_maintenance >= self.maintenance_interval)
+            try:
+                await self.run_once(maintenance=due)
+            except Exception as e:
+                print(f"⚠️ Retention run failed: {e}")
+            if due:
+                last_maintenance = time.monotonic()
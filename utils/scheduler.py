@@ -0,0 +1,146 @@
+import asyncio
+import heapq
+import time
+
+from db import database
+from utils import cluster
+
+
+class Scheduler:
+    """Runs delayed actions (unmutes, unbans, ...) stored in scheduled_actions.
+
+    Only ``(run_at, id)`` pairs live in memory, kept in a min-heap that one
+    timer task sleeps on. When entries come due, their rows are loaded in a
+    batch, handed to the handler registered for their action name and then
+    deleted. A handler that raises is retried up to MAX_ATTEMPTS times, its
+    attempt count kept in the payload. Cancelling just deletes the row; the stale heap entry is
+    skipped when it fires. Under the cluster launcher each process only
+    loads and fires actions for guilds on its own shards.
+    """
+
+    # Upper bound on a single sleep so wall-clock jumps are picked up.
+    MAX_SLEEP = 3600
+    # How long to wait before retrying an action whose guild is not in the cache yet.
+    RETRY_DELAY = 300
+    # Tries a failing handler gets before its action is dropped.
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, bot, batch_size=100):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.fired = 0
+        self._heap = []
+        self._handlers = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def register(self, action, handler):
+        self._handlers[action] = handler
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._heap = [
+            (run_at, action_id) for run_at, action_id, guild_id in await database.get_scheduled_action_times(self.bot)
+            if cluster.owns_guild(self.bot, guild_id)
+        ]
+        heapq.heapify(self._heap)
+        self._task = asyncio.create_task(self._run(), name="scheduler")
+        print(f"✅ Restored {len(self._heap)} scheduled actions.")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def schedule(self, guild_id, action, target_id, run_at, payload=None):
+        run_at = int(run_at)
+        action_id = await database.add_scheduled_action(self.bot, guild_id, action, target_id, run_at, payload)
+        heapq.heappush(self._heap, (run_at, action_id))
+        if self._heap[0][1] == action_id:
+            self._wakeup.set()
+        return action_id
+
+    async def cancel(self, guild_id, action, target_id):
+        await database.cancel_scheduled_actions(self.bot, guild_id, action, target_id)
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def _run(self):
+        # Handlers need the guild cache, which is only complete once ready.
+        await self.bot.wait_until_ready()
+        while True:
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, self.MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            due = []
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self._heap)[1])
+            try:
+                await self._fire(due)
+            except Exception as e:
+                print(f"⚠️ Scheduler batch failed: {e}")
+
+    async def _fire(self, action_ids):
+        actions = []
+        retry_at = int(time.time()) + self.RETRY_DELAY
+        for action in await database.get_scheduled_actions(self.bot, action_ids):
+            if not cluster.owns_guild(self.bot, action["guild_id"]):
+                continue  # another cluster's row; it fires there
+            if self.bot.get_guild(action["guild_id"]) is None:
+                # Our shard, but the guild is unavailable right now. Deleting
+                # the row would lose the unmute or unban for good.
+                heapq.heappush(self._heap, (retry_at, action["id"]))
+                continue
+            actions.append(action)
+
+        runnable = [a for a in actions if a["action"] in self._handlers]
+        for action in actions:
+            if action["action"] not in self._handlers:
+                # Left in the table and tried again later, so it runs once its cog is loaded again.
+                print(f"⚠️ No handler for scheduled action '{action['action']}' (id {action['id']}).")
+                heapq.heappush(self._heap, (retry_at, action["id"]))
+
+        results = await asyncio.gather(
+            *(self._handlers[a["action"]](a) for a in runnable),
+            return_exceptions=True
+        )
+        done, failed, succeeded = [], [], 0
+        for action, result in zip(runnable, results):
+            if not isinstance(result, Exception):
+                done.append(action["id"])
+                succeeded += 1
+                continue
+            payload = dict(action["payload"] or {})
+            payload["attempts"] = payload.get("attempts", 0) + 1
+            if payload["attempts"] >= self.MAX_ATTEMPTS:
+                print(f"⚠️ Scheduled {action['action']} for {action['target_id']} failed, giving up: {result}")
+                done.append(action["id"])
+                continue
+            print(f"⚠️ Scheduled {action['action']} for {action['target_id']} failed, retrying: {result}")
+            failed.append((action["id"], payload))
+            heapq.heappush(self._heap, (retry_at, action["id"]))
+
+        if failed:
+            await database.set_scheduled_action_payloads(self.bot, failed)
+        if done:
+            await database.delete_scheduled_actions(self.bot, done)
+        self.fired += succeeded
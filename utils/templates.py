@@ -0,0 +1,171 @@
+import string
+import time
+
+import discord
+
+from db import database
+
+EXCLAMATION = "<a:exclamation:1350752095720177684>"
+
+TEMPLATE_KINDS = ("welcome", "goodbye")
+
+DEFAULT_TEMPLATES = {
+    "welcome": {
+        "title": "👋 Welcome, {member_name}!",
+        "description": (
+            "We're excited to see you here!\n\n"
+            "`Welcome to {guild_name}`\n\n"
+            f"{EXCLAMATION} Read the rules in {{rules_channel}}\n\n"
+            f"{EXCLAMATION} Get yourself a role in {{role_channel}}\n\n"
+            f"{EXCLAMATION} Introduce yourself in {{introduction_channel}}\n\n"
+            "**Start having fun!** 🎉\n\n"
+            "Enjoy your stay! If you have any questions, feel free to ask. | Today at {time}"
+        ),
+        "color": discord.Color.green().value,
+    },
+    "goodbye": {
+        "title": "👋 Farewell, {member_name}",
+        "description": (
+            "{member_mention} has left **{guild_name}**.\n\n"
+            "Thanks for being part of our community.\n"
+            "Wish you the best wherever you go! ✨\n\n"
+        ),
+        "color": discord.Color.red().value,
+    },
+}
+
+# Placeholders filled in per member at render time; everything else is
+# resolved once when the template is compiled.
+MEMBER_FIELDS = ("member_name", "member_mention", "member_id", "member_count", "time")
+
+
+def _guild_fields(guild, settings):
+    def channel(channel_id, fallback):
+        return f"<#{channel_id}>" if channel_id else fallback
+
+    return {
+        "guild_name": guild.name,
+        "rules_channel": channel(settings.rules_channel, "the rules channel."),
+        "role_channel": channel(settings.role_channel, "the roles channel."),
+        "introduction_channel": channel(settings.introduction_channel, "the introduction channel."),
+    }
+
+
+def template_error(text):
+    """Why ``text`` cannot be used as a template (stray braces), or None if it can."""
+    try:
+        list(string.Formatter().parse(text or ""))
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def compile_text(text, guild_fields):
+    """Split ``text`` into literal runs and member field names.
+
+    Guild fields are substituted now, member fields are kept as slots and
+    unknown placeholders are left in the text untouched. Text with
+    unbalanced braces is kept as it is. Returns ``(literals, fields)`` with
+    ``len(literals) == len(fields) + 1``.
+    """
+    try:
+        parsed = list(string.Formatter().parse(text or ""))
+    except ValueError:
+        # Saved before .settemplate checked templates; better shown raw than not at all.
+        return (text or "",), ()
+    literals, fields, run = [], [], []
+    for literal, field, spec, conversion in parsed:
+        run.append(literal)
+        if field is None:
+            continue
+        if field in guild_fields:
+            run.append(guild_fields[field])
+        elif field in MEMBER_FIELDS:
+            literals.append("".join(run))
+            fields.append(field)
+            run = []
+        else:
+            run.append(f"{{{field}}}")
+    literals.append("".join(run))
+    return tuple(literals), tuple(fields)
+
+
+def _render_text(compiled, values):
+    literals, fields = compiled
+    if not fields:
+        return literals[0]
+    parts = [literals[0]]
+    for field, literal in zip(fields, literals[1:]):
+        parts.append(values[field])
+        parts.append(literal)
+    return "".join(parts)
+
+
+class CompiledTemplate:
+    __slots__ = ("title", "description", "color", "author_name", "author_icon")
+
+    def __init__(self, kind, template, guild, settings):
+        guild_fields = _guild_fields(guild, settings)
+        self.title = compile_text(template["title"], guild_fields)
+        self.description = compile_text(template["description"], guild_fields)
+        self.color = template["color"]
+        self.author_name = guild.name if kind == "welcome" else None
+        self.author_icon = guild.icon.url if guild.icon else None
+
+    def render(self, member):
+        values = {
+            "member_name": member.name,
+            "member_mention": member.mention,
+            "member_id": str(member.id),
+            "member_count": str(member.guild.member_count),
+            "time": f"<t:{int(time.time())}:t>",
+        }
+        embed = discord.Embed(
+            title=_render_text(self.title, values) or None,
+            description=_render_text(self.description, values) or None,
+            color=self.color
+        )
+        if self.author_name:
+            embed.set_author(name=self.author_name, icon_url=self.author_icon)
+        embed.set_thumbnail(url=member.display_avatar.url)
+        return embed
+
+
+class TemplateCache:
+    """Compiled welcome/goodbye templates keyed by (guild id, kind)."""
+
+    def __init__(self):
+        self._compiled = {}
+        self.compiles = 0
+        database.settings_cache.listeners.append(self._on_settings_change)
+
+    async def get(self, bot, guild, kind):
+        key = (guild.id, kind)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            settings = await database.get_guild_settings(bot, guild.id)
+            stored = await database.get_message_template(bot, guild.id, kind)
+            template = dict(DEFAULT_TEMPLATES[kind])
+            if stored:
+                template.update({k: v for k, v in stored.items() if v is not None})
+            compiled = self._compiled[key] = CompiledTemplate(kind, template, guild, settings)
+            self.compiles += 1
+        return compiled
+
+    def invalidate(self, guild_id):
+        for kind in TEMPLATE_KINDS:
+            self._compiled.pop((guild_id, kind), None)
+
+    def _on_settings_change(self, guild_id, column):
+        self.invalidate(guild_id)
+
+    def __len__(self):
+        return len(self._compiled)
+
+
+template_cache = TemplateCache()
+
+
+async def render_template(bot, member, kind):
+    compiled = await template_cache.get(bot, member.guild, kind)
+    return compiled.render(member)